@@ -0,0 +1,96 @@
+"""
+This module contains helpers shared by the dataset benchmarks: creating
+temporary databases and filling them with runs of a given size.
+"""
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import qcodes
+from qcodes.dataset.database import initialise_database, close_connections
+from qcodes.dataset.data_set import new_data_set
+from qcodes.dataset.experiment_container import new_experiment
+from qcodes.dataset.param_spec import ParamSpec
+
+
+def use_database(path: str) -> None:
+    """
+    Point QCoDeS to the database at the given path (creating it if needed)
+    """
+    close_connections()
+    qcodes.config["core"]["db_location"] = path
+    qcodes.config["core"]["db_debug"] = False
+    initialise_database()
+
+
+def create_temp_database() -> str:
+    """
+    Create an empty database in a new temporary directory and point QCoDeS
+    to it
+
+    Returns:
+        the temporary directory, to be removed with remove_temp_database
+    """
+    tmpdir = tempfile.mkdtemp()
+    use_database(os.path.join(tmpdir, 'temp.db'))
+    return tmpdir
+
+
+def remove_temp_database(tmpdir: Optional[str]) -> None:
+    close_connections()
+    if tmpdir:
+        shutil.rmtree(tmpdir)
+
+
+def add_1d_run(n_values: int, name: str = 'test-1d') -> int:
+    """
+    Add a run of n_values results of a parameter y depending on x
+
+    Returns:
+        the run id
+    """
+    x = ParamSpec('x', 'numeric', label='x', unit='V')
+    y = ParamSpec('y', 'numeric', label='y', unit='A', depends_on=[x])
+    dataset = new_data_set(name, specs=[x, y])
+    dataset.add_result_columns({'x': np.linspace(0, 1, n_values),
+                                'y': np.random.rand(n_values)})
+    dataset.mark_complete()
+    return dataset.run_id
+
+
+def add_2d_run(n_x: int, n_y: int, name: str = 'test-2d') -> int:
+    """
+    Add a run of a parameter z depending on x and y, measured on a
+    rectangular n_x by n_y grid
+
+    Returns:
+        the run id
+    """
+    x = ParamSpec('x', 'numeric', label='x', unit='V')
+    y = ParamSpec('y', 'numeric', label='y', unit='V')
+    z = ParamSpec('z', 'numeric', label='z', unit='A', depends_on=[x, y])
+    dataset = new_data_set(name, specs=[x, y, z])
+    xx, yy = np.meshgrid(np.linspace(0, 1, n_x), np.linspace(-1, 1, n_y),
+                         indexing='ij')
+    dataset.add_result_columns({'x': xx.ravel(), 'y': yy.ravel(),
+                                'z': np.random.rand(n_x*n_y)})
+    dataset.mark_complete()
+    return dataset.run_id
+
+
+def fill_database(path: str, n_values: List[int]) -> Dict[int, int]:
+    """
+    Create a database at the given path holding one 1D run per number of
+    values
+
+    Returns:
+        the run id per number of values
+    """
+    use_database(path)
+    new_experiment("test-experiment", sample_name="test-sample")
+    run_ids = {n: add_1d_run(n) for n in n_values}
+    close_connections()
+    return run_ids
@@ -0,0 +1,111 @@
+"""
+This module contains code used for benchmarking writing and reading the
+data of a Loop (the legacy qcodes.data DataSet) to and from files.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from qcodes.data.data_array import DataArray
+from qcodes.data.data_set import DataSet, new_data
+from qcodes.data.gnuplot_format import GNUPlotFormat
+from qcodes.data.hdf5_format import HDF5Format
+from qcodes.data.io import DiskIO
+
+
+def make_2d_data_set(location, shape, formatter):
+    """
+    Make a DataSet of a 2D sweep of the given shape, with two measured
+    arrays
+    """
+    outer = DataArray(name='x', label='X', is_setpoint=True,
+                      preset_data=np.linspace(0, 1, shape[0]))
+    inner = DataArray(name='y', label='Y', is_setpoint=True,
+                      set_arrays=(outer,),
+                      preset_data=np.tile(np.linspace(-1, 1, shape[1]),
+                                          (shape[0], 1)))
+    measured = [DataArray(name=name, label=name.upper(),
+                          set_arrays=(outer, inner),
+                          preset_data=np.random.rand(*shape))
+                for name in ('z1', 'z2')]
+    return new_data(arrays=[outer, inner] + measured, location=location,
+                    io=DiskIO('.'), formatter=formatter)
+
+
+class GNUPlotFormatIO:
+    """
+    This benchmark measures how long it takes to write and read a 2D
+    DataSet in the GNUPlot format, for several sizes of the data.
+    """
+
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    params = [(100, 100), (1000, 1000)]
+    param_names = ['shape']
+
+    def setup(self, shape):
+        self.tmpdir = tempfile.mkdtemp()
+        self.formatter = GNUPlotFormat()
+        self.data_set = make_2d_data_set(os.path.join(self.tmpdir, 'run'),
+                                         shape, self.formatter)
+        self.formatter.write(self.data_set, self.data_set.io,
+                             self.data_set.location)
+
+    def teardown(self, shape):
+        shutil.rmtree(self.tmpdir)
+
+    def time_write(self, shape):
+        # write all of the data to a new location
+        location = os.path.join(self.tmpdir, 'copy')
+        shutil.rmtree(location, ignore_errors=True)
+        for array in self.data_set.arrays.values():
+            array.clear_save()
+        self.formatter.write(self.data_set, self.data_set.io, location,
+                             write_metadata=False)
+
+    def time_read(self, shape):
+        data_set = DataSet(location=self.data_set.location,
+                           io=self.data_set.io, formatter=self.formatter)
+        self.formatter.read(data_set)
+
+
+class HDF5FormatIncrementalWrite:
+    """
+    This benchmark measures how long it takes to write a 2D DataSet in the
+    HDF5 format while it is being filled, as done by a Loop that writes
+    every write_period: the rows of the sweep are filled in n_writes
+    steps, with a write after each.
+    """
+
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    params = ([(100, 100), (1000, 1000)], [10, 100])
+    param_names = ['shape', 'n_writes']
+
+    def setup(self, shape, n_writes):
+        self.tmpdir = tempfile.mkdtemp()
+        self.formatter = HDF5Format()
+        self.data_set = make_2d_data_set(os.path.join(self.tmpdir, 'run'),
+                                         shape, self.formatter)
+        self.values = {array_id: array.ndarray.copy()
+                       for array_id, array in self.data_set.arrays.items()}
+        for array in self.data_set.arrays.values():
+            array.ndarray.fill(np.nan)
+            array.modified_range = None
+
+    def teardown(self, shape, n_writes):
+        self.formatter.close_file(self.data_set)
+        shutil.rmtree(self.tmpdir)
+
+    def time_write(self, shape, n_writes):
+        rows = np.linspace(0, shape[0], n_writes + 1).astype(int)
+        for start, stop in zip(rows[:-1], rows[1:]):
+            for array_id, array in self.data_set.arrays.items():
+                array[start:stop] = self.values[array_id][start:stop]
+            self.formatter.write(self.data_set, write_metadata=False)
@@ -0,0 +1,109 @@
+"""
+This module contains code used for benchmarking operations on the database
+used under the QCoDeS dataset as a whole: opening it and listing its
+experiments and runs.
+"""
+import os
+
+from qcodes.dataset.database import close_connections, get_connection
+from qcodes.dataset.experiment_container import (new_experiment, experiments,
+                                                 run_catalog)
+from qcodes.dataset.sqlite_base import connect
+
+from .common import add_1d_run, use_database
+
+
+def _fill_database_with_runs(path: str, n_runs: int,
+                             n_experiments: int = 10) -> None:
+    use_database(path)
+    for n in range(n_experiments):
+        new_experiment(f"test-experiment-{n}", sample_name="test-sample")
+        for _ in range(n_runs // n_experiments):
+            add_1d_run(10)
+    close_connections()
+
+
+class ExperimentsListing:
+    """
+    This benchmark measures how much time it takes to list the experiments
+    of a database, and the runs of these experiments, for databases with
+    an increasing number of runs.
+    """
+
+    number = 1
+    repeat = 3
+    timeout = 1200
+
+    params = [100, 1000, 3000]
+    param_names = ['n_runs']
+
+    def setup_cache(self):
+        paths = {}
+        for n_runs in self.params:
+            paths[n_runs] = os.path.abspath(f'runs_{n_runs}.db')
+            _fill_database_with_runs(paths[n_runs], n_runs)
+        return paths
+
+    def setup(self, paths, n_runs):
+        use_database(paths[n_runs])
+
+    def teardown(self, paths, n_runs):
+        close_connections()
+
+    def time_experiments(self, paths, n_runs):
+        experiments()
+
+    def time_experiments_and_data_sets(self, paths, n_runs):
+        for experiment in experiments():
+            experiment.data_sets()
+
+    def peakmem_experiments_and_data_sets(self, paths, n_runs):
+        for experiment in experiments():
+            experiment.data_sets()
+
+    def time_run_catalog(self, paths, n_runs):
+        run_catalog()
+
+    def time_run_catalog_page(self, paths, n_runs):
+        """Get the last page of 50 runs"""
+        run_catalog(limit=50, offset=n_runs - 50)
+
+    def time_experiment_repr(self, paths, n_runs):
+        for experiment in experiments():
+            repr(experiment)
+
+
+class OpenDatabase:
+    """
+    This benchmark measures how much time it takes to open a database with
+    an increasing number of runs.
+    """
+
+    # the pooled connection is only opened on the first call
+    number = 1
+    timeout = 1200
+
+    params = [100, 3000]
+    param_names = ['n_runs']
+
+    def setup_cache(self):
+        paths = {}
+        for n_runs in self.params:
+            paths[n_runs] = os.path.abspath(f'open_{n_runs}.db')
+            _fill_database_with_runs(paths[n_runs], n_runs)
+        return paths
+
+    def setup(self, paths, n_runs):
+        use_database(paths[n_runs])
+        close_connections()
+
+    def teardown(self, paths, n_runs):
+        close_connections()
+
+    def time_connect(self, paths, n_runs):
+        """Open and close a new connection"""
+        connect(paths[n_runs]).close()
+
+    def time_get_connection(self, paths, n_runs):
+        """Get a pooled connection, opening it on the first call"""
+        get_connection(paths[n_runs])
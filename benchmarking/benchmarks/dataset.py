@@ -2,6 +2,7 @@
 This module contains code used for benchmarking data saving speed of the
 database used under the QCoDeS dataset.
 """
+import json
 import shutil
 import tempfile
 import os
@@ -12,8 +13,12 @@ import qcodes
 from qcodes import ManualParameter
 from qcodes.dataset.measurements import Measurement
 from qcodes.dataset.experiment_container import new_experiment
+from qcodes.dataset.data_set import new_data_set
+from qcodes.dataset.param_spec import ParamSpec
 from qcodes.dataset.database import initialise_database
 
+from .common import create_temp_database, remove_temp_database
+
 
 class Adding5Params:
     """
@@ -120,3 +125,272 @@ class Adding5Params:
         # force writing to database so that it is written before we exit
         # the datasaver context manager
         self.datasaver.flush_data_to_database()
+
+    def time_test_add_result_columns(self, bench_param):
+        """Adding data for 5 parameters column-wise to the dataset"""
+        columns = {str(param): values
+                   for param, values in zip(self.parameters, self.values)}
+        for _ in range(bench_param['n_times']):
+            self.datasaver.dataset.add_result_columns(columns)
+
+
+class ConnectionProfiles:
+    """
+    This benchmark measures the insert and read throughput of the database
+    for each of the connection profiles in the config.
+    """
+
+    number = 1
+    repeat = 8
+
+    params = ['rollback', 'wal']
+    param_names = ['profile']
+
+    n_values = 100000
+    n_writes = 20
+
+    def __init__(self):
+        self.old_profile = None
+        self.tmpdir = None
+        self.dataset = None
+        self.columns = None
+
+    def setup(self, profile):
+        self.old_profile = qcodes.config['dataset']['sqlite_profile']
+        qcodes.config['dataset']['sqlite_profile'] = profile
+
+        self.tmpdir = create_temp_database()
+        new_experiment("test-experiment", sample_name="test-sample")
+
+        self.dataset = new_data_set('test-dataset',
+                                    specs=[ParamSpec('x', 'numeric'),
+                                           ParamSpec('y', 'numeric')])
+        n = self.n_values // self.n_writes
+        self.columns = {'x': np.random.rand(n), 'y': np.random.rand(n)}
+        # data for the read benchmark
+        self.dataset.add_result_columns({'x': np.random.rand(self.n_values),
+                                         'y': np.random.rand(self.n_values)})
+
+    def teardown(self, profile):
+        remove_temp_database(self.tmpdir)
+        self.tmpdir = None
+        qcodes.config['dataset']['sqlite_profile'] = self.old_profile
+
+    def time_insert(self, profile):
+        """Write n_values rows in n_writes transactions"""
+        for _ in range(self.n_writes):
+            self.dataset.add_result_columns(self.columns)
+
+    def time_read(self, profile):
+        """Read all columns of the dataset as arrays"""
+        self.dataset.get_data_as_arrays('x', 'y')
+
+
+class ModifyResults:
+    """
+    This benchmark measures how much time it takes to modify all values of
+    one parameter of a dataset, result by result, in bulk, and column-wise.
+    """
+
+    number = 1
+    repeat = 8
+
+    params = [10000, 100000]
+    param_names = ['n_values']
+
+    def __init__(self):
+        self.tmpdir = None
+        self.dataset = None
+        self.values = None
+
+    def setup(self, n_values):
+        self.tmpdir = create_temp_database()
+        new_experiment("test-experiment", sample_name="test-sample")
+
+        self.dataset = new_data_set('test-dataset',
+                                    specs=[ParamSpec('x', 'numeric'),
+                                           ParamSpec('y', 'numeric')])
+        self.dataset.add_result_columns({'x': np.arange(n_values),
+                                         'y': np.random.rand(n_values)})
+        self.values = np.random.rand(n_values)
+
+    def teardown(self, n_values):
+        remove_temp_database(self.tmpdir)
+        self.tmpdir = None
+
+    def time_modify_result(self, n_values):
+        """Modify the first 1000 results one by one (all of them would take
+        too long)"""
+        for index, value in enumerate(self.values[:1000]):
+            self.dataset.modify_result(index, {'y': value})
+
+    def time_modify_results(self, n_values):
+        """Modify all results with one call of modify_results"""
+        self.dataset.modify_results(0, [{'y': value}
+                                        for value in self.values])
+
+    def time_modify_result_columns(self, n_values):
+        """Modify all results column-wise"""
+        self.dataset.modify_result_columns(0, {'y': self.values})
+
+
+class ArrayAndScalarWrites:
+    """
+    This benchmark measures how much time and memory it takes to save the
+    same number of values through the DataSaver as scalars (one result per
+    point), as arrays that are unraveled into one row per point, and as
+    arrays stored whole in 'blob' columns.
+    """
+
+    number = 1
+    repeat = 5
+
+    params = ['scalars', 'arrays', 'blobs']
+    param_names = ['mode']
+
+    n_traces = 20
+    n_points = 1000
+
+    def __init__(self):
+        self.tmpdir = None
+        self.runner = None
+        self.datasaver = None
+
+    def setup(self, mode):
+        self.tmpdir = create_temp_database()
+        experiment = new_experiment("test-experiment",
+                                    sample_name="test-sample")
+        meas = Measurement(experiment)
+        self.x = ManualParameter('x')
+        self.t = ManualParameter('t')
+        self.y = ManualParameter('y')
+        paramtype = 'blob' if mode == 'blobs' else 'numeric'
+        meas.register_parameter(self.x)
+        meas.register_parameter(self.t, paramtype=paramtype)
+        meas.register_parameter(self.y, setpoints=[self.x, self.t],
+                                paramtype=paramtype)
+
+        self.t_values = np.linspace(0, 1, self.n_points)
+        self.traces = np.random.rand(self.n_traces, self.n_points)
+
+        self.runner = meas.run()
+        self.datasaver = self.runner.__enter__()
+
+    def teardown(self, mode):
+        if self.runner:
+            self.runner.__exit__(None, None, None)
+            self.runner = None
+            self.datasaver = None
+        remove_temp_database(self.tmpdir)
+        self.tmpdir = None
+
+    def _write(self, mode):
+        for x, trace in enumerate(self.traces):
+            if mode == 'scalars':
+                for t, y in zip(self.t_values, trace):
+                    self.datasaver.add_result((self.x, x), (self.t, t),
+                                              (self.y, y))
+            else:
+                self.datasaver.add_result((self.x, x),
+                                          (self.t, self.t_values),
+                                          (self.y, trace))
+        self.datasaver.flush_data_to_database()
+
+    def time_write(self, mode):
+        self._write(mode)
+
+    def peakmem_write(self, mode):
+        self._write(mode)
+
+
+class SubscriberOverhead:
+    """
+    This benchmark measures the overhead of subscribers on adding results
+    to a dataset, in batches of 100 results, until the last subscriber has
+    been called.
+    """
+
+    number = 1
+    repeat = 5
+
+    params = [0, 1, 4]
+    param_names = ['n_subscribers']
+
+    n_batches = 100
+    batch_size = 100
+
+    def __init__(self):
+        self.tmpdir = None
+        self.dataset = None
+
+    def setup(self, n_subscribers):
+        self.tmpdir = create_temp_database()
+        new_experiment("test-experiment", sample_name="test-sample")
+        self.dataset = new_data_set('test-dataset',
+                                    specs=[ParamSpec('x', 'numeric'),
+                                           ParamSpec('y', 'numeric')])
+        for _ in range(n_subscribers):
+            self.dataset.subscribe(lambda results, length, state: None,
+                                   min_wait=0, min_count=1)
+        self.columns = {'x': np.random.rand(self.batch_size),
+                        'y': np.random.rand(self.batch_size)}
+
+    def teardown(self, n_subscribers):
+        self.dataset.unsubscribe_all()
+        remove_temp_database(self.tmpdir)
+        self.tmpdir = None
+
+    def time_add_results(self, n_subscribers):
+        for _ in range(self.n_batches):
+            self.dataset.add_result_columns(self.columns)
+        # waits for the last call of the subscribers
+        self.dataset.mark_complete()
+
+
+class SnapshotStorage:
+    """
+    This benchmark measures how much time it takes to store the snapshot of
+    a station with 30 instruments of 100 parameters each with a new run,
+    when a single parameter changed since the previous run, and how much
+    the database grows by it.
+    """
+
+    number = 1
+    repeat = 8
+
+    def __init__(self):
+        self.tmpdir = None
+        self.dataset = None
+        self.snapshot = None
+
+    def setup(self):
+        self.tmpdir = create_temp_database()
+        new_experiment("test-experiment", sample_name="test-sample")
+
+        instruments = {
+            f'instrument{n}': {'parameters': {
+                f'parameter{m}': {'value': m, 'unit': 'V', 'label': 'Label',
+                                  'vals': '<Numbers -10<=v<=10>'}
+                for m in range(100)}}
+            for n in range(30)}
+        snapshot = {'station': {'instruments': instruments}}
+        new_data_set('previous-run').add_snapshot(json.dumps(snapshot))
+
+        instruments['instrument0']['parameters']['parameter0']['value'] = -1
+        self.snapshot = json.dumps(snapshot)
+        self.dataset = new_data_set('test-run')
+
+    def teardown(self):
+        remove_temp_database(self.tmpdir)
+        self.tmpdir = None
+
+    def time_add_snapshot(self):
+        self.dataset.add_snapshot(self.snapshot)
+
+    def track_stored_snapshot_size(self):
+        """The number of bytes of JSON stored for the snapshot of the run"""
+        sql = 'SELECT TOTAL(LENGTH(content)) FROM snapshots'
+        size_before = self.dataset.conn.execute(sql).fetchone()[0]
+        self.dataset.add_snapshot(self.snapshot)
+        return self.dataset.conn.execute(sql).fetchone()[0] - size_before
+    track_stored_snapshot_size.unit = 'bytes'
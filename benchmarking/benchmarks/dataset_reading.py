@@ -0,0 +1,210 @@
+"""
+This module contains code used for benchmarking reading data from the
+database used under the QCoDeS dataset: getting the data of a run, loading
+runs and preparing the data of a run for plotting.
+"""
+import os
+
+import numpy as np
+
+from qcodes.dataset.data_set import load_by_id
+from qcodes.dataset.data_export import (get_data_by_id,
+                                        get_shaped_data_by_runid,
+                                        datatype_from_setpoints_2d,
+                                        reshape_2D_data)
+from qcodes.dataset.database import close_connections
+from qcodes.dataset.hdf5_export import export_to_hdf5
+from qcodes.dataset.experiment_container import new_experiment
+
+from .common import fill_database, add_2d_run, use_database
+
+
+class GetData:
+    """
+    This benchmark measures how much time and memory it takes to get the
+    data of a run with a single setpoint, for several sizes of the run.
+    """
+
+    # The database is created once and shared by all benchmarks of this
+    # class, since filling it takes longer than the benchmarks themselves
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    params = [1000, 100000, 1000000]
+    param_names = ['n_values']
+
+    def setup_cache(self):
+        path = os.path.abspath('get_data.db')
+        return path, fill_database(path, self.params)
+
+    def setup(self, cache, n_values):
+        path, run_ids = cache
+        use_database(path)
+        self.dataset = load_by_id(run_ids[n_values])
+
+    def teardown(self, cache, n_values):
+        close_connections()
+
+    def time_get_data(self, cache, n_values):
+        self.dataset.get_data('x', 'y')
+
+    def time_get_data_as_arrays(self, cache, n_values):
+        self.dataset.get_data_as_arrays('x', 'y')
+
+    def time_get_setpoints(self, cache, n_values):
+        self.dataset.get_setpoints('y')
+
+    def time_get_parameter_data(self, cache, n_values):
+        self.dataset.get_parameter_data('y')
+
+    def peakmem_get_data(self, cache, n_values):
+        self.dataset.get_data('x', 'y')
+
+    def peakmem_get_data_as_arrays(self, cache, n_values):
+        self.dataset.get_data_as_arrays('x', 'y')
+
+
+class LoadById:
+    """
+    This benchmark measures the latency of loading a run (and its
+    parameters) from a database holding runs of several sizes.
+    """
+
+    params = [1000, 1000000]
+    param_names = ['n_values']
+    timeout = 600
+
+    def setup_cache(self):
+        path = os.path.abspath('load_by_id.db')
+        return path, fill_database(path, self.params)
+
+    def setup(self, cache, n_values):
+        path, run_ids = cache
+        use_database(path)
+        self.run_id = run_ids[n_values]
+
+    def teardown(self, cache, n_values):
+        close_connections()
+
+    def time_load_by_id(self, cache, n_values):
+        load_by_id(self.run_id)
+
+    def time_load_by_id_and_parameters(self, cache, n_values):
+        dataset = load_by_id(self.run_id)
+        dataset.paramspecs
+        len(dataset)
+
+
+class PlotDataPreparation:
+    """
+    This benchmark measures how much time and memory it takes to prepare
+    the data of a run on a rectangular grid for plotting, as done by
+    plot_by_id, for grids of several sizes.
+    """
+
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    params = [10, 100, 1000]
+    param_names = ['n_side']
+
+    def setup_cache(self):
+        path = os.path.abspath('plot_data.db')
+        use_database(path)
+        new_experiment("test-experiment", sample_name="test-sample")
+        run_ids = {n: add_2d_run(n, n) for n in self.params}
+        close_connections()
+        return path, run_ids
+
+    def setup(self, cache, n_side):
+        path, run_ids = cache
+        use_database(path)
+        self.run_id = run_ids[n_side]
+
+    def teardown(self, cache, n_side):
+        close_connections()
+
+    def time_get_data_by_id(self, cache, n_side):
+        get_data_by_id(self.run_id)
+
+    def time_get_shaped_data_by_runid(self, cache, n_side):
+        get_shaped_data_by_runid(self.run_id)
+
+    def peakmem_get_shaped_data_by_runid(self, cache, n_side):
+        get_shaped_data_by_runid(self.run_id)
+
+
+class ExportToHDF5:
+    """
+    This benchmark measures how much time and memory it takes to export a
+    run on a rectangular grid to an HDF5 file, for grids of several sizes.
+    The peak memory should not grow much with the size of the run, since
+    the run is exported in chunks.
+    """
+
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    params = [100, 1000]
+    param_names = ['n_side']
+
+    def setup_cache(self):
+        path = os.path.abspath('export.db')
+        use_database(path)
+        new_experiment("test-experiment", sample_name="test-sample")
+        run_ids = {n: add_2d_run(n, n) for n in self.params}
+        close_connections()
+        return path, run_ids
+
+    def setup(self, cache, n_side):
+        path, run_ids = cache
+        use_database(path)
+        self.run_id = run_ids[n_side]
+        self.export_path = os.path.abspath(f'export_{n_side}.h5')
+
+    def teardown(self, cache, n_side):
+        close_connections()
+        if os.path.exists(self.export_path):
+            os.remove(self.export_path)
+
+    def time_export_to_hdf5(self, cache, n_side):
+        export_to_hdf5(self.run_id, self.export_path)
+
+    def peakmem_export_to_hdf5(self, cache, n_side):
+        export_to_hdf5(self.run_id, self.export_path)
+
+
+class Gridding:
+    """
+    This benchmark measures how much time and memory it takes to detect the
+    kind of grid of the setpoints of a 2D map and to put its data on that
+    grid, for maps of 10^6 and 10^7 points, one of them interrupted in the
+    middle of a row.
+    """
+
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    params = ([1000, 3163], [False, True])
+    param_names = ['n_side', 'interrupted']
+
+    def setup(self, n_side, interrupted):
+        xx, yy = np.meshgrid(np.linspace(0, 1, n_side),
+                             np.linspace(-1, 1, n_side), indexing='ij')
+        n_points = n_side*n_side - (n_side//2 if interrupted else 0)
+        self.x = xx.ravel()[:n_points]
+        self.y = yy.ravel()[:n_points]
+        self.z = np.random.rand(n_points)
+
+    def time_datatype_from_setpoints_2d(self, n_side, interrupted):
+        datatype_from_setpoints_2d([self.x, self.y])
+
+    def time_reshape_2D_data(self, n_side, interrupted):
+        reshape_2D_data(self.x, self.y, self.z)
+
+    def peakmem_reshape_2D_data(self, n_side, interrupted):
+        reshape_2D_data(self.x, self.y, self.z)
@@ -0,0 +1,139 @@
+"""
+This module contains code used for benchmarking the socket transport of
+IPInstrument against a stand-in instrument server on the loopback
+interface: the round trip of short queries, the transfer of large traces
+as binary blocks or as text, and reading several instruments one after
+the other or concurrently with asyncio.
+"""
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+from qcodes.instrument.ip import IPInstrument
+from qcodes.utils.async_helpers import gather_get, run_coroutine
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if self.server.delay:
+                time.sleep(self.server.delay)
+            self.wfile.write(self.server.responses[line.strip()])
+
+
+class StandInServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """An instrument answering fixed queries with fixed responses"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, responses, delay=0):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.responses = responses
+        self.delay = delay
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class Query:
+    """
+    This benchmark measures the round trip of a short query, with and
+    without Nagle's algorithm.
+    """
+
+    params = [True, False]
+    param_names = ['nodelay']
+
+    def setup(self, nodelay):
+        self.server = StandInServer({b'VOLT?': b'+1.23456E-01\n'})
+        self.instrument = IPInstrument(
+            f'stand_in_{nodelay}', *self.server.server_address,
+            write_confirmation=False, read_terminator='\n', nodelay=nodelay)
+
+    def teardown(self, nodelay):
+        self.instrument.close()
+        self.server.close()
+
+    def time_ask(self, nodelay):
+        self.instrument.ask('VOLT?')
+
+
+class Trace:
+    """
+    This benchmark measures reading a trace of float32 values, as an
+    IEEE 488.2 binary block (into a new or a preallocated array) and as
+    comma-separated text.
+    """
+
+    params = [10_000, 1_000_000]
+    param_names = ['n_points']
+
+    def setup(self, n_points):
+        values = np.random.rand(n_points).astype('<f4')
+        data = values.tobytes()
+        length = str(len(data)).encode()
+        self.server = StandInServer({
+            b'TRAC?': b'#' + str(len(length)).encode() + length + data +
+                      b'\n',
+            b'TRAC:ASC?': ','.join(map(str, values)).encode() + b'\n'})
+        self.instrument = IPInstrument(
+            f'stand_in_{n_points}', *self.server.server_address,
+            write_confirmation=False, read_terminator='\n',
+            socket_buffer_size=1 << 20)
+        self.out = np.empty(n_points, dtype='<f4')
+
+    def teardown(self, n_points):
+        self.instrument.close()
+        self.server.close()
+
+    def time_binary_block(self, n_points):
+        self.instrument.ask_binary_block('TRAC?', dtype='<f4')
+
+    def time_binary_block_preallocated(self, n_points):
+        self.instrument.ask_binary_block('TRAC?', dtype='<f4', out=self.out)
+
+    def time_ascii(self, n_points):
+        np.array(self.instrument.ask('TRAC:ASC?').split(','), dtype='<f4')
+
+
+class Gather:
+    """
+    This benchmark measures reading a parameter of each of 4 instruments,
+    one after the other and concurrently with ``gather_get``, for
+    instruments that answer immediately and after a delay.
+    """
+
+    params = [0, 0.002]
+    param_names = ['delay']
+
+    def setup(self, delay):
+        self.servers = [StandInServer({b'VOLT?': b'+1.23456E-01\n'}, delay)
+                        for _ in range(4)]
+        self.instruments = []
+        for n, server in enumerate(self.servers):
+            instrument = IPInstrument(
+                f'stand_in_{n}', *server.server_address,
+                write_confirmation=False, read_terminator='\n')
+            instrument.add_parameter('voltage', get_cmd='VOLT?',
+                                     get_parser=float)
+            self.instruments.append(instrument)
+        self.parameters = [instrument.voltage
+                           for instrument in self.instruments]
+
+    def teardown(self, delay):
+        for instrument in self.instruments:
+            instrument.close()
+        for server in self.servers:
+            server.close()
+
+    def time_get(self, delay):
+        for parameter in self.parameters:
+            parameter.get()
+
+    def time_gather_get(self, delay):
+        run_coroutine(gather_get(self.parameters))
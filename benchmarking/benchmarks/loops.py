@@ -0,0 +1,41 @@
+"""
+This module contains code used for benchmarking the per-point overhead of
+running a Loop, with parameters that take no time to set and get, such that
+the time is spent in QCoDeS itself.
+"""
+from qcodes.instrument.parameter import ManualParameter
+from qcodes.loops import Loop
+from qcodes.station import Station
+
+
+class RunLoop:
+    """
+    This benchmark measures how long it takes to run 1D, 2D and 3D loops of
+    about 10^4 points, measuring two parameters at each point. The
+    points/second of a loop is the number of points over the time.
+    """
+
+    number = 1
+    repeat = 5
+
+    params = [1, 2, 3]
+    param_names = ['n_dims']
+
+    # number of setpoints of each loop, per dimensionality
+    shapes = {1: (10000,), 2: (100, 100), 3: (20, 20, 25)}
+
+    def setup(self, n_dims):
+        Station.default = None
+        self.setters = [ManualParameter(f'x{n}', initial_value=0)
+                        for n in range(n_dims)]
+        self.measured = [ManualParameter(f'y{n}', initial_value=n)
+                         for n in range(2)]
+        loops = [Loop(setter.sweep(0, 1, num=num))
+                 for setter, num in zip(self.setters, self.shapes[n_dims])]
+        loop = loops[0]
+        for inner in loops[1:]:
+            loop = loop.loop(inner.sweep_values)
+        self.loop = loop.each(*self.measured)
+
+    def time_run(self, n_dims):
+        self.loop.run(location=False, quiet=True)
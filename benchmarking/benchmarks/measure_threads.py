@@ -0,0 +1,44 @@
+"""
+This module contains code used for benchmarking the overhead of measuring
+parameters of several instruments in threads, as done on every point of a
+Loop run with use_threads.
+"""
+from qcodes.instrument.parameter import Parameter
+from qcodes.utils.threading import InstrumentThreadPool, thread_map
+
+
+class ThreadDispatch:
+    """
+    This benchmark measures the time it takes to get parameters of several
+    instruments at one point of a measurement in threads, when the gets
+    themselves take no time, i.e. the overhead of dispatching the gets to
+    threads and collecting their values.
+    """
+
+    params = ([2, 8], [1, 4])
+    param_names = ['n_instruments', 'params_per_instrument']
+
+    def setup(self, n_instruments, params_per_instrument):
+        self.parameters = [Parameter(f'p{n}_{m}', set_cmd=None,
+                                     initial_value=n)
+                           for n in range(n_instruments)
+                           for m in range(params_per_instrument)]
+        # parameters without instrument each get their own key, so use
+        # the index of the instrument to group them as if they had one
+        self.keys = [n for n in range(n_instruments)
+                     for m in range(params_per_instrument)]
+        self.getters = [p.get for p in self.parameters]
+        self.pool = InstrumentThreadPool()
+        self.pool.map(self.getters, self.keys)
+
+    def teardown(self, n_instruments, params_per_instrument):
+        self.pool.close()
+
+    def time_serial(self, n_instruments, params_per_instrument):
+        [g() for g in self.getters]
+
+    def time_thread_map(self, n_instruments, params_per_instrument):
+        thread_map(self.getters)
+
+    def time_thread_pool(self, n_instruments, params_per_instrument):
+        self.pool.map(self.getters, self.keys)
@@ -75,7 +75,7 @@ from qcodes.instrument_drivers.test import test_instruments, test_instrument
 
 from qcodes.dataset.data_set import new_data_set, load_by_counter, load_by_id
 from qcodes.dataset.experiment_container import new_experiment, load_experiment, load_experiment_by_name, \
-    load_last_experiment, experiments, load_or_create_experiment
+    load_last_experiment, experiments, load_or_create_experiment, run_catalog
 from qcodes.dataset.sqlite_settings import SQLiteSettings
 from qcodes.dataset.param_spec import ParamSpec
 from qcodes.dataset.database import initialise_database, \
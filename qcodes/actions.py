@@ -1,17 +1,28 @@
 """Actions, mainly to be executed in measurement Loops."""
+from collections import OrderedDict
+from functools import partial
 import time
+import warnings
 
 from qcodes.utils.helpers import is_function
-from qcodes.utils.threading import thread_map
+from qcodes.utils.threading import instrument_key
 
 
 _NO_SNAPSHOT = {'type': None, 'description': 'Action without snapshot'}
 
 
 # exception when threading is attempted used to simultaneously
-# query the same instrument for several values
+# query the same instrument for several values. This is no longer
+# raised, parameters of the same instrument are now read one after
+# the other by the thread of that instrument, so it is deprecated.
 class UnsafeThreadingException(Exception):
-    pass
+    def __init__(self, *args):
+        warnings.warn('UnsafeThreadingException is deprecated, because '
+                      'reading parameters of the same instrument with '
+                      'threads is safe now. It is never raised by QCoDeS '
+                      'and will be removed.', DeprecationWarning,
+                      stacklevel=2)
+        super().__init__(*args)
 
 
 def _actions_snapshot(actions, update):
@@ -109,22 +120,20 @@ class _Measure:
 
     This should not be constructed manually, only by an ActiveLoop.
     """
-    def __init__(self, params_indices, data_set, use_threads):
-        self.use_threads = use_threads and len(params_indices) > 1
-        # the applicable DataSet.store function
-        self.store = data_set.store
+    def __init__(self, params_indices, data_set, thread_pool=None):
+        # the applicable DataSet._store_points function
+        self.store_points = data_set._store_points
 
         # for performance, pre-calculate which params return data for
-        # multiple arrays, and the name mappings
+        # multiple arrays, and the arrays each param is stored in
         self.getters = []
+        self.keys = []
         self.param_ids = []
         self.composite = []
-        paramcheck = []  # list to check if parameters are unique
+        self.arrays = []
         for param, action_indices in params_indices:
             self.getters.append(param.get)
-
-            if param._instrument:
-                paramcheck.append((param, param._instrument))
+            self.keys.append(instrument_key(param))
 
             if hasattr(param, 'names'):
                 part_ids = []
@@ -133,38 +142,80 @@ class _Measure:
                     part_ids.append(param_id)
                 self.param_ids.append(None)
                 self.composite.append(part_ids)
+                self.arrays.append([data_set.arrays[part_id]
+                                    for part_id in part_ids])
             else:
                 param_id = data_set.action_id_map[action_indices]
                 self.param_ids.append(param_id)
                 self.composite.append(False)
-
-        if self.use_threads:
-            insts = [p[1] for p in paramcheck]
-            if (len(set(insts)) != len(insts)):
-                duplicates = [p for p in paramcheck if insts.count(p[1]) > 1]
-                raise UnsafeThreadingException('Can not use threading to '
-                                               'read '
-                                               'several things from the same '
-                                               'instrument. Specifically, you '
-                                               'asked for'
-                                               ' {}.'.format(duplicates))
+                self.arrays.append(data_set.arrays[param_id])
+
+        # parameters of the same ParameterGroup are read with one query:
+        # the first of them gets a getter for all of them, the others none
+        self.group_positions = None
+        groups = OrderedDict()
+        for i, (param, _) in enumerate(params_indices):
+            if getattr(param, 'group', None) is not None:
+                groups.setdefault(param.group, []).append(i)
+        groups = OrderedDict((group, positions)
+                             for group, positions in groups.items()
+                             if len(positions) > 1)
+        if groups:
+            grouped = {positions[0]: (group, positions)
+                       for group, positions in groups.items()}
+            skipped = {i for positions in groups.values()
+                       for i in positions[1:]}
+            getters, keys, self.group_positions = [], [], []
+            for i, (param, _) in enumerate(params_indices):
+                if i in grouped:
+                    group, positions = grouped[i]
+                    getters.append(partial(
+                        group.get, [params_indices[j][0] for j in positions]))
+                    keys.append(self.keys[i])
+                    self.group_positions.append(positions)
+                elif i not in skipped:
+                    getters.append(self.getters[i])
+                    keys.append(self.keys[i])
+                    self.group_positions.append(i)
+            self.getters, self.keys = getters, keys
+            self.n_params = len(params_indices)
+
+        # the parameters of each instrument are read one after the other by
+        # the worker of that instrument in the pool, so threads only help
+        # when more than one instrument is measured
+        self.thread_pool = thread_pool
+        self.use_threads = (thread_pool is not None and
+                            len(set(self.keys)) > 1)
 
     def __call__(self, loop_indices, **ignore_kwargs):
-        out_dict = {}
         if self.use_threads:
-            out = thread_map(self.getters)
+            out = self.thread_pool.map(self.getters, self.keys)
         else:
             out = [g() for g in self.getters]
 
-        for param_out, param_id, composite in zip(out, self.param_ids,
-                                                  self.composite):
+        if self.group_positions is not None:
+            out = self._ungroup(out)
+
+        arrays_values = []
+        for param_out, arrays, composite in zip(out, self.arrays,
+                                                self.composite):
             if composite:
-                for val, part_id in zip(param_out, composite):
-                    out_dict[part_id] = val
+                arrays_values.extend(zip(arrays, param_out))
             else:
-                out_dict[param_id] = param_out
+                arrays_values.append((arrays, param_out))
+
+        self.store_points(loop_indices, arrays_values)
 
-        self.store(loop_indices, out_dict)
+    def _ungroup(self, out):
+        """Put the values read by groups in the places of their params."""
+        values = [None] * self.n_params
+        for value, positions in zip(out, self.group_positions):
+            if isinstance(positions, list):
+                for i, group_value in zip(positions, value):
+                    values[i] = group_value
+            else:
+                values[positions] = value
+        return values
 
 
 class _Nest:
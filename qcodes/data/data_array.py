@@ -1,5 +1,6 @@
 import numpy as np
 import collections
+import os
 
 from qcodes.utils.helpers import DelegateAttributes, full_class, warn_units
 
@@ -79,6 +80,10 @@ class DataArray(DelegateAttributes):
             array, if already known (for example if this is a setpoint
             array). ``shape`` will be inferred from this array instead of
             from the ``shape`` argument.
+
+        memmap_file (Optional[str]): A path to keep the data of this array
+            in, as a memory-mapped ``.npy`` file, rather than in memory. Set
+            by a ``DataSet`` created with ``memmap=True``. Default None.
     """
 
     # attributes of self to include in the snapshot
@@ -111,7 +116,7 @@ class DataArray(DelegateAttributes):
     def __init__(self, parameter=None, name=None, full_name=None, label=None,
                  snapshot=None, array_id=None, set_arrays=(), shape=None,
                  action_indices=(), unit=None, units=None, is_setpoint=False,
-                 preset_data=None):
+                 preset_data=None, memmap_file=None):
         self.name = name
         self.full_name = full_name or name
         self.label = label
@@ -125,6 +130,7 @@ class DataArray(DelegateAttributes):
         self.is_setpoint = is_setpoint
         self.action_indices = action_indices
         self.set_arrays = set_arrays
+        self.memmap_file = memmap_file
 
         self._preset = False
 
@@ -230,11 +236,10 @@ class DataArray(DelegateAttributes):
         self.set_arrays = (set_array, ) + self.set_arrays
 
         if self._preset:
-            inner_data = self.ndarray
-            self.ndarray = np.ndarray(self.shape)
-            # existing preset array copied to every index of the nested array.
-            for i in range(size):
-                self.ndarray[i] = inner_data
+            # existing preset array repeated at every index of the nested
+            # array, as a read-only view that init_data copies into memory
+            # (or memmap_file) only once the full shape is known
+            self.ndarray = np.broadcast_to(self.ndarray, self.shape)
 
             # update modified_range so the entire array still looks modified
             self.modified_range = (0, self.ndarray.size - 1)
@@ -250,7 +255,9 @@ class DataArray(DelegateAttributes):
         The array will be sized based on either ``self.shape`` or
         data provided here.
 
-        Idempotent: will do nothing if the array already exists.
+        Idempotent: will do nothing if the array already exists, except
+        moving it into ``memmap_file`` if that is set and it is not there
+        yet, and copying a nested preset array into its own memory.
 
         If data is provided, this array is marked as a preset
         meaning it can still be nested around this data.
@@ -291,15 +298,45 @@ class DataArray(DelegateAttributes):
             if self.ndarray.shape != self.shape:
                 raise ValueError('data has already been initialized, '
                                  'but its shape doesn\'t match self.shape')
+            if (self.memmap_file is not None and
+                    not isinstance(self.ndarray, np.memmap) and
+                    not self.ndarray.dtype.hasobject):
+                data = self.ndarray
+                self.ndarray = self._new_ndarray(data.dtype)
+                self.ndarray[...] = data
+            elif not self.ndarray.flags.writeable:
+                # a nested preset array
+                self.ndarray = np.array(self.ndarray)
             return
         else:
-            self.ndarray = np.ndarray(self.shape)
+            self.ndarray = self._new_ndarray()
             self.clear()
         self._set_index_bounds()
 
+    def _new_ndarray(self, dtype=float):
+        """
+        Allocate an (uninitialized) array of ``self.shape``, in
+        ``memmap_file`` if that is set, so that only the parts of the array
+        in use are resident in memory.
+        """
+        if self.memmap_file is None:
+            return np.ndarray(self.shape, dtype=dtype)
+
+        directory = os.path.dirname(self.memmap_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return np.lib.format.open_memmap(self.memmap_file, mode='w+',
+                                         dtype=dtype, shape=self.shape)
+
     def _set_index_bounds(self):
         self._min_indices = [0 for d in self.shape]
         self._max_indices = [d - 1 for d in self.shape]
+        # the number of elements in the slice selected by each number of
+        # leading indices, and the flat stride of each index, such that
+        # _store_point does not need flat_index
+        self._slice_sizes = [int(np.prod(self.shape[i:], dtype=np.int64))
+                             for i in range(len(self.shape) + 1)]
+        self._flat_strides = self._slice_sizes[1:]
 
     def clear(self):
         """Fill the (already existing) data array with nan."""
@@ -307,7 +344,7 @@ class DataArray(DelegateAttributes):
         # also raise an error in this case? But generally float is
         # what people want anyway.
         if self.ndarray.dtype != float:
-            self.ndarray = self.ndarray.astype(float)
+            self.ndarray = self._new_ndarray()
         self.ndarray.fill(float('nan'))
 
     def __setitem__(self, loop_indices, value):
@@ -340,6 +377,27 @@ class DataArray(DelegateAttributes):
 
         self.ndarray.__setitem__(loop_indices, value)
 
+    def _store_point(self, loop_indices, value):
+        """
+        A faster ``__setitem__`` for the loop indices of a Loop, which are a
+        tuple of non-negative ints: the modified range is computed from the
+        strides of the array rather than with ``flat_index``.
+        """
+        self.ndarray[loop_indices] = value
+
+        low = 0
+        for index, stride in zip(loop_indices, self._flat_strides):
+            low += index * stride
+        high = low + self._slice_sizes[len(loop_indices)] - 1
+
+        if self.modified_range:
+            start, end = self.modified_range
+            if low < start or high > end:
+                self.modified_range = (low if low < start else start,
+                                       high if high > end else end)
+        else:
+            self.modified_range = (low, high)
+
     def __getitem__(self, loop_indices):
         return self.ndarray[loop_indices]
 
@@ -454,10 +512,14 @@ class DataArray(DelegateAttributes):
         if self.modified_range:
             latest_index = max(latest_index, self.modified_range[1])
 
-        vals = [
-            self.ndarray[np.unravel_index(i, self.ndarray.shape)]
-            for i in range(synced_index + 1, latest_index + 1)
-        ]
+        if latest_index <= synced_index:
+            return
+
+        # index only the changed values, so we don't touch (or page in)
+        # the rest of the array
+        flat_indices = np.arange(synced_index + 1, latest_index + 1)
+        vals = list(self.ndarray[np.unravel_index(flat_indices,
+                                                  self.ndarray.shape)])
 
         if vals:
             return {
@@ -480,9 +542,8 @@ class DataArray(DelegateAttributes):
             stop (int): the flat index of the last new value.
             vals (List[float]): the new values
         """
-        for i, val in enumerate(vals):
-            index = np.unravel_index(i + start, self.ndarray.shape)
-            self.ndarray[index] = val
+        flat_indices = np.arange(start, start + len(vals))
+        self.ndarray[np.unravel_index(flat_indices, self.ndarray.shape)] = vals
         self.synced_index = stop
 
     def __repr__(self):
@@ -7,6 +7,8 @@ from copy import deepcopy
 from collections import OrderedDict
 from typing import Dict, Callable
 
+import numpy as np
+
 from .gnuplot_format import GNUPlotFormat
 from .io import DiskIO
 from .location import FormatLocation
@@ -80,7 +82,7 @@ def new_data(location=None, loc_record=None, name=None, overwrite=False,
     return DataSet(location=location, io=io, **kwargs)
 
 
-def load_data(location=None, formatter=None, io=None):
+def load_data(location=None, formatter=None, io=None, memmap=False):
     """
     Load an existing DataSet.
 
@@ -100,6 +102,9 @@ def load_data(location=None, formatter=None, io=None):
             says the root data directory is the current working directory, ie
             where you started the python session.
 
+        memmap (bool, optional): read the data into memory-mapped files
+            instead of into memory, see ``DataSet``. Default False.
+
     Returns:
         A new ``DataSet`` object loaded with pre-existing data.
     """
@@ -107,7 +112,8 @@ def load_data(location=None, formatter=None, io=None):
         raise ValueError('location=False means a temporary DataSet, '
                          'which is incompatible with load_data')
 
-    data = DataSet(location=location, formatter=formatter, io=io)
+    data = DataSet(location=location, formatter=formatter, io=io,
+                   memmap=memmap)
     data.read_metadata()
     data.read()
     return data
@@ -148,6 +154,11 @@ class DataSet(DelegateAttributes):
             this and generally writes more often. Use None to disable writing
             from calls to ``self.store``. Default 5.
 
+        memmap (bool, optional): Keep the data of the arrays in
+            memory-mapped files in the ``memmap`` directory of the location,
+            instead of in memory, so that DataSets larger than the memory
+            spill to disk. Needs a location on disk. Default False.
+
     Attributes:
         background_functions (OrderedDict[callable]): Class attribute,
             ``{key: fn}``: ``fn`` is a callable accepting no arguments, and
@@ -172,11 +183,14 @@ class DataSet(DelegateAttributes):
     background_functions: Dict[str, Callable] = OrderedDict()
 
     def __init__(self, location=None, arrays=None, formatter=None, io=None,
-                 write_period=5):
+                 write_period=5, memmap=False):
         if location is False or isinstance(location, str):
             self.location = location
         else:
             raise ValueError('unrecognized location ' + repr(location))
+        if memmap and location is False:
+            raise ValueError('memmap needs a location to keep the data in, '
+                             'not False')
 
         # TODO: when you change formatter or io (and there's data present)
         # make it all look unsaved
@@ -187,6 +201,8 @@ class DataSet(DelegateAttributes):
         self.last_write = 0
         self.last_store = -1
 
+        self.memmap = memmap
+
         self.metadata = {}
 
         self.arrays = _PrettyPrintDict()
@@ -337,6 +353,10 @@ class DataSet(DelegateAttributes):
         # back-reference to the DataSet
         data_array.data_set = self
 
+        if self.memmap and data_array.memmap_file is None:
+            data_array.memmap_file = self.io.to_path(self.io.join(
+                self.location, 'memmap', data_array.array_id + '.npy'))
+
     def remove_array(self, array_id):
         """ Remove an array from a dataset
 
@@ -404,9 +424,30 @@ class DataSet(DelegateAttributes):
          """
         for array_id, value in ids_values.items():
             self.arrays[array_id][loop_indices] = value
-        self.last_store = time.time()
+        self._stored()
+
+    def _store_points(self, loop_indices, arrays_values):
+        """
+        Insert the data of one point of a Loop into our DataArrays, like
+        ``store`` but with the DataArrays already looked up, as done by the
+        actions an ActiveLoop compiles when it starts running.
+
+        Args:
+            loop_indices (tuple[int]): the indices within the loops we are
+                inside.
+            arrays_values (Sequence[Tuple[DataArray, Any]]): pairs of the
+                DataArray and the single number or slice to insert into it.
+        """
+        for array, value in arrays_values:
+            array._store_point(loop_indices, value)
+        self._stored()
+
+    def _stored(self):
+        """Write the data if the write period has passed since the last
+        write."""
+        self.last_store = now = time.time()
         if (self.write_period is not None and
-                time.time() > self.last_write + self.write_period):
+                now > self.last_write + self.write_period):
             log.debug('Attempting to write')
             self.write()
             self.last_write = time.time()
@@ -613,6 +654,10 @@ class DataSet(DelegateAttributes):
         if hasattr(self.formatter, 'close_file'):
             self.formatter.close_file(self)
 
+        for array in self.arrays.values():
+            if isinstance(array.ndarray, np.memmap):
+                array.ndarray.flush()
+
         if write_metadata:
             self.save_metadata()
 
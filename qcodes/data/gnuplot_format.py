@@ -3,6 +3,7 @@ import re
 import math
 import json
 import logging
+import warnings
 
 from qcodes.utils.helpers import deep_update, NumpyJSONEncoder
 from .data_array import DataArray
@@ -98,6 +99,10 @@ class GNUPlotFormat(Formatter):
         # number format (only used for writing; will read any number)
         self.number_format = '{:' + number_format + '}'
 
+        # the maximal number of rows that are formatted and written in one
+        # go, which bounds the memory used while writing
+        self.write_chunk_size = 100000
+
     def read_one_file(self, data_set, f, ids_read):
         """
         Called by Formatter.read to bring one data file into
@@ -145,8 +150,8 @@ class GNUPlotFormat(Formatter):
                 set_array = DataArray(label=labels[i], array_id=array_id,
                                       set_arrays=set_arrays, shape=set_shape,
                                       is_setpoint=True, snapshot=snap)
-                set_array.init_data()
                 data_set.add_array(set_array)
+                set_array.init_data()
 
             set_arrays = set_arrays + (set_array, )
             ids_read.add(array_id)
@@ -165,16 +170,20 @@ class GNUPlotFormat(Formatter):
                 data_array = DataArray(label=labels[i], array_id=array_id,
                                        set_arrays=set_arrays, shape=shape,
                                        snapshot=snap)
-                data_array.init_data()
                 data_set.add_array(data_array)
+                data_array.init_data()
             data_arrays.append(data_array)
             ids_read.add(array_id)
 
-        indices = [0] * ndim
-        first_point = True
+        # split the data lines into blocks of consecutive points of the
+        # inner loop, each with the number of blank lines before it
+        blocks = []
+        lines = []
         resetting = 0
+        comment_chars = self.comment_chars
         for line in f:
-            if self._is_comment(line):
+            # this is _is_comment, inlined as it is called for every line
+            if line.startswith(comment_chars):
                 continue
 
             # ignore leading or trailing whitespace (including in blank lines)
@@ -186,35 +195,37 @@ class GNUPlotFormat(Formatter):
                 # of setpoints that change, as there could be weird cases, like
                 # bidirectional sweeps, or highly diagonal sweeps, where this
                 # is incorrect. Anyway this really only matters for >2D sweeps.
-                if not first_point:
+                if lines:
+                    blocks.append((resetting, lines))
+                    lines = []
+                    resetting = 0
+                if blocks:
                     resetting += 1
                 continue
 
-            values = tuple(map(float, line.split()))
+            lines.append(line)
+        if lines:
+            blocks.append((resetting, lines))
 
+        n_values = ndim + len(data_arrays)
+        indices = [0] * ndim
+        for resetting, lines in blocks:
             if resetting:
                 indices[-resetting - 1] += 1
                 indices[-resetting:] = [0] * resetting
-                resetting = 0
 
-            for value, set_array in zip(values[:ndim], set_arrays):
-                nparray = set_array.ndarray
-                myindices = tuple(indices[:nparray.ndim])
-                stored_value = nparray[myindices]
-                if math.isnan(stored_value):
-                    nparray[myindices] = value
-                elif stored_value != value:
-                    raise ValueError('inconsistent setpoint values',
-                                     stored_value, value, set_array.name,
-                                     myindices, indices)
-
-            for value, data_array in zip(values[ndim:], data_arrays):
-                # set .ndarray directly to avoid the overhead of __setitem__
-                # which updates modified_range on every call
-                data_array.ndarray[tuple(indices)] = value
+            values = self._parse_block(lines, n_values)
+            if values is None:
+                # not all lines have one value per array, so read them one
+                # by one like a partially written file
+                for line in lines:
+                    self._read_point(indices, tuple(map(float, line.split())),
+                                     set_arrays, data_arrays)
+                    indices[-1] += 1
+                continue
 
-            indices[-1] += 1
-            first_point = False
+            self._read_block(indices, values, set_arrays, data_arrays)
+            indices[-1] += len(lines)
 
         # Since we skipped __setitem__, back up to the last read point and
         # mark it as saved that far.
@@ -224,6 +235,99 @@ class GNUPlotFormat(Formatter):
         for array in set_arrays + tuple(data_arrays):
             array.mark_saved(array.flat_index(indices[:array.ndim]))
 
+    @staticmethod
+    def _parse_block(lines, n_values):
+        """
+        Parse data lines at once into an array with one row per line, or
+        return None if not every line holds n_values numbers.
+        """
+        with warnings.catch_warnings():
+            # numpy warns (and will raise) if it cannot parse the whole text
+            warnings.simplefilter('ignore', DeprecationWarning)
+            try:
+                values = np.fromstring(' '.join(lines), sep=' ')
+            except ValueError:
+                return None
+        if values.size != len(lines) * n_values:
+            return None
+        return values.reshape(len(lines), n_values)
+
+    @staticmethod
+    def _read_point(indices, values, set_arrays, data_arrays):
+        """
+        Put the values of the data line of a single point into the arrays.
+        """
+        for value, set_array in zip(values, set_arrays):
+            nparray = set_array.ndarray
+            myindices = tuple(indices[:nparray.ndim])
+            stored_value = nparray[myindices]
+            if math.isnan(stored_value):
+                nparray[myindices] = value
+            elif stored_value != value:
+                raise ValueError('inconsistent setpoint values',
+                                 stored_value, value, set_array.name,
+                                 myindices, indices)
+
+        for value, data_array in zip(values[len(set_arrays):], data_arrays):
+            # set .ndarray directly to avoid the overhead of __setitem__
+            # which updates modified_range on every call
+            data_array.ndarray[tuple(indices)] = value
+
+    @staticmethod
+    def _read_block(indices, values, set_arrays, data_arrays):
+        """
+        Put the values of the data lines of consecutive points of the inner
+        loop into the arrays, starting at indices, as _read_point would do
+        for each of them.
+        """
+        n_points = len(values)
+        outer = tuple(indices[:-1])
+        inner = slice(indices[-1], indices[-1] + n_points)
+        if indices[-1] + n_points > set_arrays[-1].shape[-1]:
+            # like _read_point would, fail at the first point past the end
+            raise IndexError('too many points in the inner loop')
+
+        for column, set_array in zip(values.T, set_arrays):
+            nparray = set_array.ndarray
+            if nparray.ndim < len(indices):
+                # an outer setpoint, which is the same for the whole block:
+                # the first value stored must be repeated by all later ones
+                myindices = tuple(indices[:nparray.ndim])
+                stored = np.append(nparray[myindices], column)
+            else:
+                myindices = outer + (inner,)
+                stored = nparray[myindices]
+            is_nan = np.isnan(stored)
+            if nparray.ndim < len(indices):
+                first = np.argmin(is_nan)
+                if is_nan[first]:
+                    continue
+                bad = stored[first + 1:] != stored[first]
+                if bad.any():
+                    # stored starts with the value stored before the block
+                    point = first + np.argmax(bad)
+                    raise ValueError('inconsistent setpoint values',
+                                     stored[first], column[point],
+                                     set_array.name, myindices,
+                                     list(outer) + [indices[-1] + point])
+                nparray[myindices] = stored[first]
+            else:
+                bad = ~is_nan & (stored != column)
+                if bad.any():
+                    point = np.argmax(bad)
+                    raise ValueError('inconsistent setpoint values',
+                                     stored[point], column[point],
+                                     set_array.name,
+                                     outer + (indices[-1] + point,),
+                                     list(outer) + [indices[-1] + point])
+                stored[is_nan] = column[is_nan]
+
+        for column, data_array in zip(values.T[len(set_arrays):],
+                                      data_arrays):
+            # set .ndarray directly to avoid the overhead of __setitem__
+            # which updates modified_range on every call
+            data_array.ndarray[outer + (inner,)] = column
+
     def _is_comment(self, line):
         return line[:self.comment_len] == self.comment_chars
 
@@ -298,27 +402,17 @@ class GNUPlotFormat(Formatter):
 
             overwrite = save_range[0] == 0 or force_write
             open_mode = 'w' if overwrite else 'a'
-            shape = group.set_arrays[-1].shape
 
             with io_manager.open(fn, open_mode) as f:
                 if overwrite:
                     f.write(self._make_header(group))
                     log.debug('Wrote header to file')
 
-                for i in range(save_range[0], save_range[1] + 1):
-                    indices = np.unravel_index(i, shape)
-
-                    # insert a blank line for each loop that reset (to index 0)
-                    # note that if *all* indices are zero (the first point)
-                    # we won't put any blanks
-                    for j, index in enumerate(reversed(indices)):
-                        if index != 0:
-                            if j:
-                                f.write(self.terminator * j)
-                            break
-
-                    one_point = self._data_point(group, indices)
-                    f.write(self.separator.join(one_point) + self.terminator)
+                for start in range(save_range[0], save_range[1] + 1,
+                                   self.write_chunk_size):
+                    stop = min(start + self.write_chunk_size,
+                               save_range[1] + 1)
+                    f.write(self._format_rows(group, start, stop))
                 log.debug('Wrote to file from '
                           '{} to {}'.format(save_range[0], save_range[1]+1))
             # now that we've saved the data, mark it as such in the data.
@@ -396,9 +490,40 @@ class GNUPlotFormat(Formatter):
     def _comment_line(self, items):
         return self.comment + self.separator.join(items) + self.terminator
 
-    def _data_point(self, group, indices):
-        for array in group.set_arrays:
-            yield self.number_format.format(array[indices[:array.ndim]])
+    def _format_rows(self, group, start, stop):
+        """
+        Format the rows of a group from flat index start up to (excluding)
+        stop, including the blank lines before each row at which loops
+        reset (to index 0).
+        """
+        shape = group.set_arrays[-1].shape
+        flat_indices = np.arange(start, stop)
 
+        columns = []
+        for array in group.set_arrays:
+            # an outer setpoint is repeated for every point of the inner
+            # loops
+            inner_size = int(np.prod(shape[array.ndim:], dtype=np.int64))
+            values = array.ndarray.reshape(-1)
+            columns.append(values[flat_indices // inner_size].tolist())
         for array in group.data:
-            yield self.number_format.format(array[indices])
+            columns.append(array.ndarray.reshape(-1)[start:stop].tolist())
+
+        row_format = (self.separator.join([self.number_format] *
+                                          len(columns)) + self.terminator)
+        rows = [row_format.format(*row) for row in zip(*columns)]
+
+        # insert a blank line for each loop that reset (to index 0) before
+        # the first row of each inner loop. Note that if *all* indices are
+        # zero (the first point) we won't put any blanks
+        sizes = [int(np.prod(shape[-j:], dtype=np.int64))
+                 for j in range(1, len(shape))]
+        if sizes:
+            first = max(-(-start // sizes[0]) * sizes[0], sizes[0])
+            for i in range(first, stop, sizes[0]):
+                n_blank = 1
+                while n_blank < len(sizes) and i % sizes[n_blank] == 0:
+                    n_blank += 1
+                rows[i - start] = self.terminator * n_blank + rows[i - start]
+
+        return ''.join(rows)
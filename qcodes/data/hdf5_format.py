@@ -15,10 +15,29 @@ class HDF5Format(Formatter):
 
     Capable of storing (write) and recovering (read) qcodes datasets.
 
+    Every DataArray is stored as an hdf5 dataset of the same shape, filled
+    with NaN where no data has been written yet. Incremental writes only
+    write the part of each array that has been modified since it was last
+    saved, see ``DataArray.modified_range``.
+
+    Args:
+        chunks (Union[bool, tuple]): The chunk shape of the hdf5 datasets,
+            or True to let h5py choose one (default), or None for contiguous
+            (unchunked) datasets. h5py chooses the chunk shape of arrays of
+            another dimensionality than a given chunk shape.
+        compression (Optional[str]): The compression filter of the hdf5
+            datasets, e.g. 'gzip' or 'lzf'. Default None, no compression.
+        compression_opts: Options for the compression filter, e.g. the
+            level (0-9) of 'gzip'.
     """
 
     _format_tag = 'hdf5'
 
+    def __init__(self, chunks=True, compression=None, compression_opts=None):
+        self.chunks = chunks
+        self.compression = compression
+        self.compression_opts = compression_opts
+
     def close_file(self, data_set):
         """
         Closes the hdf5 file open in the dataset.
@@ -97,9 +116,12 @@ class HDF5Format(Formatter):
             set_arrays = [s.decode() for s in set_arrays]
             # else:
             #     set_arrays = ()
-            vals = dat_arr.value[:, 0]
-            if 'shape' in dat_arr.attrs.keys():
+            vals = dat_arr[()]
+            if ('shape' in dat_arr.attrs.keys() and
+                    tuple(dat_arr.attrs['shape']) != vals.shape):
+                # written with the flat (n, 1) layout of older versions,
                 # extend with NaN if needed
+                vals = vals[:, 0]
                 esize = np.prod(dat_arr.attrs['shape'])
                 vals = np.append(vals, [np.nan] * (esize - vals.size))
                 vals = vals.reshape(dat_arr.attrs['shape'])
@@ -117,7 +139,7 @@ class HDF5Format(Formatter):
                 d_array.unit = unit
                 d_array.is_setpoint = is_setpoint
                 d_array.ndarray = vals
-                d_array.shape = dat_arr.attrs['shape']
+                d_array.shape = vals.shape
             # needed because I cannot add set_arrays at this point
             data_set.arrays[array_id]._sa_array_ids = set_arrays
 
@@ -199,32 +221,35 @@ class HDF5Format(Formatter):
         else:
             arr_group = data_set._h5_base_group[data_name]
 
-        for array_id in data_set.arrays.keys():
-            if array_id not in arr_group.keys() or force_write:
-                self._create_dataarray_dset(array=data_set.arrays[array_id],
-                                            group=arr_group)
-            dset = arr_group[array_id]
-            # Resize the dataset and add the new values
-
-            # dataset refers to the hdf5 dataset here
-            datasetshape = dset.shape
-            old_dlen = datasetshape[0]
-            x = data_set.arrays[array_id]
-            try:
-                # get latest NaN element
-                new_dlen = (~np.isnan(x)).flatten().nonzero()[0][-1] + 1
-            except IndexError:
-                new_dlen = old_dlen
-
-            new_datasetshape = (new_dlen,
-                                datasetshape[1])
-            dset.resize(new_datasetshape)
-            new_data_shape = (new_dlen - old_dlen, datasetshape[1])
-            dset[old_dlen:new_dlen] = x[old_dlen:new_dlen].reshape(
-                new_data_shape)
-            # allow resizing extracted data, here so it gets written for
-            # incremental writes aswell
-            dset.attrs['shape'] = x.shape
+        for array_id, array in data_set.arrays.items():
+            if array_id in arr_group.keys() and (
+                    force_write or arr_group[array_id].shape != array.shape):
+                del arr_group[array_id]
+
+            if array_id not in arr_group.keys():
+                dset = self._create_dataarray_dset(array=array,
+                                                   group=arr_group)
+                # everything in memory that was ever written or modified
+                # goes into a new dataset, or all of the array if it was
+                # filled without keeping track of that
+                saved = [i for i in (array.last_saved_index,
+                                     (array.modified_range or (None,))[-1])
+                         if i is not None]
+                save_range = (0, max(saved) if saved else
+                              array.ndarray.size - 1)
+            else:
+                dset = arr_group[array_id]
+                save_range = array.modified_range
+
+            if save_range is None:
+                continue
+
+            # write only the modified part of the array, in its shape
+            for index in _flat_range_slices(array.shape, save_range[0],
+                                            save_range[1] + 1):
+                dset[index] = array.ndarray[index]
+            array.mark_saved(save_range[1])
+
         if write_metadata:
             self.write_metadata(
                 data_set, io_manager=io_manager, location=location)
@@ -254,10 +279,18 @@ class HDF5Format(Formatter):
         else:
             name = array.array_id
 
-        # Create the hdf5 dataset
+        # Create the hdf5 dataset, NaN until written if it can hold NaN
+        dtype = array.ndarray.dtype
+        fillvalue = np.nan if np.issubdtype(dtype, np.floating) else None
+        chunks = self.chunks
+        if isinstance(chunks, tuple) and len(chunks) != array.ndarray.ndim:
+            chunks = True
+        if not array.ndarray.size:
+            chunks = None
         dset = group.create_dataset(
-            array.array_id, (0, 1),
-            maxshape=(None, 1))
+            array.array_id, shape=array.shape, dtype=dtype,
+            chunks=chunks, compression=self.compression,
+            compression_opts=self.compression_opts, fillvalue=fillvalue)
         dset.attrs['label'] = _encode_to_utf8(str(label))
         dset.attrs['name'] = _encode_to_utf8(str(name))
         dset.attrs['unit'] = _encode_to_utf8(str(array.unit or ''))
@@ -269,6 +302,7 @@ class HDF5Format(Formatter):
             set_arrays += [_encode_to_utf8(
                 str(array.set_arrays[i].array_id))]
         dset.attrs['set_arrays'] = set_arrays
+        dset.attrs['shape'] = array.shape
 
         return dset
 
@@ -466,6 +500,41 @@ class HDF5Format(Formatter):
         return data_dict
 
 
+def _flat_range_slices(shape, start, stop):
+    """
+    Yield the indices (tuples of slices) of the blocks of an array of the
+    given shape that together make up the elements with the flat (C order)
+    indices from start up to (excluding) stop. Every block is a contiguous
+    part of the array, there are at most 2 blocks per dimension.
+    """
+    if start >= stop:
+        return
+    if len(shape) <= 1:
+        yield (slice(start, stop),)
+        return
+
+    inner_size = int(np.prod(shape[1:], dtype=np.int64))
+    first, start_offset = divmod(start, inner_size)
+    last, stop_offset = divmod(stop, inner_size)
+
+    if first == last:
+        for index in _flat_range_slices(shape[1:], start_offset,
+                                        stop_offset):
+            yield (slice(first, first + 1),) + index
+        return
+
+    if start_offset:
+        for index in _flat_range_slices(shape[1:], start_offset,
+                                        inner_size):
+            yield (slice(first, first + 1),) + index
+        first += 1
+    if last > first:
+        yield (slice(first, last),) + (slice(None),) * (len(shape) - 1)
+    if stop_offset:
+        for index in _flat_range_slices(shape[1:], 0, stop_offset):
+            yield (slice(last, last + 1),) + index
+
+
 def _encode_to_utf8(s):
     """
     Required because h5py does not support python3 strings
@@ -3,8 +3,6 @@ import logging
 
 import numpy as np
 
-from qcodes.dataset.sqlite_base import (get_dependencies, get_dependents,
-                                        get_layout)
 from qcodes.dataset.data_set import load_by_id
 
 log = logging.getLogger(__name__)
@@ -30,27 +28,23 @@ def get_data_by_id(run_id: int) -> List:
     """
     Load data from database and reshapes into 1D arrays with minimal
     name, unit and label metadata.
+
+    The layouts and dependencies of the run are loaded once, and the data
+    of each dependent parameter and its setpoints is fetched with a single
+    query.
     """
 
     data = load_by_id(run_id)
-    conn = data.conn
-    deps = get_dependents(conn, run_id)
     output = []
-    for dep in deps:
-
-        dependencies = get_dependencies(conn, dep)
-        data_axis = get_layout(conn, dep)
-        rawdata = data.get_values(data_axis['name'])
-        data_axis['data'] = flatten_1D_data_for_plot(rawdata)
-        raw_setpoint_data = data.get_setpoints(data_axis['name'])
+    for dependent in data.dependency_graph:
+        parameter_data = data.get_parameter_data(dependent)
         my_output = []
 
-        for i, dependency in enumerate(dependencies):
-            axis = get_layout(conn, dependency[0])
-            axis['data'] = flatten_1D_data_for_plot(raw_setpoint_data[i])
+        for name, values in parameter_data.items():
+            axis = dict(data.layouts[name])
+            axis['data'] = values
             my_output.append(axis)
 
-        my_output.append(data_axis)
         output.append(my_output)
     return output
 
@@ -62,18 +56,17 @@ def _all_steps_multiples_of_min_step(rows: Sequence[np.ndarray]) -> bool:
     to a regular grid
 
     Args:
-        rows: the output of _rows_from_datapoints
+        rows: the output of _rows_from_datapoints (or of
+            _distinct_rows_from_datapoints, since identical rows have
+            identical steps)
 
     Returns:
         The answer to the question
     """
 
-    steps: List[np.ndarray] = []
-    for row in rows:
-        # TODO: What is an appropriate precision?
-        steps += list(np.unique(np.diff(row).round(decimals=15)))
-
-    steps = np.unique((steps))
+    # TODO: What is an appropriate precision?
+    steps = np.unique(np.concatenate([np.diff(row).round(decimals=15)
+                                      for row in rows]))
     remainders = np.mod(steps[1:]/steps[0], 1)
 
     # TODO: What are reasonable tolerances for allclose?
@@ -82,6 +75,43 @@ def _all_steps_multiples_of_min_step(rows: Sequence[np.ndarray]) -> bool:
     return asmoms
 
 
+def _unique_with_counts(setpoints: np.ndarray) -> Tuple[np.ndarray,
+                                                        np.ndarray]:
+    """
+    Sort the setpoints into their unique values and the number of times
+    each of those values occurs. This is the only sort needed for
+    analysing the setpoints of one axis
+
+    Args:
+        setpoints: The raw setpoints as a one-dimensional array
+
+    Returns:
+        The sorted unique values and their counts
+    """
+    return np.unique(setpoints, return_counts=True)
+
+
+def _distinct_rows_from_datapoints(values: np.ndarray,
+                                   counts: np.ndarray) -> List[np.ndarray]:
+    """
+    Get the distinct rows of _rows_from_datapoints from the output of
+    _unique_with_counts without building all the rows.
+
+    Row k of _rows_from_datapoints holds the values that occur more than k
+    times, so the rows only change where k passes one of the counts, and
+    each row is contained in all the rows before it.
+
+    Args:
+        values: The sorted unique setpoint values
+        counts: The number of times each value occurs
+
+    Returns:
+        A list of the distinct rows, the longest first
+    """
+    thresholds = np.unique(counts)
+    return [values] + [values[counts > t] for t in thresholds[:-1]]
+
+
 def _rows_from_datapoints(inputsetpoints: np.ndarray) -> np.ndarray:
     """
     Cast the (potentially) unordered setpoints into rows
@@ -96,25 +126,13 @@ def _rows_from_datapoints(inputsetpoints: np.ndarray) -> np.ndarray:
         A ndarray of the rows
     """
 
-    rows = []
-    setpoints = inputsetpoints.copy()
-
-    # first check if there is only one unique array in which case we can avoid the
-    # potentially slow loop below
-    temp, inds, count = np.unique(setpoints, return_index=True,
-                                  return_counts=True)
-    num_repeats_array = np.unique(count)
-    if len(num_repeats_array) == 1 and count.sum() == len(inputsetpoints):
-        return np.tile(temp, (num_repeats_array[0], 1))
-    else:
-        rows.append(temp)
-        setpoints = np.delete(setpoints, inds)
-
-    while len(setpoints) > 0:
-        temp, inds = np.unique(setpoints, return_index=True)
-        rows.append(temp)
-        setpoints = np.delete(setpoints, inds)
+    values, counts = _unique_with_counts(inputsetpoints)
+    num_repeats_array = np.unique(counts)
+    if len(num_repeats_array) == 1:
+        return np.tile(values, (num_repeats_array[0], 1))
 
+    # row k holds the values that occur more than k times
+    rows = [values[counts > k] for k in range(counts.max())]
     return np.array(rows)
 
 
@@ -157,7 +175,7 @@ def _all_in_group_or_subgroup(rows: np.ndarray) -> bool:
     # are all contained in the rows of the other
     if aigos and switchindex > 0:
         for row in rows[1+switchindex:]:
-            if sum([r in rows[0] for r in row]) != len(row):
+            if not np.all(np.isin(row, rows[0])):
                 aigos = False
                 break
 
@@ -216,16 +234,20 @@ def datatype_from_setpoints_2d(setpoints: List[np.ndarray]) -> str:
         return 'point'
 
     # Now check if this is a simple rectangular sweep,
-    # possibly interrupted in the middle of one row
+    # possibly interrupted in the middle of one row.
+    # The rows of _rows_from_datapoints are never built: the rows are nested
+    # by construction, so they fall into at most two groups exactly when the
+    # values occur with at most two different counts, and the number of rows
+    # is the largest count
 
-    xrows = _rows_from_datapoints(xpoints)
-    yrows = _rows_from_datapoints(ypoints)
+    xvalues, xcounts = _unique_with_counts(xpoints)
+    yvalues, ycounts = _unique_with_counts(ypoints)
 
-    x_check = _all_in_group_or_subgroup(xrows)
-    y_check = _all_in_group_or_subgroup(yrows)
+    xrows = _distinct_rows_from_datapoints(xvalues, xcounts)
+    yrows = _distinct_rows_from_datapoints(yvalues, ycounts)
 
-    x_check = x_check and (len(xrows[0]) == len(yrows))
-    y_check = y_check and (len(yrows[0]) == len(xrows))
+    x_check = len(xrows) <= 2 and len(xvalues) == ycounts.max()
+    y_check = len(yrows) <= 2 and len(yvalues) == xcounts.max()
 
     # this is the check that we are on a "simple" grid
     if y_check and x_check:
@@ -240,26 +262,48 @@ def datatype_from_setpoints_2d(setpoints: List[np.ndarray]) -> str:
 
     return 'unknown'
 
+
+def reshape_data_on_grid(setpoints: Sequence[np.ndarray],
+                         data: np.ndarray) -> Tuple[List[np.ndarray],
+                                                    np.ndarray]:
+    """
+    Put the data of an N-D sweep on the grid spanned by the unique values
+    of each of its setpoints. Points of the grid that were not measured,
+    e.g. because the sweep was interrupted, are filled with NaN.
+
+    The setpoints are mapped to grid indices with a single sort per axis, so
+    this takes O(N log N) time for N points independent of the size of the
+    grid.
+
+    Args:
+        setpoints: The setpoints of each axis as one-dimensional arrays of
+            the same length as the data
+        data: The measured values as a one-dimensional array
+
+    Returns:
+        The sorted unique setpoint values of each axis and the data as an
+            array with one dimension per axis, in the order of the setpoints
+    """
+    axes = []
+    indices = []
+    for points in setpoints:
+        axis, index = np.unique(points, return_inverse=True)
+        axes.append(axis)
+        indices.append(index)
+
+    data = np.asarray(data)
+    shaped = np.full(tuple(len(axis) for axis in axes), np.nan,
+                     dtype=np.result_type(data, np.float64))
+    shaped[tuple(indices)] = data
+
+    return axes, shaped
+
+
 def reshape_2D_data(x: np.ndarray, y: np.ndarray,
                     z: np.ndarray) -> Tuple[np.ndarray, np.ndarray,
                                             np.ndarray]:
-    xrow = np.array(_rows_from_datapoints(x)[0])
-    yrow = np.array(_rows_from_datapoints(y)[0])
-    nx = len(xrow)
-    ny = len(yrow)
-
-
-    # potentially slow method of filling in the data, should be optimised
     log.debug('Sorting 2D data onto grid')
-    z_to_plot = np.full((ny, nx), np.nan)
-    x_index = np.zeros_like(x, dtype=np.int)
-    y_index = np.zeros_like(y, dtype=np.int)
-    for i, xval in enumerate(xrow):
-        x_index[np.where(x==xval)[0]] = i
-    for i, yval in enumerate(yrow):
-        y_index[np.where(y==yval)[0]] = i
-
-    z_to_plot[y_index, x_index] = z
+    (yrow, xrow), z_to_plot = reshape_data_on_grid([y, x], z)
 
     return xrow, yrow, z_to_plot
 
@@ -7,37 +7,52 @@
 # Distributed under terms of the MIT license.
 # import json
 import functools
-from typing import Any, Dict, List, Optional, Union, Sized, Callable
-from threading import Thread
+import itertools
+import json
+from collections import OrderedDict
+from typing import (Any, Dict, List, Optional, Tuple, Union, Sized,
+                    Callable)
+from threading import Thread, Condition, current_thread
 import time
+from time import monotonic
 import logging
 import hashlib
+import sqlite3
 import uuid
-from queue import Queue, Empty
 import warnings
 
+import numpy as np
+
 import qcodes.config
 from qcodes.dataset.param_spec import ParamSpec
 from qcodes.instrument.parameter import _BaseParameter
 from qcodes.dataset.sqlite_base import (atomic, atomic_transaction,
                                         transaction, add_parameter,
-                                        connect, create_run, completed,
+                                        create_run, completed,
                                         get_parameters,
                                         get_experiments,
                                         get_last_experiment, select_one_where,
                                         length, modify_values,
                                         add_meta_data, mark_run_complete,
-                                        modify_many_values, insert_values,
-                                        insert_many_values,
+                                        modify_many_values, modify_columns,
+                                        insert_values,
+                                        insert_many_values, insert_columns,
                                         VALUE, VALUES, get_data,
+                                        get_data_as_arrays,
                                         get_values,
                                         get_setpoints,
+                                        get_dependency_graph, get_layouts,
+                                        get_dependent_data_as_arrays,
+                                        get_last_rowid, get_rows_after,
                                         get_metadata, one,
+                                        insert_snapshot, get_run_snapshot,
                                         get_experiment_name_from_experiment_id,
                                         get_sample_name_from_experiment_id,
                                         get_run_timestamp_from_run_id,
                                         get_completed_timestamp_from_run_id)
-from qcodes.dataset.database import get_DB_location
+from qcodes.dataset.database import (get_DB_location, get_DB_debug,
+                                     get_connection, pooled_connection_key,
+                                     close_connections)
 # TODO: as of now every time a result is inserted with add_result the db is
 # saved same for add_results. IS THIS THE BEHAVIOUR WE WANT?
 
@@ -67,11 +82,21 @@ class CompletedError(RuntimeError):
 class _Subscriber(Thread):
     """
     Class to add a subscriber to a DataSet. The subscriber gets called
-    every time an insert is made to the results_table.
+    with the results of every batch of results that is committed to the
+    results_table.
 
     The _Subscriber is not meant to be instantiated directly, but rather used
     via the 'subscribe' method of the DataSet.
 
+    The DataSet notifies the subscriber after each commit of results, and
+    the subscriber thread then reads the new results from the database on
+    its own connection, such that the writer does not pay for the dispatch.
+    The thread waits on a condition variable until at least
+    min_queue_length new results have been committed and at least min_wait
+    milliseconds have passed since its last callback. Once the DataSet is
+    completed, the callback is called a last time with the remaining
+    results.
+
     NOTE: A subscriber should be added *after* all parameters have been added.
 
     NOTE: Special care shall be taken when using the *state* object: it is the user's
@@ -82,24 +107,31 @@ class _Subscriber(Thread):
                  id_: str,
                  callback: Callable[..., None],
                  state: Optional[Any] = None,
-                 loop_sleep_time: int = 0,  # in milliseconds
+                 min_wait: int = 0,  # in milliseconds
                  min_queue_length: int = 1,
-                 callback_kwargs: Optional[Dict[str, Any]]=None
+                 callback_kwargs: Optional[Dict[str, Any]]=None,
+                 columnar: bool = False
                  ) -> None:
-        super().__init__()
+        super().__init__(daemon=True)
 
         self._id = id_
 
         self.dataSet = dataSet
         self.table_name = dataSet.table_name
+        self._path_to_db = dataSet.path_to_db
+        self._columns = [p.name for p in dataSet.get_parameters()]
         self._data_set_len = len(dataSet)
+        self._last_rowid = get_last_rowid(dataSet.conn, self.table_name)
 
         self.state = state
+        self.columnar = columnar
 
-        self.data_queue: Queue = Queue()
+        self._condition = Condition()
         self._queue_length: int = 0
         self._stop_signal: bool = False
-        self._loop_sleep_time = loop_sleep_time / 1000  # convert milliseconds to seconds
+        self._completed: bool = False
+        self._min_wait = min_wait / 1000  # convert milliseconds to seconds
+        self._last_call_time = 0.0
         self.min_queue_length = min_queue_length
 
         if callback_kwargs is None:
@@ -107,74 +139,93 @@ class _Subscriber(Thread):
         else:
             self.callback = functools.partial(callback, **callback_kwargs)
 
-        self.callback_id = f"callback{self._id}"
-
-        conn = dataSet.conn
-
-        conn.create_function(self.callback_id, -1, self._cache_data_to_queue)
-
-        parameters = dataSet.get_parameters()
-        sql_param_list = ",".join([f"NEW.{p.name}" for p in parameters])
-        sql_create_trigger_for_callback = f"""
-        CREATE TRIGGER sub{self._id}
-            AFTER INSERT ON '{self.table_name}'
-        BEGIN
-            SELECT {self.callback_id}({sql_param_list});
-        END;"""
-        atomic_transaction(conn, sql_create_trigger_for_callback)
-
         self.log = logging.getLogger(f"_Subscriber {self._id}")
 
-    def _cache_data_to_queue(self, *args) -> None:
-        self.log.debug(f"Args:{args} put into queue for {self.callback_id}")
-        self.data_queue.put(args)
-        self._data_set_len += 1
-        self._queue_length += 1
+    def notify(self, no_of_results: int) -> None:
+        """
+        Notify the subscriber that a batch of results has been committed
+        """
+        with self._condition:
+            self._queue_length += no_of_results
+            self._condition.notify()
 
     def run(self) -> None:
         self.log.debug("Starting subscriber")
-        self._loop()
-
-    @staticmethod
-    def _exhaust_queue(queue: Queue) -> List:
-        result_list = []
-        while True:
-            try:
-                result_list.append(queue.get(block=False))
-            except Empty:
-                break
-        return result_list
-
-    def _call_callback_on_queue_data(self) -> None:
-        result_list = self._exhaust_queue(self.data_queue)
-        self.callback(result_list, self._data_set_len, self.state)
+        conn = get_connection(self._path_to_db)
+        try:
+            self._loop(conn)
+        finally:
+            close_connections()
+            self._clean_up()
+
+    def _call_callback_on_new_results(self, conn: sqlite3.Connection,
+                                      always: bool = False) -> None:
+        self._last_rowid, results = get_rows_after(conn, self.table_name,
+                                                   self._columns,
+                                                   self._last_rowid,
+                                                   as_arrays=self.columnar)
+        new_results = results  # type: Sized
+        if self.columnar:
+            no_of_results = len(results[0]) if results else 0
+            new_results = dict(zip(self._columns, results))
+        else:
+            no_of_results = len(results)
+        if no_of_results == 0 and not always:
+            return
+        self._data_set_len += no_of_results
+        self._last_call_time = monotonic()
+        self.callback(new_results, self._data_set_len, self.state)
         self.log.debug(f"{self.callback} called with "
-                       f"result_list: {result_list}.")
-
-    def _loop(self) -> None:
+                       f"{no_of_results} results.")
+
+    def _wait_for_results(self) -> None:
+        with self._condition:
+            while not (self._stop_signal or self._completed):
+                if self._queue_length >= self.min_queue_length:
+                    remaining = (self._min_wait
+                                 - (monotonic() - self._last_call_time))
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+            self._queue_length = 0
+
+    def _loop(self, conn: sqlite3.Connection) -> None:
         while True:
-            if self._stop_signal:
-                self._clean_up()
+            self._wait_for_results()
+            if self._completed:
+                self._call_callback_on_new_results(conn, always=True)
                 break
-
-            if self._queue_length >= self.min_queue_length:
-                self._call_callback_on_queue_data()
-                self._queue_length = 0
-
-            time.sleep(self._loop_sleep_time)
-
-            if self.dataSet.completed:
-                self._call_callback_on_queue_data()
+            if self._stop_signal:
                 break
+            self._call_callback_on_new_results(conn)
 
     def done_callback(self) -> None:
+        """
+        Notify the subscriber that the DataSet has been completed and wait
+        for the last call of the callback
+        """
         self.log.debug("Done callback")
-        self._call_callback_on_queue_data()
+        with self._condition:
+            self._completed = True
+            self._condition.notify()
+        self.join_unless_current()
+
+    def join_unless_current(self) -> None:
+        """
+        Wait for the thread to finish, unless called from the thread itself,
+        i.e. by the callback, which would wait forever
+        """
+        if current_thread() is not self:
+            self.join()
 
     def schedule_stop(self) -> None:
-        if not self._stop_signal:
-            self.log.debug("Scheduling stop")
-            self._stop_signal = True
+        with self._condition:
+            if not self._stop_signal:
+                self.log.debug("Scheduling stop")
+                self._stop_signal = True
+                self._condition.notify()
 
     def _clean_up(self) -> None:
         self.log.debug("Stopped subscriber")
@@ -196,17 +247,34 @@ class DataSet(Sized):
         # TODO: handle fail here by defaulting to
         # a standard db
         self.path_to_db = path_to_db
+        self._debug = get_DB_debug()
+        # a pooled connection is got from the pool on every use, such that
+        # it is replaced if one of its holders has closed it
+        self._conn = None
         if conn is None:
-            self.conn = connect(self.path_to_db)
+            self._pool_key: Optional[Tuple[str, bool]] = (path_to_db,
+                                                          self._debug)
         else:
-            self.conn = conn
+            self._pool_key = pooled_connection_key(conn)
+            if self._pool_key is None:
+                self._conn = conn
 
         self.run_id = run_id
-        self._debug = False
         self.subscribers: Dict[str, _Subscriber] = {}
+        # the layouts and dependencies of the run are loaded once (on first
+        # use) and cached; adding parameters resets the cache
+        self._layouts: Optional[Dict[str, Dict[str, str]]] = None
+        self._dependency_graph: Optional[Dict[str, List[str]]] = None
         if run_id:
             self._completed = completed(self.conn, self.run_id)
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The connection to the database"""
+        if self._pool_key is None:
+            return self._conn
+        return get_connection(*self._pool_key)
+
     def _new(self, name, exp_id, specs: SPECS = None, values=None,
              metadata=None) -> None:
         """
@@ -232,11 +300,7 @@ class DataSet(Sized):
 
     @property
     def number_of_results(self):
-        tabnam = self.table_name
-        # TODO: is it better/faster to use the max index?
-        sql = f'SELECT COUNT(*) FROM "{tabnam}"'
-        cursor = atomic_transaction(self.conn, sql)
-        return one(cursor, 'COUNT(*)')
+        return length(self.conn, self.table_name)
 
     @property
     def counter(self):
@@ -254,6 +318,32 @@ class DataSet(Sized):
         param_names = [p.name for p in params]
         return dict(zip(param_names, params))
 
+    @property
+    def layouts(self) -> Dict[str, Dict[str, str]]:
+        """
+        The name, label, and unit of every parameter of the run, keyed by
+        parameter name. Loaded once and cached.
+        """
+        if self._layouts is None:
+            self._layouts = get_layouts(self.conn, self.run_id)
+        return self._layouts
+
+    @property
+    def dependency_graph(self) -> Dict[str, List[str]]:
+        """
+        The names of the setpoints (in axis order) of every dependent
+        parameter of the run, keyed by parameter name. Loaded once and
+        cached.
+        """
+        if self._dependency_graph is None:
+            self._dependency_graph = get_dependency_graph(self.conn,
+                                                          self.run_id)
+        return self._dependency_graph
+
+    def _reset_layout_cache(self) -> None:
+        self._layouts = None
+        self._dependency_graph = None
+
     @property
     def exp_id(self) -> int:
         return select_one_where(self.conn, "runs",
@@ -324,8 +414,7 @@ class DataSet(Sized):
         all the queries made are echoed back.
         """
         self._debug = not self._debug
-        self.conn.close()
-        self.conn = connect(self.path_to_db, self._debug)
+        self._pool_key = (self.path_to_db, self._debug)
 
     def add_parameter(self, spec: ParamSpec):
         """
@@ -364,6 +453,7 @@ class DataSet(Sized):
                                  'no such parameter in this DataSet')
 
         add_parameter(self.conn, self.table_name, spec)
+        self._reset_layout_cache()
 
     def get_parameters(self) -> SPECS:
         return get_parameters(self.conn, self.run_id)
@@ -371,6 +461,7 @@ class DataSet(Sized):
     # TODO: deprecate
     def add_parameters(self, specs: SPECS):
         add_parameter(self.conn, self.table_name, *specs)
+        self._reset_layout_cache()
 
     def add_metadata(self, tag: str, metadata: Any):
         """
@@ -390,6 +481,36 @@ class DataSet(Sized):
         # adding meta-data does not commit
         self.conn.commit()
 
+    def add_snapshot(self, snapshot: str) -> None:
+        """
+        Adds a snapshot (e.g. of the station) to the DataSet. Identical
+        snapshots are stored only once per database, and a new snapshot is
+        stored as a delta against the previous one; the run refers to its
+        snapshot by the hash stored as the 'snapshot_hash' metadata.
+
+        Args:
+            snapshot: the snapshot as JSON
+        """
+        snapshot_hash = insert_snapshot(self.conn, snapshot)
+        self.add_metadata('snapshot_hash', snapshot_hash)
+
+    @property
+    def snapshot_raw(self) -> Optional[str]:
+        """
+        The snapshot of the run as JSON, or None if the run has none
+        """
+        return get_run_snapshot(self.conn, self.run_id)
+
+    @property
+    def snapshot(self) -> Optional[Dict]:
+        """
+        The snapshot of the run as a dict, or None if the run has none
+        """
+        snapshot_raw = self.snapshot_raw
+        if snapshot_raw is None:
+            return None
+        return json.loads(snapshot_raw)
+
     @property
     def completed(self) -> bool:
         return self._completed
@@ -442,6 +563,7 @@ class DataSet(Sized):
                               list(results.values())
                               )
         self.conn.commit()
+        self._notify_subscribers(1)
         return index
 
     def add_results(self, results: List[Dict[str, VALUE]]) -> int:
@@ -467,8 +589,39 @@ class DataSet(Sized):
         len_before_add = length(self.conn, self.table_name)
         insert_many_values(self.conn, self.table_name, list(expected_keys),
                            values)
+        self._notify_subscribers(len(values))
         return len_before_add
 
+    def add_result_columns(self, columns: Dict[str, Any]) -> int:
+        """
+        Adds a block of results to the DataSet given column-wise, i.e. as
+        one array (or list) of values per parameter. Scalar values are
+        broadcast to the length of the arrays. This avoids building one
+        dictionary per result and is the preferred way of adding large
+        amounts of data.
+
+        Args:
+            - columns: dictionary with the name of a parameter as the key
+              and an array of values (or a single value) as the value.
+              All arrays must have the same length.
+
+        Returns:
+            - the index in the DataSet that the **first** result was stored at
+
+        It is an error to provide a value for a key or keyword that is not
+        the name of a parameter in this DataSet.
+        It is an error to add results to a completed DataSet.
+        """
+        if self.completed:
+            raise CompletedError
+        first_rowid = insert_columns(self.conn, self.table_name,
+                                     list(columns.keys()),
+                                     list(columns.values()))
+        lengths = [len(value) for value in columns.values()
+                   if isinstance(value, (np.ndarray, list, tuple))]
+        self._notify_subscribers(lengths[0] if lengths else 1)
+        return first_rowid - 1
+
     def modify_result(self, index: int, results: Dict[str, VALUES]) -> None:
         """ Modify a logically single result of existing parameters
 
@@ -500,8 +653,9 @@ class DataSet(Sized):
         """ Modify a sequence of results in the DataSet.
 
         Args:
-            - index: zero-based index of the result to be modified.
-            - results: sequence of dictionares of updates with name of a
+            - start_index: zero-based index of the first result to be
+                modified.
+            - updates: sequence of dictionares of updates with name of a
                 parameter as the key and the value to associate as the value.
 
 
@@ -514,25 +668,54 @@ class DataSet(Sized):
         if self.completed:
             raise CompletedError
 
-        keys = [list(val.keys()) for val in updates]
-        flattened_keys = [item for sublist in keys for item in sublist]
-
-        mod_params = set(flattened_keys)
+        mod_params = set(key for update in updates for key in update)
         old_params = set(self.paramspecs.keys())
         if not mod_params.issubset(old_params):
             raise ValueError('Can not modify values for parameter(s) '
                              f'{mod_params.difference(old_params)}, '
                              'no such parameter(s) in the dataset.')
 
-        values = [list(val.values()) for val in updates]
-        flattened_values = [item for sublist in values for item in sublist]
+        # consecutive updates of the same parameters are applied with one
+        # prepared statement, all in a single transaction
+        with atomic(self.conn):
+            for keys, group in itertools.groupby(
+                    enumerate(updates, start_index),
+                    key=lambda indexed: tuple(indexed[1].keys())):
+                rows = list(group)
+                modify_many_values(self.conn,
+                                   self.table_name,
+                                   rows[0][0],
+                                   list(keys),
+                                   [list(update.values())
+                                    for _, update in rows])
+
+    def modify_result_columns(self, start_index: int,
+                              columns: Dict[str, Any]) -> None:
+        """ Modify a block of consecutive results given column-wise, i.e. as
+        one array (or list) of values per parameter. Scalar values are
+        broadcast to the length of the arrays. This is the preferred way of
+        modifying large amounts of data.
 
+        Args:
+            - start_index: zero-based index of the first result to modify
+            - columns: dictionary with the name of a parameter as the key
+              and an array of values (or a single value) as the value.
+              All arrays must have the same length.
+
+        It is an error to modify a result at an index less than zero or
+        beyond the end of the DataSet.
+        It is an error to provide a value for a key or keyword that is not
+        the name of a parameter in this DataSet.
+        It is an error to modify a result in a completed DataSet.
+        """
+        if self.completed:
+            raise CompletedError
+        for param in columns.keys():
+            if param not in self.paramspecs.keys():
+                raise ValueError(f'No such parameter: {param}.')
         with atomic(self.conn):
-            modify_many_values(self.conn,
-                               self.table_name,
-                               start_index,
-                               flattened_keys,
-                               flattened_values)
+            modify_columns(self.conn, self.table_name, start_index,
+                           list(columns.keys()), list(columns.values()))
 
     def add_parameter_values(self, spec: ParamSpec, values: VALUES):
         """
@@ -558,6 +741,7 @@ class DataSet(Sized):
                 ))
         with atomic(self.conn):
             add_parameter(self.conn, self.table_name, spec)
+            self._reset_layout_cache()
             # now add values!
             results = [{spec.name: value} for value in values]
             self.add_results(results)
@@ -604,6 +788,44 @@ class DataSet(Sized):
                         start, end)
         return data
 
+    def get_data_as_arrays(self,
+                           *params: Union[str, ParamSpec, _BaseParameter],
+                           start: Optional[int] = None,
+                           end: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Returns the values stored in the DataSet for the specified parameters
+        as one contiguous NumPy array per parameter. Unlike get_data, the
+        data is not built up as a list of lists, which makes this the
+        preferred way of loading large runs.
+
+        The dtype of each array is based on the type of the parameter:
+        'numeric' parameters give float arrays (with NaN where no value was
+        stored), 'text' and 'array' parameters give object arrays. The
+        start and end arguments select a range of results in the same way
+        as for get_data.
+
+        Args:
+            - *params: string parameter names, QCoDeS Parameter objects, and
+               ParamSpec objects
+            - start:
+            - end:
+
+        Returns:
+            - list of NumPy arrays, one array per parameter
+        """
+        param_names = []
+        for maybeParam in params:
+            if isinstance(maybeParam, str):
+                param_names.append(maybeParam)
+            else:
+                try:
+                    param_names.append(maybeParam.name)
+                except Exception as e:
+                    raise ValueError(
+                        "This parameter does not have  a name") from e
+        return get_data_as_arrays(self.conn, self.table_name, param_names,
+                                  start, end)
+
     def get_values(self, param_name: str) -> List[List[Any]]:
         """
         Get the values (i.e. not NULLs) of the specified parameter
@@ -624,48 +846,96 @@ class DataSet(Sized):
                 setpoints
         """
 
-        if param_name not in self.parameters:
+        if param_name not in self.layouts:
             raise ValueError('Unknown parameter, not in this DataSet')
 
-        if self.paramspecs[param_name].depends_on == '':
+        if param_name not in self.dependency_graph:
             raise ValueError(f'Parameter {param_name} has no setpoints.')
 
-        setpoints = get_setpoints(self.conn, self.table_name, param_name)
+        setpoints = get_setpoints(self.conn, self.table_name, param_name,
+                                  self.dependency_graph[param_name])
 
         return setpoints
 
+    def get_parameter_data(self, param_name: str) -> Dict[str, np.ndarray]:
+        """
+        Get the (not NULL) values of the specified parameter together with
+        the corresponding values of its setpoints, all from a single query.
+
+        Args:
+            param_name: The name of the parameter
+
+        Returns:
+            A dict mapping the names of the setpoints (in axis order) and
+            finally the name of the parameter itself to arrays of values
+            as returned by get_data_as_arrays
+        """
+        if param_name not in self.layouts:
+            raise ValueError('Unknown parameter, not in this DataSet')
+
+        setpoint_names = self.dependency_graph.get(param_name, [])
+        arrays = get_dependent_data_as_arrays(self.conn, self.table_name,
+                                              param_name, setpoint_names)
+        return OrderedDict(zip(setpoint_names + [param_name], arrays))
+
     # NEED to pass Any for some reason
     def subscribe(self,
                   callback: Callable[[Any, int, Optional[Any]], None],
                   min_wait: int = 0,
                   min_count: int = 1,
                   state: Optional[Any] = None,
-                  callback_kwargs: Optional[Dict[str, Any]] = None
+                  callback_kwargs: Optional[Dict[str, Any]] = None,
+                  columnar: bool = False
                   ) -> str:
+        """
+        Subscribe a callback to the results added to this DataSet. The
+        callback is called as callback(results, length, state) from a
+        separate thread, once per committed batch of results.
+
+        Args:
+            callback: the function to call
+            min_wait: the minimal time (in milliseconds) between two calls
+            min_count: the minimal number of new results for a call
+            state: object passed to each call of the callback
+            callback_kwargs: extra keyword arguments for the callback
+            columnar: if True, the results are passed as a dictionary
+                of parameter name to array of values, otherwise as a list
+                of tuples, one per result (in the order of the parameters)
+
+        Returns:
+            the id of the subscriber
+        """
         subscriber_id = uuid.uuid4().hex
         subscriber = _Subscriber(self, subscriber_id, callback, state, min_wait, min_count,
-                                 callback_kwargs)
+                                 callback_kwargs, columnar)
         self.subscribers[subscriber_id] = subscriber
         subscriber.start()
         return subscriber_id
 
+    def _notify_subscribers(self, no_of_results: int) -> None:
+        """
+        Notify the subscribers that results have been committed. Thread-safe,
+        such that a writer thread may notify as well.
+        """
+        for sub in list(self.subscribers.values()):
+            sub.notify(no_of_results)
+
     def unsubscribe(self, uuid: str) -> None:
         """
         Remove subscriber with the provided uuid
         """
-        with atomic(self.conn):
-            self._remove_trigger(uuid)
-            sub = self.subscribers[uuid]
-            sub.schedule_stop()
-            sub.join()
-            del self.subscribers[uuid]
+        sub = self.subscribers[uuid]
+        sub.schedule_stop()
+        sub.join_unless_current()
+        del self.subscribers[uuid]
 
     def _remove_trigger(self, name):
         transaction(self.conn, f"DROP TRIGGER IF EXISTS {name};")
 
     def unsubscribe_all(self):
         """
-        Remove all subscribers
+        Remove all subscribers. Also drops the triggers that subscribers of
+        earlier versions of QCoDeS left in the database.
         """
         sql = "select * from sqlite_master where type = 'trigger';"
         triggers = atomic_transaction(self.conn, sql).fetchall()
@@ -674,10 +944,13 @@ class DataSet(Sized):
                 self._remove_trigger(trigger['name'])
             for sub in self.subscribers.values():
                 sub.schedule_stop()
-                sub.join()
+                sub.join_unless_current()
             self.subscribers.clear()
 
     def get_metadata(self, tag):
+        if tag == 'snapshot':
+            # snapshots are stored in their own table, see add_snapshot
+            return self.snapshot_raw
         return get_metadata(self.conn, tag, self.table_name)
 
     def __len__(self) -> int:
@@ -721,7 +994,7 @@ def load_by_counter(counter, exp_id):
     Returns:
         the dataset
     """
-    conn = connect(get_DB_location())
+    conn = get_connection()
     sql = """
     SELECT run_id
     FROM
@@ -732,7 +1005,6 @@ def load_by_counter(counter, exp_id):
     """
     c = transaction(conn, sql, counter, exp_id)
     run_id = one(c, 'run_id')
-    conn.close()
     d = DataSet(get_DB_location(), run_id=run_id)
 
     return d
@@ -754,10 +1026,7 @@ def new_data_set(name, exp_id: Optional[int] = None,
     """
     path_to_db = get_DB_location()
     if conn is None:
-        tempcon = True
-        conn = connect(get_DB_location())
-    else:
-        tempcon = False
+        conn = get_connection(path_to_db)
 
     if exp_id is None:
         if len(get_experiments(conn)) > 0:
@@ -768,9 +1037,6 @@ def new_data_set(name, exp_id: Optional[int] = None,
                              " new_experiment(name, sample_name)")
     # This is admittedly a bit weird. We create a dataset, link it to some
     # run in the DB and then (using _new) change what it's linked to
-    if tempcon:
-        conn.close()
-        conn = None
     d = DataSet(path_to_db, run_id=None, conn=conn)
     d._new(name, exp_id, specs, values, metadata)
 
@@ -1,6 +1,9 @@
 # high-level interface to the database
 
 from os.path import expanduser
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
 
 from qcodes.dataset.sqlite_base import connect as _connect
 from qcodes.dataset.sqlite_base import init_db as _init_db
@@ -15,6 +18,85 @@ def get_DB_debug() -> bool:
     return bool(qcodes.config["core"]["db_debug"])
 
 
+class _ConnectionPool(threading.local):
+    """
+    The connections of one thread, by path to the database and debug flag.
+    sqlite3 connections can not be shared between threads, hence every
+    thread gets its own pool.
+    """
+    def __init__(self) -> None:
+        self.connections: Dict[Tuple[str, bool], sqlite3.Connection] = {}
+
+
+_pool = _ConnectionPool()
+
+
+def get_connection(path_to_db: Optional[str] = None,
+                   debug: Optional[bool] = None) -> sqlite3.Connection:
+    """
+    Get the connection of the calling thread to a database. The connection
+    is made (with the connection profile set in the config) on the first
+    call and reused afterwards, such that e.g. all DataSets and Experiments
+    of one database share a single connection.
+
+    A pooled connection that has been closed (by any of its users) is
+    replaced by a new one on the next call, so holders of a pooled connection
+    get it through this function on every use rather than keeping it, see
+    pooled_connection_key. To close all the connections of the calling
+    thread, use close_connections.
+
+    Args:
+        path_to_db: path to the database, defaults to the one in the config
+        debug: whether or not to echo the queries, defaults to the config
+
+    Returns:
+        the connection
+    """
+    if path_to_db is None:
+        path_to_db = get_DB_location()
+    if debug is None:
+        debug = get_DB_debug()
+    key = (path_to_db, debug)
+    conn = _pool.connections.get(key)
+    if conn is not None:
+        try:
+            # raises if the connection has been closed
+            conn.total_changes
+        except sqlite3.ProgrammingError:
+            conn = None
+    if conn is None:
+        conn = _connect(path_to_db, debug)
+        _pool.connections[key] = conn
+    return conn
+
+
+def pooled_connection_key(conn: sqlite3.Connection
+                          ) -> Optional[Tuple[str, bool]]:
+    """
+    Find a connection in the pool of the calling thread.
+
+    Args:
+        conn: the connection
+
+    Returns:
+        the path to the database and the debug flag to get the connection
+        again with get_connection, or None if it is not a pooled connection
+    """
+    for key, pooled in _pool.connections.items():
+        if pooled is conn:
+            return key
+    return None
+
+
+def close_connections() -> None:
+    """
+    Close all pooled connections of the calling thread
+    """
+    for conn in _pool.connections.values():
+        conn.close()
+    _pool.connections.clear()
+
+
 def initialise_database() -> None:
     """
     Initialise a database in the location specified by the config object
@@ -23,11 +105,8 @@ def initialise_database() -> None:
     Args:
         config: An instance of the config object
     """
-    conn = _connect(get_DB_location(), get_DB_debug())
     # init is actually idempotent so it's safe to always call!
-    _init_db(conn)
-    conn.close()
-    del conn
+    _init_db(get_connection())
 
 
 def initialise_or_create_database_at(db_file_with_abs_path: str) -> None:
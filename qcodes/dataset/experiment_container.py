@@ -1,5 +1,6 @@
 from collections import Sized
-from typing import Optional, List
+import sqlite3
+from typing import Any, Dict, Optional, List
 import logging
 
 import qcodes
@@ -8,13 +9,15 @@ from qcodes.dataset.data_set import (DataSet, load_by_id, load_by_counter,
 
 from qcodes.dataset.sqlite_base import (select_one_where, finish_experiment,
                                         get_run_counter, get_runs,
-                                        get_last_run,
-                                        connect, transaction,
+                                        get_last_run, get_run_summaries,
+                                        get_number_of_runs,
+                                        transaction,
                                         get_last_experiment, get_experiments,
                                         get_experiment_name_from_experiment_id,
                                         get_sample_name_from_experiment_id)
 from qcodes.dataset.sqlite_base import new_experiment as ne
-from qcodes.dataset.database import get_DB_location, get_DB_debug
+from qcodes.dataset.database import (get_DB_location, get_DB_debug,
+                                     get_connection)
 
 
 log = logging.getLogger(__name__)
@@ -23,8 +26,15 @@ log = logging.getLogger(__name__)
 class Experiment(Sized):
     def __init__(self, path_to_db: str) -> None:
         self.path_to_db = path_to_db
-        self.conn = connect(self.path_to_db, get_DB_debug())
-        self._debug = False
+        self._debug = get_DB_debug()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        The connection to the database, got from the pool on every use,
+        such that it is replaced if one of its holders has closed it
+        """
+        return get_connection(self.path_to_db, self._debug)
 
     def _new(self,
              name: str,
@@ -95,7 +105,7 @@ class Experiment(Sized):
         runs = get_runs(self.conn, self.exp_id)
         data_sets = []
         for run in runs:
-            data_sets.append(load_by_id(run['run_id']))
+            data_sets.append(DataSet(self.path_to_db, run['run_id']))
         return data_sets
 
     def last_data_set(self) -> DataSet:
@@ -108,7 +118,7 @@ class Experiment(Sized):
         finish_experiment(self.conn, self.exp_id)
 
     def __len__(self) -> int:
-        return len(self.data_sets())
+        return get_number_of_runs(self.conn, self.exp_id)
 
     def __repr__(self) -> str:
         out = []
@@ -116,11 +126,10 @@ class Experiment(Sized):
                    f"@{self.path_to_db}")
         out.append(heading)
         out.append("-" * len(heading))
-        ds = self.data_sets()
-        if len(ds) > 0:
-            for d in ds:
-                out.append(f"{d.run_id}-{d.name}-{d.counter}"
-                           f"-{d.parameters}-{len(d)}")
+        for run in get_run_summaries(self.conn, self.exp_id):
+            out.append(f"{run['run_id']}-{run['name']}"
+                       f"-{run['result_counter']}-{run['parameters']}"
+                       f"-{run['result_length']}")
 
         return "\n".join(out)
 
@@ -136,13 +145,46 @@ def experiments()->List[Experiment]:
 
     """
     log.info("loading experiments from {}".format(get_DB_location()))
-    rows = get_experiments(connect(get_DB_location(), get_DB_debug()))
+    rows = get_experiments(get_connection())
     experiments = []
     for row in rows:
         experiments.append(load_experiment(row['exp_id']))
     return experiments
 
 
+def run_catalog(exp_id: Optional[int] = None,
+                sample_name: Optional[str] = None,
+                name: Optional[str] = None,
+                limit: Optional[int] = None,
+                offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    List a summary of the runs in the container, ordered by run_id. All
+    the summaries are fetched with a single query, without loading the
+    runs, and can be fetched page by page with limit and offset.
+
+    Args:
+        exp_id: only list the runs of this experiment
+        sample_name: only list the runs of experiments on this sample
+        name: only list the runs with this name
+        limit: the maximal number of runs to list, all if None
+        offset: the number of (matching) runs to skip
+
+    Returns:
+        A dict per run with its run_id, exp_id, exp_name, sample_name,
+        name, result_counter, run_timestamp, completed_timestamp,
+        is_completed, the number of results (result_length) and the names
+        of its parameters (parameters)
+    """
+    catalog = get_run_summaries(get_connection(), exp_id=exp_id,
+                                sample_name=sample_name, name=name,
+                                limit=limit, offset=offset)
+    for summary in catalog:
+        summary['is_completed'] = bool(summary['is_completed'])
+        summary['parameters'] = (summary['parameters'].split(',')
+                                 if summary['parameters'] else [])
+    return catalog
+
+
 def new_experiment(name: str,
                    sample_name: str,
                    format_string: Optional[str] = "{}-{}-{}") -> Experiment:
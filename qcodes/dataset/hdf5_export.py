@@ -0,0 +1,381 @@
+"""
+Export of runs of the dataset to self-describing HDF5 files.
+
+The result table of a run is read from the database in chunks of a bounded
+number of rows, and every chunk is appended to the file before the next one
+is read, such that runs larger than the memory can be exported. A file
+holds a single run and is laid out as follows:
+
+    /                  attributes with the row of the run in the runs table
+                       (run_id, name, timestamps, metadata, ...)
+    /columns/<name>    one dataset per parameter holding its column of the
+                       result table, with attributes label, unit, paramtype
+                       and depends_on
+    /shaped/<name>/    for every numeric dependent parameter whose setpoints
+                       span a grid: the values on that grid as an N-D
+                       dataset <name> with one axis per setpoint, and one
+                       1D dataset per setpoint holding the values along its
+                       axis, attached to the N-D dataset as dimension scale
+
+Many runs can be exported at once, each in its own worker process, with
+export_runs_to_hdf5.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import h5py
+import numpy as np
+
+from qcodes.version import __version__ as _qcodes_version
+from qcodes.dataset.data_set import DataSet
+from qcodes.dataset.database import get_DB_location, get_connection
+from qcodes.dataset.sqlite_base import (connect, get_data_as_arrays,
+                                        get_last_rowid)
+
+log = logging.getLogger(__name__)
+
+FORMAT_NAME = 'qcodes_dataset'
+FORMAT_VERSION = 1
+
+# A grid with more points than this factor times the number of measured
+# points is considered too sparse to be worth writing as an N-D array
+_MAX_GRID_FILL_FACTOR = 2
+
+
+class _ColumnWriter:
+    """
+    Appends the chunks of one column of a result table to a resizable
+    dataset of the file.
+
+    Numeric columns become float datasets (NULL is NaN) and text columns
+    string datasets (NULL is the empty string). The values of array and
+    blob columns must all have the same shape; they become a dataset with
+    one more dimension than the values, which is created once the first
+    value that is not NULL is seen, with NaN for the rows without value.
+    """
+
+    def __init__(self, group: h5py.Group, name: str, paramtype: str,
+                 compression: Optional[str]) -> None:
+        self.group = group
+        self.name = name
+        self.paramtype = paramtype
+        self.compression = compression
+        self.n_rows = 0
+        self.dataset: Optional[h5py.Dataset] = None
+
+        if paramtype == 'numeric':
+            self._create((), np.float64)
+        elif paramtype == 'text':
+            self._create((), h5py.special_dtype(vlen=str))
+
+    def _create(self, shape: Sequence[int], dtype: Any) -> None:
+        fillvalue = np.nan if np.dtype(dtype).kind in 'fc' else None
+        self.dataset = self.group.create_dataset(
+            self.name, shape=(self.n_rows, *shape),
+            maxshape=(None, *shape), dtype=dtype, chunks=True,
+            compression=self.compression, fillvalue=fillvalue)
+
+    def _array_values(self, values: np.ndarray) -> Optional[np.ndarray]:
+        present = [n for n, value in enumerate(values) if value is not None]
+        if not present:
+            return None
+        first = np.asarray(values[present[0]])
+        if self.dataset is None:
+            self._create(first.shape, np.result_type(first, np.float64))
+        shape = self.dataset.shape[1:]
+        block = np.full((len(values),) + shape, np.nan,
+                        dtype=self.dataset.dtype)
+        for n in present:
+            value = np.asarray(values[n])
+            if value.shape != shape:
+                raise ValueError(f'Can not export {self.name}: its values '
+                                 f'have different shapes ({shape} and '
+                                 f'{value.shape})')
+            block[n] = value
+        return block
+
+    def append(self, values: np.ndarray) -> None:
+        if self.paramtype == 'text':
+            block = np.array(['' if value is None else str(value)
+                              for value in values], dtype=object)
+        elif self.paramtype == 'numeric':
+            block = values
+        else:
+            block = self._array_values(values)
+
+        start = self.n_rows
+        self.n_rows += len(values)
+        if self.dataset is None:
+            return
+        self.dataset.resize(self.n_rows, axis=0)
+        if block is not None:
+            self.dataset[start:self.n_rows] = block
+
+    def close(self) -> h5py.Dataset:
+        if self.dataset is None:
+            # an array column without any value
+            self._create((), np.float64)
+        return self.dataset
+
+
+def _write_run_attributes(dataset: DataSet, h5file: h5py.File) -> None:
+    """
+    Write the row of the run in the runs table (which includes the
+    metadata) as attributes of the root of the file
+    """
+    c = dataset.conn.cursor()
+    c.row_factory = None
+    c.execute("SELECT * FROM runs WHERE run_id = ?", (dataset.run_id,))
+    names = [description[0] for description in c.description]
+    values = c.fetchone()
+    c.close()
+
+    for name, value in zip(names, values):
+        if value is not None:
+            h5file.attrs[name] = value
+    h5file.attrs['exp_name'] = dataset.exp_name
+    h5file.attrs['sample_name'] = dataset.sample_name
+    h5file.attrs['format'] = FORMAT_NAME
+    h5file.attrs['format_version'] = FORMAT_VERSION
+    h5file.attrs['qcodes_version'] = _qcodes_version
+
+
+def _write_columns(dataset: DataSet, group: h5py.Group, chunk_size: int,
+                   compression: Optional[str]) -> Dict[str, h5py.Dataset]:
+    """
+    Stream the result table of the run to one dataset per column, reading
+    chunk_size rows at a time
+    """
+    specs = dataset.get_parameters()
+    layouts = dataset.layouts
+    table_name = dataset.table_name
+    names = [spec.name for spec in specs]
+
+    writers = [_ColumnWriter(group, spec.name, spec.type, compression)
+               for spec in specs]
+
+    last_rowid = get_last_rowid(dataset.conn, table_name)
+    for start in range(0, last_rowid, chunk_size):
+        end = min(start + chunk_size, last_rowid)
+        chunk = get_data_as_arrays(dataset.conn, table_name, names,
+                                   start, end)
+        for writer, values in zip(writers, chunk):
+            writer.append(values)
+
+    columns = {}
+    for spec, writer in zip(specs, writers):
+        column = writer.close()
+        column.attrs['label'] = layouts.get(spec.name, {}).get('label', '')
+        column.attrs['unit'] = layouts.get(spec.name, {}).get('unit', '')
+        column.attrs['paramtype'] = spec.type
+        column.attrs['depends_on'] = spec.depends_on
+        columns[spec.name] = column
+    return columns
+
+
+def _chunks(columns: Sequence[h5py.Dataset], chunk_size: int):
+    """
+    Iterate over the rows of the given columns (of equal length) in chunks
+    of chunk_size rows, yielding a list of arrays (one per column)
+    """
+    n_rows = len(columns[0]) if columns else 0
+    for start in range(0, n_rows, chunk_size):
+        yield [column[start:start + chunk_size] for column in columns]
+
+
+def _measured(setpoints: Sequence[np.ndarray],
+              values: np.ndarray) -> np.ndarray:
+    """
+    Get the mask of the rows in which the values and all the setpoints were
+    measured
+    """
+    measured = ~np.isnan(values)
+    for points in setpoints:
+        measured &= ~np.isnan(points)
+    return measured
+
+
+def _write_shaped(name: str, setpoint_names: List[str],
+                  columns: Dict[str, h5py.Dataset], group: h5py.Group,
+                  chunk_size: int, compression: Optional[str]) -> bool:
+    """
+    Write the values of a dependent parameter on the grid spanned by the
+    unique values of its setpoints, in the same way as
+    data_export.reshape_data_on_grid but from the columns that have already
+    been written to the file, chunk by chunk.
+
+    The first pass collects the unique values of the setpoints, the second
+    one maps the points of every chunk to the grid (with searchsorted) and
+    writes just these points, whatever the order of the setpoints.
+
+    Returns:
+        Whether the values were written; they are not if the grid is too
+            sparse
+    """
+    sources = [columns[setpoint] for setpoint in setpoint_names]
+    sources.append(columns[name])
+
+    axes = [np.empty(0) for _ in setpoint_names]
+    n_points = 0
+    for *setpoints, values in _chunks(sources, chunk_size):
+        measured = _measured(setpoints, values)
+        n_points += np.count_nonzero(measured)
+        axes = [np.union1d(axis, points[measured])
+                for axis, points in zip(axes, setpoints)]
+
+    shape = tuple(len(axis) for axis in axes)
+    if n_points == 0 or np.prod(shape) > _MAX_GRID_FILL_FACTOR * n_points:
+        log.info(f'Not exporting {name} as N-D array, since its setpoints '
+                 f'do not span a grid')
+        return False
+
+    shaped_group = group.create_group(name)
+    shaped = shaped_group.create_dataset(name, shape=shape,
+                                         dtype=np.float64, chunks=True,
+                                         compression=compression,
+                                         fillvalue=np.nan)
+    for attr in ('label', 'unit'):
+        shaped.attrs[attr] = columns[name].attrs[attr]
+    shaped.attrs['setpoints'] = setpoint_names
+
+    for dim, (setpoint, axis) in enumerate(zip(setpoint_names, axes)):
+        scale = shaped_group.create_dataset(setpoint, data=axis)
+        for attr in ('label', 'unit'):
+            scale.attrs[attr] = columns[setpoint].attrs[attr]
+        if hasattr(scale, 'make_scale'):
+            scale.make_scale(setpoint)
+        else:
+            shaped.dims.create_scale(scale, setpoint)
+        shaped.dims[dim].attach_scale(scale)
+
+    for *setpoints, values in _chunks(sources, chunk_size):
+        measured = _measured(setpoints, values)
+        if not np.any(measured):
+            continue
+        indices = [np.searchsorted(axis, points[measured])
+                   for axis, points in zip(axes, setpoints)]
+        _write_points(shaped, indices, values[measured])
+
+    return True
+
+
+def _write_points(dataset: h5py.Dataset, indices: Sequence[np.ndarray],
+                  values: np.ndarray) -> None:
+    """
+    Write values to the points of a dataset with the given indices (one
+    array per axis) with a single point selection, such that only the chunks
+    of the dataset holding the points are read and written. Of points given
+    more than once, the last value is written.
+    """
+    flat = np.ravel_multi_index(indices, dataset.shape)
+    # the index of the last occurrence of every point, in the order of the
+    # points in the dataset
+    unique, last = np.unique(flat[::-1], return_index=True)
+    last = len(flat) - 1 - last
+    coords = np.stack(np.unravel_index(unique, dataset.shape), axis=1)
+
+    file_space = dataset.id.get_space()
+    file_space.select_elements(coords.astype(np.uint64))
+    memory_space = h5py.h5s.create_simple((len(unique),))
+    dataset.id.write(memory_space, file_space,
+                     np.ascontiguousarray(values[last], dtype=np.float64))
+
+
+def _export_dataset(dataset: DataSet, path: str, chunk_size: int,
+                    compression: Optional[str]) -> str:
+    specs = dataset.paramspecs
+    with h5py.File(path, 'w') as h5file:
+        _write_run_attributes(dataset, h5file)
+        columns = _write_columns(dataset, h5file.create_group('columns'),
+                                 chunk_size, compression)
+        shaped_group = h5file.create_group('shaped')
+        for name, setpoint_names in dataset.dependency_graph.items():
+            numeric = all(specs[param].type == 'numeric'
+                          for param in setpoint_names + [name])
+            if numeric:
+                _write_shaped(name, setpoint_names, columns, shaped_group,
+                              chunk_size, compression)
+    return path
+
+
+def export_to_hdf5(run_id: int, path: str,
+                   path_to_db: Optional[str] = None,
+                   chunk_size: int = 100_000,
+                   compression: Optional[str] = None) -> str:
+    """
+    Export a run to an HDF5 file (see the module docstring for its layout).
+    The result table of the run is read chunk_size rows at a time, which
+    bounds the memory used by the export.
+
+    Args:
+        run_id: The run_id of the run to export
+        path: The path of the file to write; an existing file is
+            overwritten
+        path_to_db: The database holding the run, defaults to the one set
+            in the config
+        chunk_size: The number of rows to read and write at a time
+        compression: The compression filter of the datasets of the file,
+            e.g. 'gzip' or 'lzf', or None for no compression
+
+    Returns:
+        The path of the written file
+    """
+    path_to_db = path_to_db or get_DB_location()
+    conn = get_connection(path_to_db)
+    return _export_dataset(DataSet(path_to_db, run_id, conn=conn), path,
+                           chunk_size, compression)
+
+
+def _export_in_process(path_to_db: str, run_id: int, path: str,
+                       chunk_size: int, compression: Optional[str]) -> str:
+    # The connections of the parent process must not be used after a fork,
+    # so each worker opens (and closes) its own one
+    conn = connect(path_to_db)
+    try:
+        return _export_dataset(DataSet(path_to_db, run_id, conn=conn), path,
+                               chunk_size, compression)
+    finally:
+        conn.close()
+
+
+def export_runs_to_hdf5(run_ids: Sequence[int], directory: str,
+                        path_to_db: Optional[str] = None,
+                        chunk_size: int = 100_000,
+                        compression: Optional[str] = None,
+                        processes: Optional[int] = None) -> List[str]:
+    """
+    Export many runs to HDF5 files, one file per run named
+    run_<run_id>.h5, in parallel worker processes.
+
+    Args:
+        run_ids: The run_ids of the runs to export
+        directory: The directory to write the files to, created if needed
+        path_to_db: The database holding the runs, defaults to the one set
+            in the config
+        chunk_size: The number of rows to read and write at a time
+        compression: The compression filter of the datasets, see
+            export_to_hdf5
+        processes: The number of worker processes, defaults to the number
+            of CPUs. With a single process, the runs are exported one after
+            the other in this process.
+
+    Returns:
+        The paths of the written files, in the order of run_ids
+    """
+    path_to_db = path_to_db or get_DB_location()
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f'run_{run_id}.h5')
+             for run_id in run_ids]
+
+    if processes == 1:
+        return [export_to_hdf5(run_id, path, path_to_db, chunk_size,
+                               compression)
+                for run_id, path in zip(run_ids, paths)]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_export_in_process, path_to_db, run_id,
+                                   path, chunk_size, compression)
+                   for run_id, path in zip(run_ids, paths)]
+        return [future.result() for future in futures]
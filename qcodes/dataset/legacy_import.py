@@ -1,7 +1,22 @@
-from typing import List
+"""
+Import of QCoDeS legacy DataSets (from ``qcodes.data``) into the database.
+
+Every measured DataArray is converted to columns at once: the array and its
+setpoint arrays are broadcast to the shape of the array and flattened, such
+that a run of any dimensionality is inserted with a single batched write.
+Many legacy DataSets can be imported with import_dat_files, which reads them
+in parallel worker processes while this process writes all of them to the
+database.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
 import json
+import os
 
-from qcodes.dataset.measurements import Measurement
+from qcodes.dataset.measurements import Measurement, DataSaver
+from qcodes.data.data_array import DataArray
 from qcodes.data.data_set import load_data
 from qcodes.data.data_set import DataSet as OldDataSet
 import numpy as np
@@ -28,20 +43,60 @@ def setup_measurement(dataset: OldDataSet) -> Measurement:
     return meas
 
 
-def store_array_to_database(datasaver, array):
-    dims = len(array.shape)
-    if dims == 2:
-        for index1, i in enumerate(array.set_arrays[0]):
-            for index2, j in enumerate(array.set_arrays[1][index1]):
-                datasaver.add_result((array.set_arrays[0].name, i),
-                                     (array.set_arrays[1].name, j),
-                                     (array.name, array[index1,index2]))
-    elif dims == 1:
-        for index, i in enumerate(array.set_arrays[0]):
-            datasaver.add_result((array.set_arrays[0].name, i),
-                                 (array.name, array[index]))
-    else:
-        raise NotImplementedError('The exporter only currently handles 1 and 2 Dimentional data')
+def array_to_columns(array: DataArray) -> Dict[str, np.ndarray]:
+    """
+    Convert a measured DataArray of any dimensionality and its setpoint
+    arrays to one flat column per array, keyed by the names of the arrays,
+    with a row for every point of the array.
+    """
+    ndim = len(array.shape)
+    columns = {}
+    for set_array in array.set_arrays:
+        # a setpoint array spans the leading dimensions of the array,
+        # append axes for the dimensions inside it and broadcast over them
+        values = np.asarray(set_array.ndarray)
+        values = values.reshape(values.shape + (1,) * (ndim - values.ndim))
+        columns[set_array.name] = np.broadcast_to(values,
+                                                  array.shape).ravel()
+    columns[array.name] = np.asarray(array.ndarray).ravel()
+    return columns
+
+
+def dataset_to_columns(dataset: OldDataSet) -> Dict[str, list]:
+    """
+    Convert all measured arrays of a legacy DataSet to columns, see
+    array_to_columns. Arrays with the same setpoints share their rows. The
+    rows of arrays with other setpoints follow, with None for the columns
+    they don't have, such that the whole DataSet can be inserted at once.
+    """
+    groups: Dict[tuple, Dict[str, np.ndarray]] = {}
+    for array in dataset.arrays.values():
+        if not array.is_setpoint:
+            key = tuple(id(set_array) for set_array in array.set_arrays)
+            groups.setdefault(key, {}).update(array_to_columns(array))
+
+    if len(groups) == 1:
+        return next(iter(groups.values()))
+
+    names = [name for group in groups.values() for name in group]
+    columns: Dict[str, list] = {name: [] for name in names}
+    for group in groups.values():
+        n_rows = len(next(iter(group.values())))
+        for name, column in columns.items():
+            if name in group:
+                column.extend(group[name].tolist())
+            else:
+                column.extend([None] * n_rows)
+    return columns
+
+
+def store_array_to_database(datasaver: DataSaver, array: DataArray) -> int:
+    """
+    Store a measured DataArray of any dimensionality, together with its
+    setpoints, in the dataset of the datasaver with a single batched write.
+    """
+    datasaver.flush_data_to_database(block=True)
+    datasaver.dataset.add_result_columns(array_to_columns(array))
     return datasaver.run_id
 
 
@@ -65,19 +120,65 @@ def store_array_to_database_alt(meas, array):
     return datasaver.run_id
 
 
+def store_dataset_to_database(dataset: OldDataSet) -> int:
+    """
+    Store a loaded legacy DataSet as a new run in the database, with the
+    snapshot of the legacy DataSet as its snapshot.
+
+    Returns:
+        The run_id of the new run
+    """
+    meas = setup_measurement(dataset)
+    with meas.run() as datasaver:
+        datasaver.dataset.add_snapshot(json.dumps(dataset.snapshot()))
+        columns = dataset_to_columns(dataset)
+        if columns:
+            datasaver.dataset.add_result_columns(columns)
+    return datasaver.run_id
+
+
 def import_dat_file(location: str) -> List[int]:
     """
     This imports a QCoDeS legacy DataSet
+
+    Returns:
+        A list with the run_id of the run the DataSet was imported to
+    """
+    return [store_dataset_to_database(load_data(location))]
+
+
+def import_dat_files(locations: Iterable[str],
+                     processes: Optional[int] = None) -> List[int]:
     """
+    Import many QCoDeS legacy DataSets, each to its own run. The DataSets
+    are read (and parsed) in parallel worker processes, and written to the
+    database by this process only, in the order of locations. At most
+    twice as many DataSets as there are processes are read ahead of the
+    writing, which bounds the memory used however many there are.
+
+    Args:
+        locations: The locations of the legacy DataSets
+        processes: The number of worker processes, defaults to the number
+            of CPUs. With a single process, the DataSets are read in this
+            process.
 
+    Returns:
+        The run_ids of the new runs, in the order of locations
+    """
+    if processes == 1:
+        return [store_dataset_to_database(load_data(location))
+                for location in locations]
 
-    loaded_data = load_data(location)
-    meas = setup_measurement(loaded_data)
+    locations = iter(locations)
+    read_ahead = 2 * (processes or os.cpu_count() or 1)
     run_ids = []
-    with meas.run() as datasaver:
-        datasaver.dataset.add_metadata('snapshot', json.dumps(loaded_data.snapshot()))
-        for arrayname, array in loaded_data.arrays.items():
-            if not array.is_setpoint:
-                run_id = store_array_to_database(datasaver, array)
-                run_ids.append(run_id)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = deque(executor.submit(load_data, location)
+                        for location in islice(locations, read_ahead))
+        while pending:
+            dataset = pending.popleft().result()
+            # keep the workers busy while this process writes
+            for location in islice(locations, 1):
+                pending.append(executor.submit(load_data, location))
+            run_ids.append(store_dataset_to_database(dataset))
     return run_ids
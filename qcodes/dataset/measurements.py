@@ -1,9 +1,11 @@
 import json
 import logging
 from time import monotonic
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from threading import Thread, Condition
 from typing import (Callable, Union, Dict, Tuple, List, Sequence, cast,
-                    MutableMapping, MutableSequence, Optional)
+                    MutableMapping, MutableSequence, Optional, Deque, Any,
+                    ContextManager)
 from inspect import signature
 from numbers import Number
 
@@ -15,6 +17,10 @@ from qcodes.instrument.parameter import ArrayParameter, _BaseParameter, Paramete
 from qcodes.dataset.experiment_container import Experiment
 from qcodes.dataset.param_spec import ParamSpec
 from qcodes.dataset.data_set import DataSet
+from qcodes.dataset.sqlite_base import (as_column_list, connect,
+                                        encode_array_blob, insert_columns)
+from qcodes.utils import tracing
+from qcodes.utils.threading import InstrumentThreadPool
 
 log = logging.getLogger(__name__)
 
@@ -26,6 +32,166 @@ class ParameterTypeError(Exception):
     pass
 
 
+class DataWriteError(RuntimeError):
+    pass
+
+
+class WriteQueueFullError(RuntimeError):
+    pass
+
+
+def _estimate_nbytes(columns: Dict[str, List]) -> int:
+    """
+    Estimate the memory held by a block of results: the size of the arrays
+    and of the strings and blobs, and 8 bytes for any other value
+    """
+    nbytes = 0
+    for values in columns.values():
+        for value in values:
+            if isinstance(value, np.ndarray):
+                nbytes += value.nbytes
+            elif isinstance(value, (str, bytes, bytearray, memoryview)):
+                nbytes += len(value)
+            else:
+                nbytes += 8
+    return nbytes
+
+
+class _BackgroundWriter(Thread):
+    """
+    Thread that writes the results of a DataSaver to the database. The
+    writer owns its own connection to the database, and results are handed
+    to it through a queue that is bounded by an estimate of the number of
+    bytes it holds (see _estimate_nbytes).
+
+    The _BackgroundWriter is not meant to be instantiated directly, but is
+    created by the DataSaver when writing in the background is requested.
+    The subscribers of the dataset are notified after each write.
+    """
+
+    def __init__(self, dataset: DataSet, max_queued_bytes: int,
+                 queue_policy: str = 'block') -> None:
+        super().__init__(daemon=True)
+        if queue_policy not in ('block', 'raise'):
+            raise ValueError(f'Unknown queue policy: {queue_policy}. '
+                             "Must be 'block' or 'raise'.")
+        self.max_queued_bytes = max_queued_bytes
+        self.queue_policy = queue_policy
+
+        self._dataset = dataset
+        self._path_to_db = dataset.path_to_db
+        self._table_name = dataset.table_name
+
+        self._queue: Deque[Tuple[Dict[str, List], int, int]] = deque()
+        self._queued_points = 0
+        self._queued_bytes = 0
+        self._condition = Condition()
+        self._stop_signal = False
+        self.error: Optional[Exception] = None
+
+    @property
+    def queued_points(self) -> int:
+        return self._queued_points
+
+    @property
+    def queued_bytes(self) -> int:
+        return self._queued_bytes
+
+    def _raise_if_failed(self) -> None:
+        if self.error is not None:
+            raise DataWriteError('Could not commit to database; '
+                                 f'{self.error}') from self.error
+
+    def put(self, columns: Dict[str, List], no_of_points: int,
+            block: bool = False) -> None:
+        """
+        Put a block of results on the queue. If the queue is full, either
+        block until the writer has made room or raise, depending on the
+        queue policy. A block larger than the queue limit is accepted once
+        the queue is empty.
+
+        Args:
+            columns: The results, one list of values per parameter
+            no_of_points: The number of results in the block
+            block: If True, block when the queue is full regardless of the
+                queue policy
+        """
+        nbytes = _estimate_nbytes(columns)
+        with self._condition:
+            self._raise_if_failed()
+            if self._queued_bytes + nbytes > self.max_queued_bytes:
+                if (self.queue_policy == 'raise' and not block
+                        and self._queue):
+                    raise WriteQueueFullError(
+                        f'Can not queue {no_of_points} results '
+                        f'(~{nbytes} bytes), {self._queued_points} results '
+                        f'(~{self._queued_bytes} bytes) are already waiting '
+                        f'to be written (limit {self.max_queued_bytes} '
+                        'bytes).')
+                log.debug('Write queue full, waiting for the writer')
+                while (self._queue and self.error is None and
+                       self._queued_bytes + nbytes > self.max_queued_bytes):
+                    self._condition.wait()
+                self._raise_if_failed()
+            self._queue.append((columns, no_of_points, nbytes))
+            self._queued_points += no_of_points
+            self._queued_bytes += nbytes
+            self._condition.notify_all()
+
+    def drain(self) -> None:
+        """
+        Wait until all queued results have been written to the database
+        """
+        with self._condition:
+            while self._queue and self.error is None:
+                self._condition.wait()
+            self._raise_if_failed()
+
+    def stop(self) -> None:
+        """
+        Stop the writer once the queue is empty and wait for it to finish
+        """
+        with self._condition:
+            self._stop_signal = True
+            self._condition.notify_all()
+        self.join()
+
+    def run(self) -> None:
+        conn = connect(self._path_to_db)
+        try:
+            self._loop(conn)
+        finally:
+            conn.close()
+
+    def _loop(self, conn) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._stop_signal:
+                    self._condition.wait()
+                if not self._queue:
+                    break
+                # the block stays in the queue until it has been written,
+                # such that draining waits for the ongoing write
+                columns, no_of_points, nbytes = self._queue[0]
+            try:
+                write_point = insert_columns(conn, self._table_name,
+                                             list(columns.keys()),
+                                             list(columns.values()))
+                log.debug(f'Successfully wrote from index {write_point - 1}')
+                self._dataset._notify_subscribers(no_of_points)
+            except Exception as e:
+                log.exception('Could not commit to database')
+                with self._condition:
+                    self.error = e
+                    self._condition.notify_all()
+                break
+            with self._condition:
+                self._queue.popleft()
+                self._queued_points -= no_of_points
+                self._queued_bytes -= nbytes
+                self._condition.notify_all()
+
+
 class DataSaver:
     """
     The class used byt the Runner context manager to handle the
@@ -35,8 +201,35 @@ class DataSaver:
     default_callback: Optional[dict] = None
 
     def __init__(self, dataset: DataSet, write_period: float,
-                 parameters: Dict[str, ParamSpec]) -> None:
+                 parameters: Dict[str, ParamSpec],
+                 write_in_background: bool = False,
+                 max_queued_bytes: Optional[int] = None,
+                 queue_policy: Optional[str] = None,
+                 blob_compression: Optional[str] = None,
+                 thread_pool: Optional[InstrumentThreadPool] = None) -> None:
+        """
+        Args:
+            dataset: The dataset to write the results to
+            write_period: The minimal time (in seconds) between writes
+            parameters: The parameters of the measurement
+            write_in_background: If True, the results are handed to a
+                dedicated writer thread with its own database connection
+                instead of being written by the calling thread
+            max_queued_bytes: The maximal (estimated) number of bytes of
+                results that may wait to be written by the writer thread.
+                Defaults to the value in the config.
+            queue_policy: What to do when the queue of the writer thread is
+                full, either 'block' or 'raise'. Defaults to the value in
+                the config.
+            blob_compression: The compression of the arrays of 'blob'
+                parameters, either 'none' or 'zlib'. Defaults to the value
+                in the config.
+            thread_pool: The pool used by get_results to read parameters
+                of different instruments concurrently. If None, they are
+                read one after the other.
+        """
         self._dataset = dataset
+        self._thread_pool = thread_pool
         if DataSaver.default_callback is not None and 'run_tables_subscription_callback' in DataSaver.default_callback:
             callback = DataSaver.default_callback['run_tables_subscription_callback']
             min_wait = DataSaver.default_callback['run_tables_subscription_min_wait']
@@ -46,6 +239,11 @@ class DataSaver:
         self.write_period = write_period
         self.parameters = parameters
         self._known_parameters = list(parameters.keys())
+        self._blob_parameters = {name for name, parspec in parameters.items()
+                                 if parspec.type == 'blob'}
+        if blob_compression is None:
+            blob_compression = qc.config['dataset']['blob_compression']
+        self._blob_compression = blob_compression
         self._results: List[dict] = []  # will be filled by addResult
         self._last_save_time = monotonic()
         self._known_dependencies: Dict[str, List[str]] = {}
@@ -54,6 +252,41 @@ class DataSaver:
                 self._known_dependencies.update({str(param):
                                                 parspec.depends_on.split(', ')})
 
+        self._writer: Optional[_BackgroundWriter] = None
+        if write_in_background:
+            if max_queued_bytes is None:
+                max_queued_bytes = \
+                    qc.config['dataset']['write_queue_max_bytes']
+            if queue_policy is None:
+                queue_policy = qc.config['dataset']['write_queue_policy']
+            self._writer = _BackgroundWriter(dataset, max_queued_bytes,
+                                             queue_policy)
+            self._writer.start()
+
+    def get_results(self, *parameters: _BaseParameter
+                    ) -> List[Tuple[_BaseParameter, Any]]:
+        """
+        Get the values of the given parameters, in the form expected by
+        add_result, e.g.
+        >> datasaver.add_result((v1, 0.1), *datasaver.get_results(c1, c2))
+
+        If the measurement is run with use_threads, the parameters of
+        different instruments are read concurrently, each instrument by its
+        own thread which lives as long as the measurement. The parameters of
+        the same instrument are read one after the other.
+
+        Args:
+            parameters: The parameters to get
+
+        Returns:
+            A list of (parameter, value) tuples
+        """
+        if self._thread_pool is None:
+            values = [param.get() for param in parameters]
+        else:
+            values = self._thread_pool.get(parameters)
+        return list(zip(parameters, values))
+
     def add_result(self,
                    *res_tuple: Tuple[Union[_BaseParameter, str],
                                      Union[str, int, float, np.ndarray]])-> None:
@@ -74,7 +307,9 @@ class DataSaver:
         That, in turn, forces us to impose rules on what can be saved in one
         go. Any number of scalars and any number of arrays OF THE SAME LENGTH
         can be passed to add_result. The scalars are duplicated to match the
-        arrays.
+        arrays. The exception are parameters registered with the 'blob'
+        paramtype; their arrays are stored whole, one array per row, and
+        count as scalars here.
 
         Args:
             res: a dictionary with keys that are parameter names and items
@@ -104,7 +339,9 @@ class DataSaver:
                 raise ValueError(f'Can not add a result for {paramstr}, no '
                                  'such parameter registered in this '
                                  'measurement.')
-            if any(isinstance(value, typ) for typ in array_like_types):
+            if paramstr in self._blob_parameters:
+                pass
+            elif any(isinstance(value, typ) for typ in array_like_types):
                 value = cast(np.ndarray, partial_result[1])
                 value = np.atleast_1d(value)
                 array_size = len(value)
@@ -160,41 +397,97 @@ class DataSaver:
                                      f' {stuffweneed}.'
                                      f' Values only given for {params}.')
 
-        for index in range(input_size):
-            res_dict = {}
-            for partial_result in res:
-                param = str(partial_result[0])
-                value = partial_result[1]
-                # For compatibility with the old Loop, setpoints are
-                # tuples of numbers (usually tuple(np.linspace(...))
-                if hasattr(value, '__len__') and not(isinstance(value, str)):
-                    value = cast(Union[Sequence,np.ndarray], value)
-                    if isinstance(value, np.ndarray):
-                        value = np.atleast_1d(value)
-                    res_dict.update({param: value[index]})
-                else:
-                    res_dict.update({param: value})
+        # The results are kept column-wise, one list of values per parameter,
+        # such that no intermediate dictionary is made per point
+        res_columns = {}
+        for partial_result in res:
+            param = str(partial_result[0])
+            value = partial_result[1]
+            # For compatibility with the old Loop, setpoints are
+            # tuples of numbers (usually tuple(np.linspace(...))
+            if param in self._blob_parameters:
+                value = encode_array_blob(np.asarray(value),
+                                          self._blob_compression)
+            elif isinstance(value, np.ndarray):
+                value = np.atleast_1d(value)
+            column = as_column_list(value, input_size)
+            if len(column) != input_size:
+                raise ValueError('Incompatible array dimensions. Trying to '
+                                 f'add arrays of dimension {input_size} '
+                                 f'and {len(column)}')
+            res_columns[param] = column
 
-            self._results.append(res_dict)
+        self._results.append(res_columns)
 
         if monotonic() - self._last_save_time > self.write_period:
             self.flush_data_to_database()
             self._last_save_time = monotonic()
 
-    def flush_data_to_database(self):
+    def flush_data_to_database(self, block: bool = False) -> None:
         """
-        Write the in-memory results to the database.
+        Write the in-memory results to the database. When writing in the
+        background, the results are handed to the writer thread instead.
+
+        Args:
+            block: When writing in the background, wait until the writer
+                thread has written all results to the database
+
+        Raises:
+            DataWriteError: if the results could not be committed to the
+                database. When writing in the foreground, the results that
+                were not written are kept in memory.
+            WriteQueueFullError: if the queue of the writer thread is full
+                and its queue policy is 'raise'. The results that were not
+                queued are kept in memory.
         """
         log.debug('Flushing to database')
         if self._results != []:
-            try:
-                write_point = self._dataset.add_results(self._results)
+            merged = self._merged_results()
+            self._results = []
+            for n, columns in enumerate(merged):
+                if self._writer is not None:
+                    no_of_points = len(next(iter(columns.values())))
+                    try:
+                        self._writer.put(columns, no_of_points, block=block)
+                    except (WriteQueueFullError, DataWriteError):
+                        self._results = merged[n:]
+                        raise
+                    continue
+                try:
+                    write_point = self._dataset.add_result_columns(columns)
+                except Exception as e:
+                    self._results = merged[n:]
+                    raise DataWriteError('Could not commit to database; '
+                                         f'{e}') from e
                 log.debug(f'Successfully wrote from index {write_point}')
-                self._results = []
-            except Exception as e:
-                log.warning(f'Could not commit to database; {e}')
         else:
             log.debug('No results to flush')
+        if self._writer is not None and block:
+            self._writer.drain()
+
+    def _stop_writer(self) -> None:
+        """
+        Stop the background writer (if any). Results that are still queued
+        are written first.
+        """
+        if self._writer is not None:
+            self._writer.stop()
+
+    def _merged_results(self) -> List[Dict[str, List]]:
+        """
+        Merge consecutive blocks of in-memory results that hold values for
+        the same parameters, such that each merged block can be written
+        with a single insert.
+        """
+        merged: List[Dict[str, List]] = []
+        for columns in self._results:
+            if merged and merged[-1].keys() == columns.keys():
+                for param, column in columns.items():
+                    merged[-1][param].extend(column)
+            else:
+                merged.append({param: list(column)
+                               for param, column in columns.items()})
+        return merged
 
     @property
     def run_id(self):
@@ -225,7 +518,10 @@ class Runner:
             write_period: float=None,
             parameters: Dict[str, ParamSpec]=None,
             name: str='',
-            subscribers: List=[]) -> None:
+            subscribers: List=[],
+            write_in_background: bool=None,
+            use_threads: bool=False,
+            trace_io: bool=False) -> None:
 
         self.enteractions = enteractions
         self.exitactions = exitactions
@@ -237,6 +533,13 @@ class Runner:
         # be read from some config file
         self.write_period = write_period if write_period is not None else 5
         self.name = name if name else 'results'
+        if write_in_background is None:
+            write_in_background = qc.config['dataset']['write_in_background']
+        self.write_in_background = write_in_background
+        self.use_threads = use_threads
+        self.thread_pool: Optional[InstrumentThreadPool] = None
+        self.trace_io = trace_io
+        self._io_trace: Optional[ContextManager] = None
 
     def __enter__(self) -> DataSaver:
         # TODO: should user actions really precede the dataset?
@@ -259,8 +562,7 @@ class Runner:
             station = self.station
 
         if station:
-            self.ds.add_metadata('snapshot',
-                                 json.dumps({'station': station.snapshot()}))
+            self.ds.add_snapshot(json.dumps({'station': station.snapshot()}))
 
         if self.parameters is not None:
             for paramspec in self.parameters.values():
@@ -278,25 +580,54 @@ class Runner:
 
         print(f'Starting experimental run with id: {self.ds.run_id}')
 
-        self.datasaver = DataSaver(dataset=self.ds,
-                                   write_period=self.write_period,
-                                   parameters=self.parameters)
+        if self.use_threads:
+            self.thread_pool = InstrumentThreadPool()
+
+        try:
+            self.datasaver = DataSaver(
+                dataset=self.ds, write_period=self.write_period,
+                parameters=self.parameters,
+                write_in_background=self.write_in_background,
+                thread_pool=self.thread_pool)
+        except Exception:
+            if self.thread_pool is not None:
+                self.thread_pool.close()
+                self.thread_pool = None
+            raise
+
+        # the tracer is global, so it is switched on last, when nothing
+        # can fail any more before __exit__ switches it off
+        if self.trace_io:
+            self._io_trace = tracing.trace_io()
+            self._io_trace.__enter__()
 
         return self.datasaver
 
     def __exit__(self, exception_type, exception_value, traceback) -> None:
+        try:
+            # this waits for a background writer to write everything
+            self.datasaver.flush_data_to_database(block=True)
+        finally:
+            self.datasaver._stop_writer()
+            if self.thread_pool is not None:
+                self.thread_pool.close()
+                self.thread_pool = None
 
-        self.datasaver.flush_data_to_database()
+            if self._io_trace is not None:
+                self._io_trace.__exit__(None, None, None)
+                self._io_trace = None
+                self.ds.add_metadata('io_trace',
+                                     json.dumps(tracing.io_tracer.stats()))
 
-        # perform the "teardown" events
-        for func, args in self.exitactions:
-            func(*args)
+            # perform the "teardown" events
+            for func, args in self.exitactions:
+                func(*args)
 
-        # and finally mark the dataset as closed, thus
-        # finishing the measurement
-        self.ds.mark_complete()
+            # and finally mark the dataset as closed, thus
+            # finishing the measurement
+            self.ds.mark_complete()
 
-        self.ds.unsubscribe_all()
+            self.ds.unsubscribe_all()
 
 
 class Measurement:
@@ -326,7 +657,7 @@ class Measurement:
         self.experiment = exp
         self.station = station
         self.parameters: Dict[str, ParamSpec] = OrderedDict()
-        self._write_period: Optional[Number] = None
+        self._write_period: Optional[float] = None
         self.name = ''
 
     @property
@@ -340,7 +671,7 @@ class Measurement:
         wp_float = cast(float, wp)
         if wp_float < 1e-3:
             raise ValueError('The write period must be at least 1 ms.')
-        self._write_period = wp
+        self._write_period = wp_float
 
     def _registration_validation(
             self, name: str, setpoints: Sequence[str]=None,
@@ -390,10 +721,17 @@ class Measurement:
 
         return (depends_on, inf_from)
 
+    @staticmethod
+    def _validate_paramtype(paramtype: str) -> None:
+        if paramtype not in ('numeric', 'blob'):
+            raise ValueError(f'Invalid paramtype {paramtype}, must be '
+                             "either 'numeric' or 'blob'.")
+
     def register_parameter(
             self, parameter: _BaseParameter,
             setpoints: Sequence[_BaseParameter]=None,
-            basis: Sequence[_BaseParameter]=None) -> None:
+            basis: Sequence[_BaseParameter]=None,
+            paramtype: str='numeric') -> None:
         """
         Add QCoDeS Parameter to the dataset produced by running this
         measurement.
@@ -407,7 +745,12 @@ class Measurement:
             basis: The parameters that this parameter is inferred from. If
                 this parameter is not inferred from any other parameters,
                 this should be left blank.
+            paramtype: Either 'numeric', in which case arrays are unraveled
+                into one row per point, or 'blob', in which case each array
+                is stored whole in a single row. For an ArrayParameter, the
+                setpoints are stored the same way.
         """
+        self._validate_paramtype(paramtype)
         # input validation
         if not isinstance(parameter, _BaseParameter):
             raise ValueError('Can not register object of type {}. Can only '
@@ -440,7 +783,7 @@ class Measurement:
             else:
                 spunit = ''
 
-            sp = ParamSpec(name=spname, paramtype='numeric',
+            sp = ParamSpec(name=spname, paramtype=paramtype,
                            label=splabel, unit=spunit)
 
             self.parameters[spname] = sp
@@ -449,15 +792,11 @@ class Measurement:
         else:
             my_setpoints = setpoints
 
-        # We currently treat ALL parameters as 'numeric' and fail to add them
-        # to the dataset if they can not be unraveled to fit that description
-        # (except strings, we just let those through)
-        # this is indeed a limitation, but a sane one. We might loosen that
-        # requirement later and start saving binary blobs with the datasaver,
-        # but for now binary blob saving is referred to using the DataSet
-        # API directly
+        # Unless they are registered as 'blob', we treat ALL parameters as
+        # 'numeric' and fail to add them to the dataset if they can not be
+        # unraveled to fit that description (except strings, we just let
+        # those through)
         parameter = cast(Union[Parameter, ArrayParameter], parameter)
-        paramtype = 'numeric'
         label = parameter.label
         unit = parameter.unit
 
@@ -492,7 +831,8 @@ class Measurement:
             self, name: str,
             label: str=None, unit: str=None,
             basis: Sequence[Union[str, _BaseParameter]]=None,
-            setpoints: Sequence[Union[str, _BaseParameter]]=None) -> None:
+            setpoints: Sequence[Union[str, _BaseParameter]]=None,
+            paramtype: str='numeric') -> None:
         """
         Register a custom parameter with this measurement
 
@@ -508,7 +848,9 @@ class Measurement:
             setpoints: A list of either QCoDeS Parameters or the names of
                 of parameters already registered in the measurement that
                 are the setpoints of this parameter
+            paramtype: Either 'numeric' or 'blob', see register_parameter
         """
+        self._validate_paramtype(paramtype)
 
         # validate dependencies
         if setpoints:
@@ -524,7 +866,7 @@ class Measurement:
         depends_on, inf_from = self._registration_validation(name, sp_strings,
                                                              bs_strings)
 
-        parspec = ParamSpec(name=name, paramtype='numeric',
+        parspec = ParamSpec(name=name, paramtype=paramtype,
                             label=label, unit=unit,
                             inferred_from=inf_from,
                             depends_on=depends_on)
@@ -614,13 +956,30 @@ class Measurement:
         # with the same state?
         self.subscribers.append((func, state))
 
-    def run(self):
+    def run(self, write_in_background: Optional[bool]=None,
+            use_threads: bool=False, trace_io: bool=False) -> Runner:
         """
         Returns the context manager for the experimental run
+
+        Args:
+            write_in_background: If True, results are written to the
+                database by a dedicated writer thread, such that the
+                measurement loop does not wait for the database. If not
+                given, the value from the config is used.
+            use_threads: If True, DataSaver.get_results reads the
+                parameters of different instruments concurrently, with one
+                thread per instrument for the whole run.
+            trace_io: If True, the communication with all instruments
+                during the run is traced, and the statistics are added to
+                the dataset as the 'io_trace' metadata (as JSON), see
+                qcodes.utils.tracing.
         """
         return Runner(self.enteractions, self.exitactions,
                       self.experiment, station=self.station,
                       write_period=self._write_period,
                       parameters=self.parameters,
                       name=self.name,
-                      subscribers=self.subscribers)
+                      subscribers=self.subscribers,
+                      write_in_background=write_in_background,
+                      use_threads=use_threads,
+                      trace_io=trace_io)
@@ -1,11 +1,17 @@
+from collections import OrderedDict
 from contextlib import contextmanager
+import hashlib
+import json
 import logging
 import sqlite3
+import threading
 import time
 from numbers import Number
 from numpy import ndarray
 import numpy as np
 import io
+import struct
+import zlib
 from typing import Any, List, Optional, Tuple, Union, Dict, cast
 from distutils.version import LooseVersion
 import itertools
@@ -58,6 +64,10 @@ CREATE TABLE IF NOT EXISTS runs (
     completed_timestamp INTEGER,
     is_completed BOOL,
     parameters TEXT,
+    -- the number of results in the result table, maintained by the
+    -- functions inserting results. NULL for the runs created by versions
+    -- of QCoDeS that do not count them, see length
+    result_length INTEGER,
     -- metadata fields are added dynamically
     FOREIGN KEY(exp_id)
     REFERENCES
@@ -88,6 +98,20 @@ CREATE TABLE IF NOT EXISTS dependencies (
 );
 """
 
+_snapshots_table_schema = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    -- the sha256 hash of the snapshot serialized with sorted keys
+    snapshot_hash TEXT PRIMARY KEY,
+    -- the hash of the snapshot that this one is stored as a delta
+    -- against, NULL if it is stored in full
+    base_hash TEXT,
+    -- the number of deltas between this snapshot and a full one
+    depth INTEGER,
+    -- the snapshot or the delta as JSON
+    content TEXT
+);
+"""
+
 _unicode_categories = ('Lu', 'Ll', 'Lt', 'Lm', 'Lo', 'Nd', 'Pc', 'Pd', 'Zs')
 # utility function to allow sqlite/numpy type
 
@@ -109,6 +133,67 @@ def _convert_array(text: bytes) -> ndarray:
     return np.load(out)
 
 
+# Arrays of 'blob' columns are stored as a small header followed by the raw
+# array buffer: magic, compression flag, ndim, length of the dtype string,
+# the dtype string (e.g. '<f8') and the shape as ndim little-endian int64
+_BLOB_MAGIC = b'QCAB'
+_BLOB_HEADER = struct.Struct('<4sBBB')
+_BLOB_COMPRESSIONS = {'none': 0, 'zlib': 1}
+
+
+def encode_array_blob(arr: ndarray, compression: str = 'none') -> bytes:
+    """
+    Encode a numpy array for storage in a 'blob' column.
+
+    Args:
+        arr: the array to encode. Object and structured dtypes are not
+            supported.
+        compression: either 'none' or 'zlib' (fastest compression level)
+
+    Returns:
+        the header followed by the (possibly compressed) array buffer
+    """
+    if compression not in _BLOB_COMPRESSIONS:
+        raise ValueError(f'Unknown compression {compression}, must be one '
+                         f'of {list(_BLOB_COMPRESSIONS.keys())}')
+    arr = np.asarray(arr, order='C')
+    if arr.dtype.hasobject or arr.dtype.fields is not None:
+        raise ValueError(f'Can not store an array of dtype {arr.dtype} '
+                         'as a blob')
+    dtype = arr.dtype.str.encode('ascii')
+    header = (_BLOB_HEADER.pack(_BLOB_MAGIC, _BLOB_COMPRESSIONS[compression],
+                                arr.ndim, len(dtype))
+              + dtype + struct.pack(f'<{arr.ndim}q', *arr.shape))
+    data: Any = arr.data
+    if compression == 'zlib':
+        data = zlib.compress(data, 1)
+    return b''.join((header, data))
+
+
+def _convert_blob(blob: bytes) -> ndarray:
+    """
+    Convert the content of a 'blob' column back to a numpy array. The
+    returned array is a read-only view on the buffer read from the database
+    (or on the decompressed buffer), no copy of the data is made.
+    Arrays written with the generic numpy adapter (.npy format) are loaded
+    as such.
+    """
+    if blob[:len(_BLOB_MAGIC)] != _BLOB_MAGIC:
+        return _convert_array(blob)
+    _, compressed, ndim, dtype_len = _BLOB_HEADER.unpack_from(blob)
+    offset = _BLOB_HEADER.size
+    dtype = np.dtype(blob[offset:offset + dtype_len].decode('ascii'))
+    offset += dtype_len
+    shape = struct.unpack_from(f'<{ndim}q', blob, offset)
+    offset += 8*ndim
+    data = blob
+    if compressed:
+        compressed_data: Any = memoryview(blob)[offset:]
+        data = zlib.decompress(compressed_data)
+        offset = 0
+    return np.frombuffer(data, dtype=dtype, offset=offset).reshape(shape)
+
+
 def _convert_numeric(value: bytes) -> Union[float, int]:
     numeric = float(value)
     if np.isnan(numeric) or numeric != int(numeric):
@@ -172,28 +257,25 @@ def many_many(curr: sqlite3.Cursor, *columns: str) -> List[List[Any]]:
     return results
 
 
-def connect(name: str, debug: bool = False) -> sqlite3.Connection:
-    """Connect or create  database. If debug the queries will be echoed back.
-    This function takes care of registering the numpy/sqlite type
-    converters that we need.
-
-
-    Args:
-        name: name or path to the sqlite file
-        debug: whether or not to turn on tracing
+_types_registered = False
 
-    Returns:
-        conn: connection object to the database
 
+def _register_types() -> None:
+    """
+    Register the numpy/sqlite type adapters and converters that we need.
+    The registration is global to the sqlite3 module, so this is only done
+    once per process.
     """
+    global _types_registered
+    if _types_registered:
+        return
+
     # register numpy->binary(TEXT) adapter
     sqlite3.register_adapter(np.ndarray, _adapt_array)
     # register binary(TEXT) -> numpy converter
     # for some reasons mypy complains about this
     sqlite3.register_converter("array", _convert_array)
-    conn = sqlite3.connect(name, detect_types=sqlite3.PARSE_DECLTYPES)
-    # sqlite3 options
-    conn.row_factory = sqlite3.Row
+    sqlite3.register_converter("blob", _convert_blob)
 
     # Make sure numpy ints and floats types are inserted properly
     for numpy_int in [
@@ -207,6 +289,70 @@ def connect(name: str, debug: bool = False) -> sqlite3.Connection:
     for numpy_float in [np.float, np.float16, np.float32, np.float64]:
         sqlite3.register_adapter(numpy_float, _adapt_float)
 
+    _types_registered = True
+
+
+# the pragmas that a connection profile may set
+_PROFILE_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size',
+                    'mmap_size', 'temp_store')
+
+
+def apply_connection_profile(conn: sqlite3.Connection,
+                             profile: Optional[str] = None) -> None:
+    """
+    Set the pragmas of a connection profile (as defined in the
+    dataset.sqlite_profiles section of the config) on a connection.
+
+    Args:
+        conn: the connection to configure
+        profile: the name of the profile, defaults to the profile set as
+            dataset.sqlite_profile in the config
+    """
+    if profile is None:
+        profile = qc.config['dataset']['sqlite_profile']
+    profiles = qc.config['dataset']['sqlite_profiles']
+    if profile not in profiles:
+        raise ValueError(f'Unknown connection profile {profile}, must be '
+                         f'one of {list(profiles.keys())}')
+    for pragma, value in profiles[profile].items():
+        if pragma not in _PROFILE_PRAGMAS:
+            raise ValueError(f'Can not set pragma {pragma} in a connection '
+                             f'profile, allowed are {_PROFILE_PRAGMAS}')
+        try:
+            conn.execute(f'PRAGMA {pragma} = {value}').fetchall()
+        except sqlite3.OperationalError:
+            # the journal mode can not be changed while other
+            # connections to the database are open
+            log.warning(f'Could not set pragma {pragma} to {value}',
+                        exc_info=True)
+
+
+def connect(name: str, debug: bool = False,
+            profile: Optional[str] = None) -> sqlite3.Connection:
+    """Connect or create  database. If debug the queries will be echoed back.
+    This function takes care of registering the numpy/sqlite type
+    converters that we need and of setting the pragmas of the connection
+    profile. The database is not upgraded, which is left to the functions
+    writing to it (see perform_db_upgrade), such that opening it to read
+    does not change it.
+
+
+    Args:
+        name: name or path to the sqlite file
+        debug: whether or not to turn on tracing
+        profile: name of the connection profile, defaults to the one set
+            in the config
+
+    Returns:
+        conn: connection object to the database
+
+    """
+    _register_types()
+    conn = sqlite3.connect(name, detect_types=sqlite3.PARSE_DECLTYPES)
+    # sqlite3 options
+    conn.row_factory = sqlite3.Row
+    apply_connection_profile(conn, profile)
+
     if debug:
         conn.set_trace_callback(print)
     return conn
@@ -288,6 +434,8 @@ def init_db(conn: sqlite3.Connection)->None:
         transaction(conn, _runs_table_schema)
         transaction(conn, _layout_table_schema)
         transaction(conn, _dependencies_table_schema)
+        transaction(conn, _snapshots_table_schema)
+    perform_db_upgrade(conn)
 
 
 def insert_column(conn: sqlite3.Connection, table: str, name: str,
@@ -391,7 +539,15 @@ def insert_values(conn: sqlite3.Connection,
         ({_values})
     """
 
-    c = atomic_transaction(conn, query, *values)
+    try:
+        c = transaction(conn, query, *values)
+        _add_to_length(conn, formatted_name, 1)
+    except Exception as e:
+        logging.exception("Could not execute transaction, rolling back")
+        conn.rollback()
+        raise e
+
+    conn.commit()
     return c.lastrowid
 
 
@@ -465,10 +621,80 @@ def insert_many_values(conn: sqlite3.Connection,
             if ii == 0:
                 return_value = c.lastrowid
             start += chunk
+        _add_to_length(conn, formatted_name, no_of_rows)
 
     return return_value
 
 
+def as_column_list(value: Any, no_of_rows: int) -> List[Any]:
+    """
+    Turn the value of a single column into a list of row values. Arrays are
+    converted in one go with ``tolist`` and scalars are broadcast to the
+    requested number of rows.
+
+    Args:
+        value: an array, list or tuple of row values, or a scalar
+        no_of_rows: the number of rows to broadcast a scalar to
+
+    Returns:
+        the list of row values
+    """
+    if isinstance(value, ndarray):
+        if value.ndim == 1:
+            return value.tolist()
+        return list(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value] * no_of_rows
+
+
+def insert_columns(conn: sqlite3.Connection,
+                   formatted_name: str,
+                   columns: List[str],
+                   values: List[Any],
+                   ) -> int:
+    """
+    Inserts whole columns of values for the specified columns. This is the
+    columnar counterpart of insert_many_values: no per-row containers are
+    built, the rows are streamed straight into executemany.
+
+    Example input:
+    columns: ['xparam', 'yparam', 'zparam']
+    values: [np.array([x1, x2, x3]), np.array([y1, y2, y3]), z]
+
+    Scalars (here z) are broadcast to the length of the array-like columns.
+
+    Returns:
+        the rowid of the first inserted row
+    """
+    lengths = {len(val) for val in values
+               if isinstance(val, (ndarray, list, tuple))}
+    if len(lengths) > 1:
+        raise ValueError('Wrong input format for values. Must specify the '
+                         'same number of values for all columns. Received'
+                         f' lengths {sorted(lengths)}.')
+    no_of_rows = lengths.pop() if lengths else 1
+    if no_of_rows == 0:
+        return length(conn, formatted_name) + 1
+
+    _columns = ",".join(columns)
+    _values = ",".join(["?"] * len(columns))
+    query = f"""INSERT INTO "{formatted_name}"
+        ({_columns})
+    VALUES
+        ({_values})
+    """
+    rows = zip(*[as_column_list(val, no_of_rows) for val in values])
+
+    with atomic(conn):
+        c = conn.cursor()
+        c.executemany(query, rows)
+        last_rowid = one(transaction(conn, 'SELECT last_insert_rowid()'), 0)
+        _add_to_length(conn, formatted_name, no_of_rows)
+
+    return last_rowid - no_of_rows + 1
+
+
 def modify_values(conn: sqlite3.Connection,
                   formatted_name: str,
                   index: int,
@@ -496,6 +722,33 @@ def modify_values(conn: sqlite3.Connection,
     return c.rowcount
 
 
+def _update_rows_query(formatted_name: str, columns: List[str]) -> str:
+    """
+    Build the prepared UPDATE statement setting the given columns of the
+    row with the rowid given as the last parameter
+    """
+    name_val_templates = ",".join(f"{name}=?" for name in columns)
+    return f"""
+    UPDATE "{formatted_name}"
+    SET
+        {name_val_templates}
+    WHERE
+        rowid = ?
+    """
+
+
+def _check_modify_bounds(conn: sqlite3.Connection, formatted_name: str,
+                         start_index: int, no_of_rows: int) -> None:
+    _len = length(conn, formatted_name)
+    if start_index < 0 or start_index + no_of_rows > _len:
+        available = max(_len - start_index, 0)
+        reason = f""""Modify operation Out of bounds.
+        Trying to modify {no_of_rows} results from index {start_index},
+        but therere are only {available} results.
+        """
+        raise ValueError(reason)
+
+
 def modify_many_values(conn: sqlite3.Connection,
                        formatted_name: str,
                        start_index: int,
@@ -503,30 +756,84 @@ def modify_many_values(conn: sqlite3.Connection,
                        list_of_values: List[VALUES],
                        ) -> None:
     """
-    Modify many values for the specified columns.
+    Modify many values for the specified columns of consecutive rows,
+    starting at the (zero-based) start_index, with one list of values
+    (in the order of columns) per row.
     If a column is in the table but not in the column list is
     left untouched.
     If a column is mapped to None, it will be a null value.
+
+    All rows are updated with a single prepared statement. The statement
+    is not committed, such that several calls can be guarded by one
+    transaction (see atomic).
     """
-    _len = length(conn, formatted_name)
-    len_requested = start_index + len(list_of_values[0])
-    available = _len - start_index
-    if len_requested > _len:
-        reason = f""""Modify operation Out of bounds.
-        Trying to modify {len(list_of_values)} results,
-        but therere are only {available} results.
-        """
-        raise ValueError(reason)
-    for values in list_of_values:
-        modify_values(conn, formatted_name, start_index, columns, values)
-        start_index += 1
+    _check_modify_bounds(conn, formatted_name, start_index,
+                         len(list_of_values))
+    rows = ([*values, rowid] for rowid, values
+            in enumerate(list_of_values, start_index + 1))
+    conn.cursor().executemany(_update_rows_query(formatted_name, columns),
+                              rows)
+
+
+def modify_columns(conn: sqlite3.Connection,
+                   formatted_name: str,
+                   start_index: int,
+                   columns: List[str],
+                   values: List[Any],
+                   ) -> None:
+    """
+    Modify whole columns of values of consecutive rows, starting at the
+    (zero-based) start_index. This is the columnar counterpart of
+    modify_many_values, see insert_columns for the format of the values.
+
+    Like modify_many_values, the statement is not committed.
+    """
+    lengths = {len(val) for val in values
+               if isinstance(val, (ndarray, list, tuple))}
+    if len(lengths) > 1:
+        raise ValueError('Wrong input format for values. Must specify the '
+                         'same number of values for all columns. Received'
+                         f' lengths {sorted(lengths)}.')
+    no_of_rows = lengths.pop() if lengths else 1
+    _check_modify_bounds(conn, formatted_name, start_index, no_of_rows)
+    rowids = range(start_index + 1, start_index + no_of_rows + 1)
+    rows = zip(*[as_column_list(val, no_of_rows) for val in values],
+               rowids)
+    conn.cursor().executemany(_update_rows_query(formatted_name, columns),
+                              rows)
+
+
+def _add_to_length(conn: sqlite3.Connection, formatted_name: str,
+                   no_of_rows: int) -> None:
+    """
+    Add to the number of results of the run with the given result table,
+    as part of the transaction inserting the results
+    """
+    try:
+        transaction(conn, """
+        UPDATE runs SET result_length = result_length + ?
+        WHERE result_table_name = ?
+        """, no_of_rows, formatted_name)
+    except sqlite3.OperationalError:
+        # a database that has not been upgraded has no result_length, and
+        # length falls back to the result table
+        pass
 
 
 def length(conn: sqlite3.Connection,
            formatted_name: str
            ) -> int:
     """
-    Return the lenght of the table
+    Return the lenght of the table. For the result table of a run, this is
+    the number of results stored in the runs table, which does not require
+    accessing the result table itself.
+
+    The number of results is only counted by writers of this version of
+    QCoDeS on (schema version 1). Runs created by older versions have no
+    count, and for them (and in databases that have not been upgraded) the
+    length is read from the result table. Results that an older version adds
+    to a run created by a newer one are not counted, so the count is only
+    correct if every writer of the database is of this version or newer.
 
     Args:
         conn: the connection to the sqlite database
@@ -535,6 +842,16 @@ def length(conn: sqlite3.Connection,
     Returns:
         the lenght of the table
     """
+    try:
+        c = transaction(conn, """
+        SELECT result_length FROM runs WHERE result_table_name = ?
+        """, formatted_name)
+        row = c.fetchone()
+    except sqlite3.OperationalError:
+        # a database that has not been upgraded
+        row = None
+    if row is not None and row[0] is not None:
+        return row[0]
     query = f"select MAX(id) from '{formatted_name}'"
     c = atomic_transaction(conn, query)
     _len = c.fetchall()[0][0]
@@ -565,6 +882,20 @@ def get_data(conn: sqlite3.Connection,
         the data requested
     """
     _columns = ",".join(columns)
+    query = _select_range_query(table_name, _columns, start, end)
+    c = atomic_transaction(conn, query)
+    res = many_many(c, *columns)
+
+    return res
+
+
+def _select_range_query(table_name: str, _columns: str,
+                        start: Optional[int] = None,
+                        end: Optional[int] = None) -> str:
+    """
+    Build the query selecting the given (comma-separated) columns from a
+    range of rows of a table, as used by get_data and get_data_as_arrays
+    """
     if start and end:
         query = f"""
         SELECT {_columns}
@@ -593,10 +924,213 @@ def get_data(conn: sqlite3.Connection,
         SELECT {_columns}
         FROM "{table_name}"
         """
-    c = atomic_transaction(conn, query)
-    res = many_many(c, *columns)
+    return query
 
-    return res
+
+def _column_types(conn: sqlite3.Connection, table_name: str) -> Dict[str, str]:
+    """
+    Get the declared (sqlite) types of the columns of a table
+    """
+    c = atomic_transaction(conn, f'PRAGMA TABLE_INFO("{table_name}")')
+    return {row['name']: row['type'] for row in c.fetchall()}
+
+
+def get_data_as_arrays(conn: sqlite3.Connection,
+                       table_name: str,
+                       columns: List[str],
+                       start: int = None,
+                       end: int = None,
+                       chunk_size: int = 100_000
+                       ) -> List[ndarray]:
+    """
+    Get data from the columns of a table as one numpy array per column.
+    Allows to specify a range in the same way as get_data.
+
+    The dtype of each array follows the type of the column: 'numeric'
+    columns are returned as float arrays (NULLs become NaN), while 'text'
+    and 'array' columns are returned as object arrays. Numeric values are
+    fetched without going through the registered 'numeric' converter and
+    without building row objects; the cursor is read in chunks of
+    chunk_size rows which are converted to arrays in one go.
+
+    Args:
+        conn: database connection
+        table_name: name of the table
+        columns: list of columns
+        start: start of range (1 indedex)
+        end: start of range (1 indedex)
+        chunk_size: the number of rows to fetch from the cursor at a time
+
+    Returns:
+        list of arrays, one per requested column
+    """
+    _columns, numeric = _array_select_columns(conn, table_name, columns)
+    query = _select_range_query(table_name, _columns, start, end)
+    return _fetch_arrays(conn, query, numeric, chunk_size)
+
+
+def _array_select_columns(conn: sqlite3.Connection, table_name: str,
+                          columns: List[str]) -> Tuple[str, List[bool]]:
+    """
+    Build the column part of a SELECT for fetching columns as arrays.
+
+    Numeric columns are selected as expressions (unary plus), which strips
+    their declared type, such that no converter is called per cell.
+
+    Returns:
+        the comma-separated columns to select and, per column, whether it
+        is numeric
+    """
+    types = _column_types(conn, table_name)
+    numeric = [types.get(col) == 'numeric' for col in columns]
+    _columns = ",".join(f'+"{col}"' if is_num else f'"{col}"'
+                        for col, is_num in zip(columns, numeric))
+    return _columns, numeric
+
+
+def _fetch_arrays(conn: sqlite3.Connection, query: str,
+                  numeric: List[bool],
+                  chunk_size: int = 100_000) -> List[ndarray]:
+    """
+    Execute a SELECT query and return the result as one array per selected
+    column. The cursor is read in chunks of chunk_size plain tuples, and
+    the numeric columns of each chunk are converted to floats in one go.
+
+    Args:
+        conn: database connection
+        query: the SELECT query to execute
+        numeric: per selected column, whether it is numeric
+        chunk_size: the number of rows to fetch from the cursor at a time
+    """
+    numeric_cols = [n for n, is_num in enumerate(numeric) if is_num]
+    other_cols = [n for n, is_num in enumerate(numeric) if not is_num]
+
+    c = conn.cursor()
+    c.row_factory = None
+    c.execute(query)
+
+    numeric_chunks: List[ndarray] = []
+    other_chunks: List[List[Tuple[Any, ...]]] = []
+    while True:
+        rows = c.fetchmany(chunk_size)
+        if not rows:
+            break
+        if not other_cols:
+            numeric_chunks.append(np.array(rows, dtype=float))
+        elif not numeric_cols:
+            other_chunks.append(rows)
+        else:
+            by_column = list(zip(*rows))
+            numeric_chunks.append(
+                np.array([by_column[n] for n in numeric_cols],
+                         dtype=float).T)
+            other_chunks.append(
+                list(zip(*[by_column[n] for n in other_cols])))
+    c.close()
+
+    output: List[ndarray] = [np.empty(0)] * len(numeric)
+    if numeric_cols:
+        if numeric_chunks:
+            data = np.concatenate(numeric_chunks)
+        else:
+            data = np.empty((0, len(numeric)))
+        for m, n in enumerate(numeric_cols):
+            output[n] = np.ascontiguousarray(data[:, m])
+    for m, n in enumerate(other_cols):
+        values = [row[m] for rows in other_chunks for row in rows]
+        column = np.empty(len(values), dtype=object)
+        # assign one by one, since numpy would otherwise try to broadcast
+        # stored arrays into the column
+        for i, value in enumerate(values):
+            column[i] = value
+        output[n] = column
+
+    return output
+
+
+def get_dependent_data_as_arrays(conn: sqlite3.Connection,
+                                 table_name: str,
+                                 param_name: str,
+                                 setpoint_names: List[str]
+                                 ) -> List[ndarray]:
+    """
+    Get the not-null values of a dependent parameter together with the
+    corresponding values of its setpoints. Everything is fetched with a
+    single SELECT, i.e. with a single scan of the table.
+
+    Args:
+        conn: Connection to the database
+        table_name: Name of the table that holds the data
+        param_name: Name of the dependent parameter
+        setpoint_names: Names of the setpoints of the parameter
+
+    Returns:
+        One array per setpoint (in the given order) followed by the array
+        of values of the parameter
+    """
+    columns = list(setpoint_names) + [param_name]
+    _columns, numeric = _array_select_columns(conn, table_name, columns)
+    query = f"""
+    SELECT {_columns}
+    FROM "{table_name}"
+    WHERE "{param_name}" IS NOT NULL
+    """
+    return _fetch_arrays(conn, query, numeric)
+
+
+def get_last_rowid(conn: sqlite3.Connection, table_name: str) -> int:
+    """
+    Get the largest rowid of a table, or 0 if the table is empty
+    """
+    c = conn.execute(f'SELECT MAX(rowid) FROM "{table_name}"')
+    rowid = c.fetchone()[0]
+    return 0 if rowid is None else rowid
+
+
+def get_rows_after(conn: sqlite3.Connection,
+                   table_name: str,
+                   columns: List[str],
+                   rowid: int,
+                   as_arrays: bool = False
+                   ) -> Tuple[int, Union[List[Tuple[Any, ...]],
+                                         List[ndarray]]]:
+    """
+    Get the values of the given columns of all rows of a table added after
+    the row with the given rowid, in the order of insertion.
+
+    Args:
+        conn: database connection
+        table_name: name of the table
+        columns: list of columns
+        rowid: the rowid after which to start
+        as_arrays: if True, return one array per column (see
+            get_data_as_arrays), else one tuple per row
+
+    Returns:
+        the largest rowid read (or the given one if there are no new rows)
+        and the values
+    """
+    _columns, numeric = _array_select_columns(conn, table_name, columns)
+    _columns = ",".join(['rowid'] + ([_columns] if columns else []))
+    query = f"""
+    SELECT {_columns}
+    FROM "{table_name}"
+    WHERE rowid > {rowid}
+    ORDER BY rowid
+    """
+    if as_arrays:
+        rowids, *arrays = _fetch_arrays(conn, query, [True] + numeric)
+        if len(rowids):
+            rowid = int(rowids[-1])
+        return rowid, arrays
+
+    c = conn.cursor()
+    c.row_factory = None
+    rows = c.execute(query).fetchall()
+    c.close()
+    if rows:
+        rowid = rows[-1][0]
+    return rowid, [row[1:] for row in rows]
 
 
 def get_values(conn: sqlite3.Connection,
@@ -625,7 +1159,9 @@ def get_values(conn: sqlite3.Connection,
 
 def get_setpoints(conn: sqlite3.Connection,
                   table_name: str,
-                  param_name: str) -> List[List[List[Any]]]:
+                  param_name: str,
+                  setpoint_names: Optional[List[str]] = None
+                  ) -> List[List[List[Any]]]:
     """
     Get the setpoints for a given dependent parameter
 
@@ -633,63 +1169,92 @@ def get_setpoints(conn: sqlite3.Connection,
         conn: Connection to the database
         table_name: Name of the table that holds the data
         param_name: Name of the parameter to get the setpoints of
+        setpoint_names: The names of the setpoints of the parameter, if
+            already known (e.g. from get_dependency_graph). If not given,
+            they are looked up.
 
     Returns:
         A list of returned setpoint values. Each setpoint return value
         is a list of lists of Any. The first list is a list of run points,
         the second list is a list of parameter values.
     """
-    # TODO: We do this in no less than 5 table lookups, surely
-    # this number can be reduced
-
-    # get run_id
-    sql = """
-    SELECT run_id FROM runs WHERE result_table_name = ?
+    if setpoint_names is None:
+        sql = """
+        SELECT run_id FROM runs WHERE result_table_name = ?
+        """
+        c = atomic_transaction(conn, sql, table_name)
+        run_id = one(c, 'run_id')
+        setpoint_names = get_dependency_graph(conn, run_id).get(param_name,
+                                                                [])
+    if not setpoint_names:
+        return []
+
+    # get the actual setpoint data, all setpoints in one go
+    _columns = ",".join(setpoint_names)
+    sql = f"""
+    SELECT {_columns}
+    FROM "{table_name}"
+    WHERE {param_name} IS NOT NULL
     """
-    c = atomic_transaction(conn, sql, table_name)
-    run_id = one(c, 'run_id')
+    c = atomic_transaction(conn, sql)
+    rows = c.fetchall()
+    output = [[[row[n]] for row in rows] for n in range(len(setpoint_names))]
 
-    # get the parameter layout id
-    sql = """
-    SELECT layout_id FROM layouts
-    WHERE parameter = ?
-    and run_id = ?
+    return output
+
+
+def get_dependency_graph(conn: sqlite3.Connection,
+                         run_id: int) -> Dict[str, List[str]]:
     """
-    c = atomic_transaction(conn, sql, param_name, run_id)
-    layout_id = one(c, 'layout_id')
+    Get the dependencies of all the dependent parameters of a run with a
+    single query
 
-    # get the setpoint layout ids
+    Args:
+        conn: The database connection
+        run_id: The run_id as in the runs table
+
+    Returns:
+        A dict mapping the name of each dependent parameter (ordered by
+        layout_id) to the list of names of its setpoints (ordered by axis)
+    """
     sql = """
-    SELECT independent FROM dependencies
-    WHERE dependent = ?
+    SELECT dep.parameter AS dependent, indep.parameter AS independent
+    FROM dependencies
+    JOIN layouts AS dep ON dep.layout_id = dependencies.dependent
+    JOIN layouts AS indep ON indep.layout_id = dependencies.independent
+    WHERE dep.run_id = ?
+    ORDER BY dependencies.dependent, dependencies.axis_num
     """
-    c = atomic_transaction(conn, sql, layout_id)
-    indeps = many_many(c, 'independent')
-    indeps = [idp[0] for idp in indeps]
+    c = atomic_transaction(conn, sql, run_id)
+    graph: Dict[str, List[str]] = {}
+    for dependent, independent in many_many(c, 'dependent', 'independent'):
+        graph.setdefault(dependent, []).append(independent)
+    return graph
 
-    # get the setpoint names
-    sql = f"""
-    SELECT parameter FROM layouts WHERE layout_id
-    IN {str(indeps).replace('[', '(').replace(']', ')')}
+
+def get_layouts(conn: sqlite3.Connection,
+                run_id: int) -> Dict[str, Dict[str, str]]:
     """
-    c = atomic_transaction(conn, sql)
-    setpoint_names_temp = many_many(c, 'parameter')
-    setpoint_names = [spn[0] for spn in setpoint_names_temp]
-    setpoint_names = cast(List[str], setpoint_names)
+    Get the layouts of all parameters of a run with a single query
 
-    # get the actual setpoint data
-    output = []
-    for sp_name in setpoint_names:
-        sql = f"""
-        SELECT {sp_name}
-        FROM "{table_name}"
-        WHERE {param_name} IS NOT NULL
-        """
-        c = atomic_transaction(conn, sql)
-        sps = many_many(c, sp_name)
-        output.append(sps)
+    Args:
+        conn: The database connection
+        run_id: The run_id as in the runs table
 
-    return output
+    Returns:
+        A dict mapping the name of each parameter (ordered by layout_id)
+        to a dict with name, label, and unit
+    """
+    sql = """
+    SELECT parameter, label, unit FROM layouts
+    WHERE run_id = ?
+    ORDER BY layout_id
+    """
+    c = atomic_transaction(conn, sql, run_id)
+    layouts: Dict[str, Dict[str, str]] = {}
+    for name, label, unit in many_many(c, 'parameter', 'label', 'unit'):
+        layouts[name] = {'name': name, 'label': label, 'unit': unit}
+    return layouts
 
 
 def get_layout(conn: sqlite3.Connection,
@@ -796,6 +1361,7 @@ def new_experiment(conn: sqlite3.Connection,
     Returns:
         id: row-id of the created experiment
     """
+    perform_db_upgrade(conn)
     query = """
     INSERT INTO experiments
         (name, sample_name, start_time, format_string, run_counter)
@@ -938,6 +1504,85 @@ def get_runs(conn: sqlite3.Connection,
     return c.fetchall()
 
 
+def get_run_summaries(conn: sqlite3.Connection,
+                      exp_id: Optional[int] = None,
+                      sample_name: Optional[str] = None,
+                      name: Optional[str] = None,
+                      limit: Optional[int] = None,
+                      offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Get a summary of runs, ordered by run_id, with a single query that
+    does not touch the result tables (except for the runs without a count
+    of their results, see length).
+
+    Args:
+        conn: database connection
+        exp_id: only get the runs of this experiment
+        sample_name: only get the runs of experiments on this sample
+        name: only get the runs with this name
+        limit: the maximal number of runs to get, all if None
+        offset: the number of (matching) runs to skip
+
+    Returns:
+        list of dicts with the columns run_id, exp_id, exp_name,
+        sample_name, name, result_counter, run_timestamp,
+        completed_timestamp, is_completed, result_length and parameters
+    """
+    c = atomic_transaction(conn, 'PRAGMA TABLE_INFO(runs)')
+    if 'result_length' in [row['name'] for row in c.fetchall()]:
+        result_length = 'runs.result_length'
+    else:
+        # a database that has not been upgraded
+        result_length = 'NULL AS result_length'
+
+    conditions = []
+    args: List[Any] = []
+    for column, value in (('runs.exp_id', exp_id),
+                          ('experiments.sample_name', sample_name),
+                          ('runs.name', name)):
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            args.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    sql = f"""
+    SELECT
+        runs.run_id, runs.exp_id, experiments.name AS exp_name,
+        experiments.sample_name, runs.name, runs.result_counter,
+        runs.run_timestamp, runs.completed_timestamp, runs.is_completed,
+        {result_length}, runs.parameters, runs.result_table_name
+    FROM runs
+    JOIN experiments ON experiments.exp_id = runs.exp_id
+    {where}
+    ORDER BY runs.run_id
+    LIMIT ? OFFSET ?
+    """
+    # a negative limit means no limit to SQLite
+    args += [-1 if limit is None else limit, offset]
+    c = atomic_transaction(conn, sql, *args)
+    summaries = []
+    for row in c.fetchall():
+        summary = dict(zip(row.keys(), row))
+        table_name = summary.pop('result_table_name')
+        if summary['result_length'] is None:
+            summary['result_length'] = length(conn, table_name)
+        summaries.append(summary)
+    return summaries
+
+
+def get_number_of_runs(conn: sqlite3.Connection,
+                       exp_id: Optional[int] = None) -> int:
+    """
+    Get the number of runs in the database, or of one experiment
+    """
+    if exp_id is None:
+        c = atomic_transaction(conn, 'SELECT COUNT(*) FROM runs')
+    else:
+        c = atomic_transaction(conn, 'SELECT COUNT(*) FROM runs '
+                                     'WHERE exp_id = ?', exp_id)
+    return c.fetchone()[0]
+
+
 def get_last_run(conn: sqlite3.Connection, exp_id: int) -> str:
     query = """
     SELECT run_id, max(run_timestamp), exp_id
@@ -981,9 +1626,9 @@ def _insert_run(conn: sqlite3.Connection, exp_id: int, name: str,
         if parameters:
             query = f"""
             INSERT INTO {table}
-                (name,exp_id,result_table_name,result_counter,run_timestamp,parameters,is_completed)
+                (name,exp_id,result_table_name,result_counter,run_timestamp,parameters,is_completed,result_length)
             VALUES
-                (?,?,?,?,?,?,?)
+                (?,?,?,?,?,?,?,0)
             """
             curr = transaction(conn, query,
                                name,
@@ -1000,9 +1645,9 @@ def _insert_run(conn: sqlite3.Connection, exp_id: int, name: str,
         else:
             query = f"""
             INSERT INTO {table}
-                (name,exp_id,result_table_name,result_counter,run_timestamp,is_completed)
+                (name,exp_id,result_table_name,result_counter,run_timestamp,is_completed,result_length)
             VALUES
-                (?,?,?,?,?,?)
+                (?,?,?,?,?,?,0)
             """
             curr = transaction(conn, query,
                                name,
@@ -1289,7 +1934,7 @@ def create_run(conn: sqlite3.Connection, exp_id: int, name: str,
         - run_id: the row id of the newly created run
         - formatted_name: the name of the newly created table
     """
-
+    perform_db_upgrade(conn)
     run_counter, formatted_name, run_id = _insert_run(conn,
                                                       exp_id,
                                                       name,
@@ -1302,6 +1947,186 @@ def create_run(conn: sqlite3.Connection, exp_id: int, name: str,
     return run_counter, run_id, formatted_name
 
 
+# a snapshot is stored in full (instead of as a delta) once it would take
+# more than this number of deltas to get to it from a full snapshot
+_MAX_SNAPSHOT_DELTA_DEPTH = 20
+# the number of recently stored or loaded snapshots kept in memory, such
+# that storing the next snapshot does not need to load its base
+_SNAPSHOT_CACHE_SIZE = 4
+_snapshot_cache: 'OrderedDict[str, Any]' = OrderedDict()
+_snapshot_cache_lock = threading.Lock()
+
+
+def _cache_snapshot(snapshot_hash: str, snapshot: Any) -> None:
+    with _snapshot_cache_lock:
+        _snapshot_cache[snapshot_hash] = snapshot
+        _snapshot_cache.move_to_end(snapshot_hash)
+        while len(_snapshot_cache) > _SNAPSHOT_CACHE_SIZE:
+            _snapshot_cache.popitem(last=False)
+
+
+def _cached_snapshot(snapshot_hash: str) -> Any:
+    with _snapshot_cache_lock:
+        return _snapshot_cache.get(snapshot_hash)
+
+
+def _snapshot_delta(old: Dict[str, Any],
+                    new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the delta that turns the snapshot old into the snapshot new (both
+    as loaded from JSON): the items that were added or changed, the deltas
+    of the items that are dicts in both, and the keys that were removed.
+    Empty parts are left out, so identical snapshots give an empty delta.
+    """
+    changed = {}
+    nested = {}
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+            continue
+        old_value = old[key]
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            sub_delta = _snapshot_delta(old_value, value)
+            if sub_delta:
+                nested[key] = sub_delta
+        elif isinstance(value, list):
+            # compare as JSON, since e.g. [1] == [True]
+            if json.dumps(value) != json.dumps(old_value):
+                changed[key] = value
+        elif type(value) is not type(old_value) or value != old_value:
+            changed[key] = value
+    removed = [key for key in old if key not in new]
+
+    delta: Dict[str, Any] = {}
+    if changed:
+        delta['changed'] = changed
+    if nested:
+        delta['nested'] = nested
+    if removed:
+        delta['removed'] = removed
+    return delta
+
+
+def _apply_snapshot_delta(base: Dict[str, Any],
+                          delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply a delta of _snapshot_delta to a snapshot. The base snapshot is
+    not modified; the unchanged items are shared with it.
+    """
+    snapshot = dict(base)
+    for key in delta.get('removed', []):
+        del snapshot[key]
+    snapshot.update(delta.get('changed', {}))
+    for key, nested in delta.get('nested', {}).items():
+        snapshot[key] = _apply_snapshot_delta(snapshot[key], nested)
+    return snapshot
+
+
+def _load_snapshot(conn: sqlite3.Connection, snapshot_hash: str) -> Any:
+    """
+    Load a snapshot from the snapshots table by applying the deltas of the
+    chain from the closest full (or cached) snapshot. The result is cached
+    and must not be modified.
+    """
+    deltas = []
+    current_hash = snapshot_hash
+    while True:
+        snapshot = _cached_snapshot(current_hash)
+        if snapshot is not None:
+            break
+        c = atomic_transaction(conn, 'SELECT base_hash, content '
+                                     'FROM snapshots WHERE snapshot_hash = ?',
+                               current_hash)
+        row = c.fetchone()
+        if row is None:
+            raise ValueError(f'No snapshot with hash {current_hash}')
+        if row['base_hash'] is None:
+            snapshot = json.loads(row['content'])
+            break
+        deltas.append(json.loads(row['content']))
+        current_hash = row['base_hash']
+
+    for delta in reversed(deltas):
+        snapshot = _apply_snapshot_delta(snapshot, delta)
+    _cache_snapshot(snapshot_hash, snapshot)
+    return snapshot
+
+
+def insert_snapshot(conn: sqlite3.Connection, snapshot: str) -> str:
+    """
+    Store a snapshot in the snapshots table, unless an identical one is
+    stored already. A new snapshot is stored as a delta against the
+    snapshot stored last, as long as the delta is the smaller of the two
+    and the chain of deltas from a full snapshot does not get too long.
+
+    Args:
+        conn: database connection
+        snapshot: the snapshot as JSON
+
+    Returns:
+        the hash of the snapshot, by which it can be retrieved with
+        get_snapshot
+    """
+    # the snapshots table is made by the upgrade to version 3
+    perform_db_upgrade(conn)
+    parsed = json.loads(snapshot)
+    canonical = json.dumps(parsed, sort_keys=True)
+    snapshot_hash = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    with atomic(conn):
+        c = transaction(conn, 'SELECT depth FROM snapshots '
+                              'WHERE snapshot_hash = ?', snapshot_hash)
+        if c.fetchone() is None:
+            base_hash, depth, content = None, 0, canonical
+            c = transaction(conn, 'SELECT snapshot_hash, depth FROM snapshots '
+                                  'ORDER BY rowid DESC LIMIT 1')
+            last = c.fetchone()
+            if (isinstance(parsed, dict) and last is not None
+                    and last['depth'] < _MAX_SNAPSHOT_DELTA_DEPTH):
+                base = _load_snapshot(conn, last['snapshot_hash'])
+                if isinstance(base, dict):
+                    delta = json.dumps(_snapshot_delta(base, parsed),
+                                       sort_keys=True)
+                    if len(delta) < len(canonical):
+                        base_hash = last['snapshot_hash']
+                        depth = last['depth'] + 1
+                        content = delta
+            transaction(conn, 'INSERT INTO snapshots '
+                              '(snapshot_hash, base_hash, depth, content) '
+                              'VALUES (?, ?, ?, ?)',
+                        snapshot_hash, base_hash, depth, content)
+    _cache_snapshot(snapshot_hash, parsed)
+    return snapshot_hash
+
+
+def get_snapshot(conn: sqlite3.Connection, snapshot_hash: str) -> str:
+    """
+    Get a snapshot stored with insert_snapshot, as JSON with sorted keys
+    """
+    return json.dumps(_load_snapshot(conn, snapshot_hash), sort_keys=True)
+
+
+def get_run_snapshot(conn: sqlite3.Connection, run_id: int) -> Optional[str]:
+    """
+    Get the snapshot of a run as JSON, either from the snapshots table or,
+    for runs stored before it existed, from the snapshot column of the runs
+    table
+
+    Returns:
+        the snapshot, or None if the run has none
+    """
+    c = atomic_transaction(conn, 'PRAGMA TABLE_INFO(runs)')
+    columns = [row['name'] for row in c.fetchall()]
+    if 'snapshot_hash' in columns:
+        snapshot_hash = select_one_where(conn, 'runs', 'snapshot_hash',
+                                         'run_id', run_id)
+        if snapshot_hash is not None:
+            return get_snapshot(conn, snapshot_hash)
+    if 'snapshot' in columns:
+        return select_one_where(conn, 'runs', 'snapshot', 'run_id', run_id)
+    return None
+
+
 def get_metadata(conn: sqlite3.Connection, tag: str, table_name: str):
     """ Get metadata under the tag from table
     """
@@ -1375,6 +2200,98 @@ def set_user_version(conn: sqlite3.Connection, version: int) -> None:
     atomic_transaction(conn, 'PRAGMA user_version({})'.format(version))
 
 
+def perform_db_upgrade(conn: sqlite3.Connection) -> None:
+    """
+    Upgrade the database to the latest version by applying all the upgrades
+    from its current (user) version on. A database that has not been
+    initialised yet (i.e. has no runs table) is left untouched.
+
+    This is done when a database is initialised (init_db) and before
+    experiments, runs and snapshots are stored in it, not when it is only
+    read.
+    """
+    upgrades = [perform_db_upgrade_0_to_1, perform_db_upgrade_1_to_2,
+                perform_db_upgrade_2_to_3]
+    version = get_user_version(conn)
+    if version >= len(upgrades):
+        return
+    c = atomic_transaction(conn, """
+    SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'runs'
+    """)
+    if c.fetchone() is None:
+        return
+    for upgrade in upgrades[version:]:
+        upgrade(conn)
+
+
+def perform_db_upgrade_0_to_1(conn: sqlite3.Connection) -> None:
+    """
+    Add the result_length column to the runs table and fill it in for the
+    existing runs. The runs are indexed by their result table name, since
+    the length is looked up and updated by that name.
+    """
+    with atomic(conn):
+        c = transaction(conn, 'PRAGMA TABLE_INFO(runs)')
+        if 'result_length' not in [row['name'] for row in c.fetchall()]:
+            # NULL for the runs that older versions create afterwards
+            transaction(conn, 'ALTER TABLE runs ADD COLUMN '
+                              'result_length INTEGER')
+            c = transaction(conn, 'SELECT run_id, result_table_name '
+                                  'FROM runs')
+            for run_id, table_name in c.fetchall():
+                try:
+                    c = transaction(conn,
+                                    f'SELECT MAX(id) FROM "{table_name}"')
+                    _len = c.fetchone()[0] or 0
+                except sqlite3.OperationalError:
+                    # the result table is missing
+                    _len = 0
+                transaction(conn, 'UPDATE runs SET result_length = ? '
+                                  'WHERE run_id = ?', _len, run_id)
+        transaction(conn, 'CREATE INDEX IF NOT EXISTS '
+                          'runs_result_table_name ON runs(result_table_name)')
+        transaction(conn, 'PRAGMA user_version(1)')
+
+
+# the indexes created by perform_db_upgrade_1_to_2, as (index name, table,
+# indexed columns)
+_catalog_indexes = [
+    ('runs_exp_id', 'runs', 'exp_id, result_counter'),
+    ('runs_run_timestamp', 'runs', 'run_timestamp'),
+    ('experiments_name', 'experiments', 'name, sample_name'),
+    ('layouts_run_id', 'layouts', 'run_id, parameter'),
+    ('dependencies_dependent', 'dependencies', 'dependent, axis_num'),
+]
+
+
+def perform_db_upgrade_1_to_2(conn: sqlite3.Connection) -> None:
+    """
+    Index the runs by experiment and by timestamp, the experiments by name,
+    and the layouts and dependencies by the run and parameter they belong
+    to, such that listing and looking up runs and experiments does not scan
+    these tables.
+    """
+    with atomic(conn):
+        c = transaction(conn, "SELECT name FROM sqlite_master "
+                              "WHERE type = 'table'")
+        tables = [row['name'] for row in c.fetchall()]
+        for index, table, columns in _catalog_indexes:
+            if table in tables:
+                transaction(conn, f'CREATE INDEX IF NOT EXISTS {index} '
+                                  f'ON {table}({columns})')
+        transaction(conn, 'PRAGMA user_version(2)')
+
+
+def perform_db_upgrade_2_to_3(conn: sqlite3.Connection) -> None:
+    """
+    Add the snapshots table. The snapshots of the runs of older versions
+    stay in the snapshot column of the runs table.
+    """
+    with atomic(conn):
+        transaction(conn, _snapshots_table_schema)
+        transaction(conn, 'PRAGMA user_version(3)')
+
+
 def get_experiment_name_from_experiment_id(
         conn: sqlite3.Connection, exp_id: int) -> str:
     return select_one_where(
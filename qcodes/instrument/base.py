@@ -1,5 +1,7 @@
 """Instrument base class."""
+import asyncio
 import logging
+import threading
 import time
 import warnings
 import weakref
@@ -10,8 +12,11 @@ if TYPE_CHECKING:
     from qcodes.instrument.channel import ChannelList
 from qcodes.utils.helpers import DelegateAttributes, strip_attrs, full_class
 from qcodes.utils.metadata import Metadatable
+from qcodes.utils.threading import InstrumentWorker
+from qcodes.utils.tracing import io_tracer
 from qcodes.utils.validators import Anything
 from .parameter import Parameter, _BaseParameter
+from .parameter_group import ParameterGroup
 from .function import Function
 
 log = logging.getLogger(__name__)
@@ -40,6 +45,10 @@ class InstrumentBase(Metadatable, DelegateAttributes):
         submodules (Dict[Metadatable]): All the submodules of this instrument
             such as channel lists or logical groupings of parameters.
             Usually populated via ``add_submodule``
+
+        parameter_groups (Dict[ParameterGroup]): Groups of parameters that
+            are read with a single compound query. Usually populated via
+            ``add_parameter_group``
     """
 
     def __init__(self, name: str,
@@ -51,6 +60,7 @@ class InstrumentBase(Metadatable, DelegateAttributes):
         self.functions: Dict[str, Function] = {}
         self.submodules: Dict[str, Union['InstrumentBase',
                                          'ChannelList']] = {}
+        self.parameter_groups: Dict[str, ParameterGroup] = {}
         super().__init__(**kwargs)
 
         # This is needed for snapshot method to work
@@ -86,6 +96,41 @@ class InstrumentBase(Metadatable, DelegateAttributes):
         param = parameter_class(name=name, instrument=self, **kwargs)
         self.parameters[name] = param
 
+    def add_parameter_group(self, name: str, parameters: Sequence[str],
+                            **kwargs) -> ParameterGroup:
+        """
+        Group parameters of this instrument that can be read with a single
+        compound query, such as ``'FREQ?;AMPL?'``, see ``ParameterGroup``.
+
+        ``snapshot(update=True)`` reads the parameters of the groups with
+        one query per group, and so does a ``Loop`` measuring several
+        parameters of a group in one action. ``group.get()`` reads them
+        explicitly.
+
+        Args:
+            name: How the group will be stored within
+                ``instrument.parameter_groups``.
+
+            parameters: The names of the parameters of the group, which
+                must have a string ``get_cmd``.
+
+            **kwargs: Further arguments of ``ParameterGroup``, such as the
+                ``query_separator`` and ``response_separator``.
+
+        Returns:
+            The new group
+
+        Raises:
+            KeyError: if this instrument already has a group with this name.
+        """
+        if name in self.parameter_groups:
+            raise KeyError('Duplicate parameter group name {}'.format(name))
+        group = ParameterGroup(name, self,
+                               [self.parameters[param_name]
+                                for param_name in parameters], **kwargs)
+        self.parameter_groups[name] = group
+        return group
+
     def add_function(self, name: str, **kwargs) -> None:
         """
         Bind one Function to this instrument.
@@ -172,13 +217,36 @@ class InstrumentBase(Metadatable, DelegateAttributes):
             "__class__": full_class(self)
         }
 
+        skip_update = set(params_to_skip_update or ())
+        if update:
+            # read grouped parameters with one query per group, then take
+            # their snapshots without updating them again. Parameters that
+            # are not updated in snapshots are left out, as in their own
+            # snapshot_base
+            for group in self.parameter_groups.values():
+                params = [param for param in group.parameters
+                          if param.name not in skip_update and
+                          hasattr(param, 'get') and param._snapshot_get and
+                          param._snapshot_value]
+                if len(params) < 2:
+                    continue
+                try:
+                    group.get(params)
+                except Exception:
+                    log.warning(f"Snapshot: Could not update parameter "
+                                f"group {group.name} on {self.full_name}, "
+                                f"updating its parameters one by one")
+                    log.info(f"Details for Snapshot of {group.name}:",
+                             exc_info=True)
+                else:
+                    skip_update.update(param.name for param in params)
+
         snap['parameters'] = {}
         for name, param in self.parameters.items():
-            update = update
-            if params_to_skip_update and name in params_to_skip_update:
-                update = False
+            update_param = update and name not in skip_update
             try:
-                snap['parameters'][name] = param.snapshot(update=update)
+                snap['parameters'][name] = param.snapshot(
+                    update=update_param)
             except:
                 # really log this twice. Once verbose for the UI and once
                 # at lower level with more info for file based loggers
@@ -380,6 +448,13 @@ class Instrument(InstrumentBase):
         submodules (Dict[Metadatable]): All the submodules of this instrument
             such as channel lists or logical groupings of parameters.
             Usually populated via ``add_submodule``
+
+        parameter_groups (Dict[ParameterGroup]): Groups of parameters that
+            are read with a single compound query. Usually populated via
+            ``add_parameter_group``
+
+        thread_worker (InstrumentWorker): The thread the instrument is used
+            from by ``call_async`` and ``InstrumentThreadPool``.
     """
 
     shared_kwargs = ()
@@ -391,6 +466,10 @@ class Instrument(InstrumentBase):
     def __init__(self, name: str,
                  metadata: Optional[Dict]=None, **kwargs) -> None:
         self._t0 = time.time()
+        # serializes the communication with the instrument, see ``ask``
+        self._io_lock = threading.RLock()
+        # its thread is started on first use
+        self.thread_worker = InstrumentWorker(name)
         if kwargs.pop('server_name', False):
             warnings.warn("server_name argument not supported any more",
                           stacklevel=0)
@@ -489,6 +568,8 @@ class Instrument(InstrumentBase):
         """
         if hasattr(self, 'connection') and hasattr(self.connection, 'close'):
             self.connection.close()
+        if getattr(self, 'thread_worker', None) is not None:
+            self.thread_worker.close(wait=False)
 
         strip_attrs(self, whitelist=['name'])
         self.remove_instance(self)
@@ -633,7 +714,11 @@ class Instrument(InstrumentBase):
                 including the command and the instrument.
         """
         try:
-            self.write_raw(cmd)
+            with self._io_lock:
+                if io_tracer.enabled:
+                    io_tracer.call(self, 'write', self.write_raw, cmd)
+                else:
+                    self.write_raw(cmd)
         except Exception as e:
             inst = repr(self)
             e.args = e.args + ('writing ' + repr(cmd) + ' to ' + inst,)
@@ -662,6 +747,10 @@ class Instrument(InstrumentBase):
         it call ``super().ask(new_cmd)``. Subclasses that define a new
         hardware communication should instead override ``ask_raw``.
 
+        Calls of ``write`` and ``ask`` from different threads are
+        serialized by a lock of the instrument, such that a command and its
+        response are never interleaved with another one.
+
         Args:
             cmd: the string to send to the instrument
 
@@ -673,7 +762,10 @@ class Instrument(InstrumentBase):
                 including the command and the instrument.
         """
         try:
-            answer = self.ask_raw(cmd)
+            with self._io_lock:
+                if io_tracer.enabled:
+                    return io_tracer.call(self, 'ask', self.ask_raw, cmd)
+                answer = self.ask_raw(cmd)
 
             return answer
 
@@ -696,3 +788,50 @@ class Instrument(InstrumentBase):
         raise NotImplementedError(
             'Instrument {} has not defined an ask method'.format(
                 type(self).__name__))
+
+    async def call_async(self, func: Callable, *args: Any) -> Any:
+        """
+        Call ``func(*args)`` in the thread of this instrument, without
+        blocking the event loop. Each instrument has one thread, its
+        ``thread_worker`` (started on first use, and also used by
+        ``InstrumentThreadPool``), so calls of one instrument run one after
+        the other and calls of different instruments concurrently.
+
+        Args:
+            func: The function to call, e.g. ``ask`` of the instrument
+            *args: The arguments to call it with
+
+        Returns:
+            The return value of ``func``
+        """
+        return await asyncio.wrap_future(
+            self.thread_worker.submit(func, *args))
+
+    async def write_async(self, cmd: str) -> None:
+        """
+        Coroutine version of ``write``, for use with asyncio.
+
+        Calls ``write`` in the thread of the instrument (see
+        ``call_async``). Subclasses with a transport that supports asyncio
+        may override this.
+
+        Args:
+            cmd: the string to send to the instrument
+        """
+        await self.call_async(self.write, cmd)
+
+    async def ask_async(self, cmd: str) -> str:
+        """
+        Coroutine version of ``ask``, for use with asyncio.
+
+        Calls ``ask`` in the thread of the instrument (see ``call_async``).
+        Subclasses with a transport that supports asyncio may override
+        this.
+
+        Args:
+            cmd: the string to send to the instrument
+
+        Returns:
+            response (str, normally)
+        """
+        return await self.call_async(self.ask, cmd)
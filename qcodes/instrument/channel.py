@@ -58,6 +58,12 @@ class InstrumentChannel(InstrumentBase):
     def ask_raw(self, cmd):
         return self._parent.ask_raw(cmd)
 
+    async def write_async(self, cmd):
+        await self._parent.write_async(cmd)
+
+    async def ask_async(self, cmd):
+        return await self._parent.ask_async(cmd)
+
     @property
     def parent(self) -> InstrumentBase:
         return self._parent
@@ -1,7 +1,13 @@
 """Ethernet instrument driver class based on sockets."""
+import asyncio
 import socket
 import logging
+import threading
+import time
 
+import numpy as np
+
+from qcodes.utils.tracing import io_tracer
 from .base import Instrument
 
 log = logging.getLogger(__name__)
@@ -31,15 +37,36 @@ class IPInstrument(Instrument):
         write_confirmation (bool): Whether the instrument acknowledges writes
             with some response we should read. Default True.
 
+        read_terminator (Optional[str]): Character(s) terminating each
+            response. If given, a response is read up to it, however many
+            TCP segments it arrives in, and returned without it, while any
+            data after it is kept for the next read. Default None: a
+            response is whatever a single ``recv`` of the socket returns.
+
+        nodelay (bool): Whether to send commands without delay, disabling
+            Nagle's algorithm (``TCP_NODELAY``). Default True.
+
+        socket_buffer_size (Optional[int]): The size in bytes of the send
+            and receive buffers of the socket (``SO_SNDBUF``/``SO_RCVBUF``),
+            and of the chunks in which responses are read if
+            ``read_terminator`` is given. Default None, the defaults of the
+            operating system and chunks of 64 kB.
+
         metadata (Optional[Dict]): additional static metadata to add to this
             instrument's JSON snapshot.
 
+    ``write_async`` and ``ask_async`` use the socket with asyncio directly
+    if it is persistent, and the instrument does not override ``write``,
+    ``write_raw``, ``ask`` or ``ask_raw``. Otherwise they call ``write`` and
+    ``ask`` in the thread of the instrument, like for other instruments.
+
     See help for ``qcodes.Instrument`` for additional information on writing
     instrument subclasses.
     """
 
     def __init__(self, name, address=None, port=None, timeout=5,
                  terminator='\n', persistent=True, write_confirmation=True,
+                 read_terminator=None, nodelay=True, socket_buffer_size=None,
                  **kwargs):
         super().__init__(name, **kwargs)
 
@@ -48,11 +75,23 @@ class IPInstrument(Instrument):
         self._timeout = timeout
         self._terminator = terminator
         self._confirmation = write_confirmation
+        self._read_terminator = read_terminator
+        self._nodelay = nodelay
+        self._socket_buffer_size = socket_buffer_size
 
         self._ensure_connection = EnsureConnection(self)
         self._buffer_size = 1400
+        self._read_chunk_size = socket_buffer_size or 65536
+        # data received after the end of the last response
+        self._recv_buffer = bytearray()
 
         self._socket = None
+        # held for each exchange on the socket, by a thread or a coroutine,
+        # so it is not reentrant (unlike the lock of the instrument)
+        self._socket_lock = threading.Lock()
+        # the event loop and the asyncio lock serializing the coroutines
+        # using the socket in it
+        self._async_lock = (None, None)
 
         self.set_persistent(persistent)
 
@@ -92,7 +131,12 @@ class IPInstrument(Instrument):
             self._disconnect()
 
     def flush_connection(self):
-        self._recv()
+        self._recv_buffer.clear()
+        if self._read_terminator is None:
+            self._recv()
+        else:
+            # discard what has arrived, regardless of terminators
+            self._socket.recv(self._read_chunk_size)
 
     def _connect(self):
 
@@ -102,6 +146,14 @@ class IPInstrument(Instrument):
         try:
             log.info("Opening socket")
             self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._recv_buffer.clear()
+            if self._nodelay:
+                self._socket.setsockopt(socket.IPPROTO_TCP,
+                                        socket.TCP_NODELAY, 1)
+            if self._socket_buffer_size is not None:
+                for option in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+                    self._socket.setsockopt(socket.SOL_SOCKET, option,
+                                            self._socket_buffer_size)
             log.info("Connecting socket to {}:{}".format(self._address,
                                                          self._port))
             self._socket.connect((self._address, self._port))
@@ -143,19 +195,142 @@ class IPInstrument(Instrument):
         """
         self._terminator = terminator
 
+    def set_read_terminator(self, read_terminator):
+        r"""
+        Change the terminator of the responses, see ``read_terminator`` of
+        ``IPInstrument``.
+
+        Args:
+            read_terminator (Optional[str]): Character(s) terminating each
+                response, e.g. '\n', or None to read responses with a
+                single ``recv``.
+        """
+        self._read_terminator = read_terminator
+
     def _send(self, cmd):
         data = cmd + self._terminator
         log.debug(f"Writing {data} to instrument {self.name}")
         self._socket.sendall(data.encode())
 
     def _recv(self):
-        result = self._socket.recv(self._buffer_size)
+        if self._read_terminator is not None:
+            result = self._recv_until(self._read_terminator.encode())
+            log.debug(f"Got {result} from instrument {self.name}")
+            return result.decode()
+
+        if self._recv_buffer:
+            result = bytes(self._recv_buffer)
+            self._recv_buffer.clear()
+        else:
+            result = self._socket.recv(self._buffer_size)
         log.debug(f"Got {result} from instrument {self.name}")
         if result == b'':
             log.warning("Got empty response from Socket recv() "
                         "Connection broken.")
         return result.decode()
 
+    def _recv_chunk(self):
+        """Receive the next chunk of data into the receive buffer."""
+        chunk = self._socket.recv(self._read_chunk_size)
+        if not chunk:
+            raise ConnectionError('Connection to {} closed while reading a '
+                                  'response'.format(self.name))
+        self._recv_buffer += chunk
+
+    def _recv_until(self, terminator):
+        """
+        Read up to the next occurrence of terminator, and return the bytes
+        before it.
+        """
+        start = 0
+        while True:
+            result, start = self._take_until(terminator, start)
+            if result is not None:
+                return result
+            self._recv_chunk()
+
+    def _take_until(self, terminator, start):
+        """
+        Take the bytes before the first occurrence of terminator, searched
+        from index start, and the terminator out of the receive buffer.
+        Returns them, or None if the terminator has not been received yet,
+        and the index to search from after receiving more.
+        """
+        buffer = self._recv_buffer
+        index = buffer.find(terminator, start)
+        if index >= 0:
+            result = bytes(buffer[:index])
+            del buffer[:index + len(terminator)]
+            return result, 0
+        # the terminator may start in the data we have already
+        return None, max(len(buffer) - len(terminator) + 1, 0)
+
+    def _recv_exactly(self, n_bytes):
+        """Read exactly n_bytes bytes."""
+        while len(self._recv_buffer) < n_bytes:
+            self._recv_chunk()
+        result = bytes(self._recv_buffer[:n_bytes])
+        del self._recv_buffer[:n_bytes]
+        return result
+
+    def _recv_binary_block(self, dtype, out, expect_termination):
+        """
+        Read an IEEE 488.2 binary block of definite length,
+        '#<n><length><data>' with the length given by n digits.
+        """
+        header = self._recv_exactly(2)
+        if header[:1] != b'#' or not header[1:].isdigit():
+            raise ValueError('Expected an IEEE 488.2 binary block, '
+                             'got {!r}'.format(header))
+        n_digits = int(header[1:])
+        if n_digits == 0:
+            # without an end of message signal, as over GPIB, the end of
+            # an indefinite length block cannot be told from its data
+            raise ValueError('Got an indefinite length binary block from '
+                             '{}, only blocks of definite length can be '
+                             'read over a socket'.format(self.name))
+        n_bytes = int(self._recv_exactly(n_digits))
+
+        dtype = np.dtype(dtype)
+        if n_bytes % dtype.itemsize:
+            raise ValueError('A binary block of {} bytes does not hold '
+                             'values of {} bytes'.format(n_bytes,
+                                                         dtype.itemsize))
+        n_values = n_bytes // dtype.itemsize
+        if out is None:
+            out = np.empty(n_values, dtype=dtype)
+        elif (out.dtype != dtype or len(out) < n_values or
+                not out.flags.c_contiguous):
+            raise ValueError('out must be a contiguous array of {} with '
+                             'room for {} values'.format(dtype, n_values))
+        values = out[:n_values]
+
+        # the start of the block may have been received already, receive
+        # the rest directly into the array
+        view = memoryview(values.view(np.uint8).reshape(-1))
+        received = min(len(self._recv_buffer), n_bytes)
+        view[:received] = self._recv_buffer[:received]
+        del self._recv_buffer[:received]
+        while received < n_bytes:
+            n = self._socket.recv_into(view[received:])
+            if not n:
+                raise ConnectionError('Connection to {} closed while '
+                                      'reading a binary block'.format(
+                                          self.name))
+            received += n
+
+        if expect_termination:
+            if self._read_terminator is not None:
+                rest = self._recv_until(self._read_terminator.encode())
+            else:
+                # the block ends with the IEEE 488.2 message terminator, a
+                # newline, which must not be taken for the next response
+                rest = self._recv_until(b'\n').rstrip(b'\r')
+            if rest:
+                log.warning(f"Got {rest} after a binary block from "
+                            f"instrument {self.name}")
+        return values
+
     def close(self):
         """Disconnect and irreversibly tear down the instrument."""
         self._disconnect()
@@ -169,7 +344,7 @@ class IPInstrument(Instrument):
             cmd (str): The command to send to the instrument.
         """
 
-        with self._ensure_connection:
+        with self._socket_lock, self._ensure_connection:
             self._send(cmd)
             if self._confirmation:
                 self._recv()
@@ -184,10 +359,179 @@ class IPInstrument(Instrument):
         Returns:
             str: The instrument's response.
         """
-        with self._ensure_connection:
+        with self._socket_lock, self._ensure_connection:
             self._send(cmd)
             return self._recv()
 
+    def ask_binary_block(self, cmd, dtype='u1', out=None,
+                         expect_termination=True):
+        """
+        Send a query and read its response as an IEEE 488.2 binary block,
+        as returned by most instruments for waveforms and traces, into a
+        numpy array. Only blocks of definite length ('#<n><length><data>')
+        are supported, an indefinite length block ('#0...') raises a
+        ``ValueError``.
+
+        Args:
+            cmd (str): The command to send to the instrument.
+
+            dtype (numpy.dtype): The type of the values in the block,
+                including their byte order, e.g. '<f4'. Default bytes.
+
+            out (Optional[numpy.ndarray]): A contiguous array of ``dtype``
+                to read the values into, e.g. preallocated for repeated
+                reads. It must have room for all values of the block.
+
+            expect_termination (bool): Whether the block is followed by the
+                ``read_terminator``, or by a newline if there is no
+                ``read_terminator``, which is then read too. Default True.
+
+        Returns:
+            numpy.ndarray: The values of the block, a view of ``out`` if
+                that was given.
+        """
+        with self._io_lock, self._socket_lock, self._ensure_connection:
+            self._send(cmd)
+            return self._recv_binary_block(dtype, out, expect_termination)
+
+    def _uses_socket_async(self, *methods):
+        """
+        Whether the socket can be used with asyncio instead of the given
+        methods.
+        """
+        return (self._persistent and self._socket is not None and
+                all(getattr(type(self), method) is
+                    getattr(IPInstrument, method) for method in methods))
+
+    def _get_async_lock(self):
+        loop = asyncio.get_event_loop()
+        lock_loop, lock = self._async_lock
+        if lock_loop is not loop:
+            lock = asyncio.Lock()
+            self._async_lock = (loop, lock)
+        return lock
+
+    async def _recv_async(self, loop):
+        if self._read_terminator is None:
+            if self._recv_buffer:
+                result = bytes(self._recv_buffer)
+                self._recv_buffer.clear()
+            else:
+                result = await loop.sock_recv(self._socket,
+                                              self._buffer_size)
+        else:
+            terminator = self._read_terminator.encode()
+            start = 0
+            while True:
+                result, start = self._take_until(terminator, start)
+                if result is not None:
+                    break
+                chunk = await loop.sock_recv(self._socket,
+                                             self._read_chunk_size)
+                if not chunk:
+                    raise ConnectionError('Connection to {} closed while '
+                                          'reading a response'.format(
+                                              self.name))
+                self._recv_buffer += chunk
+        log.debug(f"Got {result} from instrument {self.name}")
+        return result.decode()
+
+    async def _send_recv_async(self, loop, cmd, read_response):
+        data = (cmd + self._terminator).encode()
+        log.debug(f"Writing {data} to instrument {self.name}")
+        await loop.sock_sendall(self._socket, data)
+        if read_response:
+            return await self._recv_async(loop)
+        return None
+
+    async def _acquire_socket_lock(self, loop):
+        """
+        Acquire the socket lock without blocking the event loop, waiting
+        in a thread if another thread or event loop holds it.
+        """
+        if self._socket_lock.acquire(blocking=False):
+            return
+        acquired = loop.run_in_executor(None, self._socket_lock.acquire)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # the thread gets the lock anyway, give it back then
+            acquired.add_done_callback(
+                lambda _: self._socket_lock.release())
+            raise
+
+    async def _exchange_async(self, kind, cmd, read_response):
+        """
+        Send a command and read its response (if read_response) with
+        asyncio, holding the socket lock, and trace it.
+        """
+        loop = asyncio.get_event_loop()
+        async with self._get_async_lock():
+            # only one coroutine of this event loop gets here at a time,
+            # the socket lock keeps other threads and event loops out
+            await self._acquire_socket_lock(loop)
+            try:
+                started = time.time()
+                t0 = time.perf_counter()
+                self._socket.settimeout(0)
+                try:
+                    response = await asyncio.wait_for(
+                        self._send_recv_async(loop, cmd, read_response),
+                        self._timeout)
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        e = socket.timeout('timed out')
+                    if io_tracer.enabled:
+                        io_tracer.record(self.name, kind, cmd, started,
+                                         time.perf_counter() - t0, 0, e)
+                    raise e
+                finally:
+                    self.set_timeout(self._timeout)
+            finally:
+                self._socket_lock.release()
+            if io_tracer.enabled:
+                io_tracer.record(
+                    self.name, kind, cmd, started,
+                    time.perf_counter() - t0,
+                    len(response) if response is not None else 0)
+            return response
+
+    async def write_async(self, cmd):
+        """
+        Coroutine version of ``write``, for use with asyncio.
+
+        Args:
+            cmd (str): The command to send to the instrument.
+        """
+        if not self._uses_socket_async('write', 'write_raw'):
+            await super().write_async(cmd)
+            return
+        try:
+            await self._exchange_async('write', cmd, self._confirmation)
+        except Exception as e:
+            inst = repr(self)
+            e.args = e.args + ('writing ' + repr(cmd) + ' to ' + inst,)
+            raise e
+
+    async def ask_async(self, cmd):
+        """
+        Coroutine version of ``ask``, for use with asyncio.
+
+        Args:
+            cmd (str): The command to send to the instrument.
+
+        Returns:
+            str: The instrument's response.
+        """
+        if not self._uses_socket_async('ask', 'ask_raw'):
+            return await super().ask_async(cmd)
+        try:
+            return await self._exchange_async('ask', cmd, True)
+        except Exception as e:
+            inst = repr(self)
+            e.args = e.args + ('asking ' + repr(cmd) + ' to ' + inst,)
+            raise e
+
     def __del__(self):
         self.close()
 
@@ -208,6 +552,7 @@ class IPInstrument(Instrument):
         snap['confirmation'] = self._confirmation
         snap['address'] = self._address
         snap['terminator'] = self._terminator
+        snap['read_terminator'] = self._read_terminator
         snap['timeout'] = self._timeout
         snap['persistent'] = self._persistent
 
@@ -52,6 +52,7 @@ This file defines four classes of parameters:
 # create an ABC for Parameter and MultiParameter - or just remove this statement
 # if everyone is happy to use these classes.
 
+import asyncio
 from datetime import datetime, timedelta
 from copy import copy
 from operator import xor
@@ -78,6 +79,7 @@ from qcodes.data.data_array import DataArray
 
 if TYPE_CHECKING:
     from .base import Instrument, InstrumentBase
+    from .parameter_group import ParameterGroup
 
 Number = Union[float, int]
 
@@ -207,6 +209,9 @@ class _BaseParameter(Metadatable):
         self._instrument = instrument
         self._snapshot_get = snapshot_get
         self._snapshot_value = snapshot_value
+        # the ParameterGroup of the instrument this parameter is read in
+        # together with others, if any
+        self.group: Optional['ParameterGroup'] = None
 
         if not isinstance(vals, (Validator, type(None))):
             raise TypeError('vals must be None or a Validator')
@@ -358,54 +363,61 @@ class _BaseParameter(Metadatable):
         def get_wrapper(*args, **kwargs):
             try:
                 # There might be cases where a .get also has args/kwargs
-                value = get_function(*args, **kwargs)
-                self.raw_value = value
-
-                if self.get_parser is not None:
-                    value = self.get_parser(value)
-
-                # apply offset first (native scale)
-                if self.offset is not None:
-                    # offset values
-                    if isinstance(self.offset, collections.Iterable):
-                        # offset contains multiple elements, one for each value
-                        value = tuple(value - offset for value, offset
-                                      in zip(value, self.offset))
-                    elif isinstance(value, collections.Iterable):
-                        # Use single offset for all values
-                        value = tuple(value - self.offset for value in value)
-                    else:
-                        value -= self.offset
-
-                # scale second
-                if self.scale is not None:
-                    # Scale values
-                    if isinstance(self.scale, collections.Iterable):
-                        # Scale contains multiple elements, one for each value
-                        value = tuple(value / scale for value, scale
-                                      in zip(value, self.scale))
-                    elif isinstance(value, collections.Iterable):
-                        # Use single scale for all values
-                        value = tuple(value / self.scale for value in value)
-                    else:
-                        value /= self.scale
-
-                if self.val_mapping is not None:
-                    if value in self.inverse_val_mapping:
-                        value = self.inverse_val_mapping[value]
-                    else:
-                        try:
-                            value = self.inverse_val_mapping[int(value)]
-                        except (ValueError, KeyError):
-                            raise KeyError("'{}' not in val_mapping".format(value))
-                self._save_val(value)
-                return value
+                return self._get_from_raw_value(get_function(*args, **kwargs))
             except Exception as e:
                 e.args = e.args + ('getting {}'.format(self),)
                 raise e
 
         return get_wrapper
 
+    def _get_from_raw_value(self, value):
+        """
+        Convert a raw value, as returned by ``get_raw``, to the value of
+        this parameter like ``get`` does (applying ``get_parser``,
+        ``offset``, ``scale`` and ``val_mapping``), save and return it.
+        """
+        self.raw_value = value
+
+        if self.get_parser is not None:
+            value = self.get_parser(value)
+
+        # apply offset first (native scale)
+        if self.offset is not None:
+            # offset values
+            if isinstance(self.offset, collections.Iterable):
+                # offset contains multiple elements, one for each value
+                value = tuple(value - offset for value, offset
+                              in zip(value, self.offset))
+            elif isinstance(value, collections.Iterable):
+                # Use single offset for all values
+                value = tuple(value - self.offset for value in value)
+            else:
+                value -= self.offset
+
+        # scale second
+        if self.scale is not None:
+            # Scale values
+            if isinstance(self.scale, collections.Iterable):
+                # Scale contains multiple elements, one for each value
+                value = tuple(value / scale for value, scale
+                              in zip(value, self.scale))
+            elif isinstance(value, collections.Iterable):
+                # Use single scale for all values
+                value = tuple(value / self.scale for value in value)
+            else:
+                value /= self.scale
+
+        if self.val_mapping is not None:
+            if value in self.inverse_val_mapping:
+                value = self.inverse_val_mapping[value]
+            else:
+                try:
+                    value = self.inverse_val_mapping[int(value)]
+                except (ValueError, KeyError):
+                    raise KeyError("'{}' not in val_mapping".format(value))
+        self._save_val(value)
+        return value
+
     def _wrap_set(self, set_function):
         @wraps(set_function)
         def set_wrapper(value, **kwargs):
@@ -421,37 +433,7 @@ class _BaseParameter(Metadatable):
                     # even if the final value is valid we may be generating
                     # steps that are not so validate them too
                     self.validate(val_step)
-                    if self.val_mapping is not None:
-                        # Convert set values using val_mapping dictionary
-                        raw_value = self.val_mapping[val_step]
-                    else:
-                        raw_value = val_step
-
-                    # transverse transformation in reverse order as compared to
-                    # getter:
-                    # apply scale first
-                    if self.scale is not None:
-                        if isinstance(self.scale, collections.Iterable):
-                            # Scale contains multiple elements, one for each value
-                            raw_value = tuple(val * scale for val, scale
-                                              in zip(raw_value, self.scale))
-                        else:
-                            # Use single scale for all values
-                            raw_value *= self.scale
-
-                    # apply offset next
-                    if self.offset is not None:
-                        if isinstance(self.offset, collections.Iterable):
-                            # offset contains multiple elements, one for each value
-                            raw_value = tuple(val + offset for val, offset
-                                              in zip(raw_value, self.offset))
-                        else:
-                            # Use single offset for all values
-                            raw_value += self.offset
-
-                    # parser last
-                    if self.set_parser is not None:
-                        raw_value = self.set_parser(raw_value)
+                    raw_value = self._raw_value_from_value(val_step)
 
                     # Check if delay between set operations is required
                     t_elapsed = time.perf_counter() - self._t_last_set
@@ -483,6 +465,137 @@ class _BaseParameter(Metadatable):
 
         return set_wrapper
 
+    def _raw_value_from_value(self, value):
+        """
+        Convert a value of this parameter to the raw value ``set_raw`` is
+        called with, the inverse of ``_get_from_raw_value``.
+        """
+        if self.val_mapping is not None:
+            # Convert set values using val_mapping dictionary
+            raw_value = self.val_mapping[value]
+        else:
+            raw_value = value
+
+        # transverse transformation in reverse order as compared to
+        # getter:
+        # apply scale first
+        if self.scale is not None:
+            if isinstance(self.scale, collections.Iterable):
+                # Scale contains multiple elements, one for each value
+                raw_value = tuple(val * scale for val, scale
+                                  in zip(raw_value, self.scale))
+            else:
+                # Use single scale for all values
+                raw_value *= self.scale
+
+        # apply offset next
+        if self.offset is not None:
+            if isinstance(self.offset, collections.Iterable):
+                # offset contains multiple elements, one for each value
+                raw_value = tuple(val + offset for val, offset
+                                  in zip(raw_value, self.offset))
+            else:
+                # Use single offset for all values
+                raw_value += self.offset
+
+        # parser last
+        if self.set_parser is not None:
+            raw_value = self.set_parser(raw_value)
+        return raw_value
+
+    def _fixed_command(self, kind: str) -> Optional[str]:
+        """
+        The command string ``get_raw`` (kind 'get') or ``set_raw`` (kind
+        'set') sends with ``ask`` or ``write`` of the instrument of this
+        parameter, if it is a fixed string (a format string with the raw
+        value for set), else None.
+        """
+        if kind == 'get':
+            command, arg_count, method = self.get_raw, 0, 'ask'
+        else:
+            command, arg_count, method = self.set_raw, 1, 'write'
+        if (isinstance(command, Command) and
+                command.arg_count == arg_count and
+                isinstance(getattr(command, 'cmd_str', None), str) and
+                self._instrument is not None and
+                command.exec_str == getattr(self._instrument, method, None)):
+            return command.cmd_str
+        return None
+
+    async def _call_async(self, func, *args):
+        """
+        Call ``func(*args)`` in the thread of the instrument of this
+        parameter, or of the event loop if it has no instrument.
+        """
+        root = getattr(self._instrument, 'root_instrument', None)
+        if hasattr(root, 'call_async'):
+            return await root.call_async(func, *args)
+        return await asyncio.get_event_loop().run_in_executor(
+            None, partial(func, *args))
+
+    async def get_async(self):
+        """
+        Coroutine version of ``get``, for use with asyncio, see
+        ``qcodes.utils.async_helpers`` to get several parameters
+        concurrently.
+
+        A parameter with a string ``get_cmd`` is read with ``ask_async`` of
+        its instrument, any other with ``get`` in the thread of its
+        instrument (see ``Instrument.call_async``).
+        """
+        query = self._fixed_command('get')
+        if query is None or not hasattr(self._instrument, 'ask_async'):
+            return await self._call_async(self.get)
+        try:
+            return self._get_from_raw_value(
+                await self._instrument.ask_async(query))
+        except Exception as e:
+            e.args = e.args + ('getting {}'.format(self),)
+            raise e
+
+    async def set_async(self, value):
+        """
+        Coroutine version of ``set``, for use with asyncio, see
+        ``qcodes.utils.async_helpers`` to set several parameters
+        concurrently.
+
+        A parameter with a string ``set_cmd`` is set with ``write_async`` of
+        its instrument, waiting for ``step``, ``inter_delay`` and
+        ``post_delay`` without blocking the event loop, any other with
+        ``set`` in the thread of its instrument (see
+        ``Instrument.call_async``).
+
+        Args:
+            value: The value to set the parameter to
+        """
+        command = self._fixed_command('set')
+        if command is None or not hasattr(self._instrument, 'write_async'):
+            await self._call_async(self.set, value)
+            return
+        try:
+            self.validate(value)
+            for val_step in self.get_ramp_values(value, step=self.step):
+                self.validate(val_step)
+                raw_value = self._raw_value_from_value(val_step)
+
+                t_elapsed = time.perf_counter() - self._t_last_set
+                if t_elapsed < self.inter_delay:
+                    await asyncio.sleep(self.inter_delay - t_elapsed)
+
+                t0 = time.perf_counter()
+                await self._instrument.write_async(command.format(raw_value))
+                self.raw_value = raw_value
+                self._save_val(val_step, validate=False)
+
+                self._t_last_set = time.perf_counter()
+                t_elapsed = self._t_last_set - t0
+                if t_elapsed < self.post_delay:
+                    await asyncio.sleep(self.post_delay - t_elapsed)
+
+        except Exception as e:
+            e.args = e.args + ('setting {} to {}'.format(self, value),)
+            raise e
+
     def get_ramp_values(self, value: Union[float, int, Sized],
                         step: Union[float, int]=None) -> List[Union[float,
                                                                     int,
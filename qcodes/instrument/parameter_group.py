@@ -0,0 +1,107 @@
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from .base import InstrumentBase
+    from .parameter import _BaseParameter
+
+
+class ParameterGroup:
+    """
+    Parameters of an instrument that can be read together, with a single
+    compound query such as ``'FREQ?;AMPL?'`` (as SCPI allows), instead of
+    one query per parameter. The response is split into one raw value per
+    parameter, to which the ``get_parser``, ``offset``, ``scale`` and
+    ``val_mapping`` of each parameter apply as in its ``get``.
+
+    Normally created with ``InstrumentBase.add_parameter_group``. Every
+    parameter of the group must be read with a fixed query string, i.e.
+    have a string ``get_cmd`` that is sent with ``ask`` of the instrument.
+    The group is used automatically by ``snapshot(update=True)`` of the
+    instrument, and when a ``Loop`` measures several parameters of it in
+    the same action.
+
+    Args:
+        name: The name of the group
+        instrument: The instrument the parameters belong to
+        parameters: The parameters of the group
+        query_separator: The separator between the queries of a compound
+            query. Default ';'. With SCPI, queries of different subsystems
+            need ';:' unless they start with ':' already.
+        response_separator: The separator between the responses in the
+            response to a compound query. Default ';'. Responses to the
+            single queries must not contain it.
+        max_queries: The maximal number of queries in one compound query,
+            for instruments with a small input buffer. Default None, no
+            limit.
+
+    Raises:
+        ValueError: if a parameter does not belong to the instrument, is not
+            read with a fixed query string, or belongs to another group
+            already.
+    """
+
+    def __init__(self, name: str, instrument: 'InstrumentBase',
+                 parameters: Sequence['_BaseParameter'],
+                 query_separator: str=';', response_separator: str=';',
+                 max_queries: Optional[int]=None) -> None:
+        self.name = name
+        self.instrument = instrument
+        self.query_separator = query_separator
+        self.response_separator = response_separator
+        self.max_queries = max_queries
+
+        for param in parameters:
+            if param.instrument is not instrument:
+                raise ValueError('{} is not a parameter of {}'.format(
+                    param, instrument))
+            if param._fixed_command('get') is None:
+                raise ValueError('{} is not read with a fixed query string '
+                                 'and cannot be in a ParameterGroup'.format(
+                                     param))
+            if param.group is not None:
+                raise ValueError('{} is in ParameterGroup {} already'.format(
+                    param, param.group.name))
+
+        self.parameters = list(parameters)
+        for param in self.parameters:
+            param.group = self
+
+    def get(self, parameters: Optional[Sequence['_BaseParameter']]=None
+            ) -> List[Any]:
+        """
+        Read parameters of the group with compound queries, updating their
+        latest values like ``get`` of each parameter does.
+
+        Args:
+            parameters: The parameters to read, all of this group. Default
+                all parameters of the group.
+
+        Returns:
+            The values of the parameters, in the same order
+
+        Raises:
+            ValueError: if the number of responses does not match the number
+                of queries
+        """
+        if parameters is None:
+            parameters = self.parameters
+        chunk_size = self.max_queries or max(len(parameters), 1)
+
+        values: List[Any] = []
+        for start in range(0, len(parameters), chunk_size):
+            chunk = parameters[start:start + chunk_size]
+            query = self.query_separator.join(param._fixed_command('get')
+                                              for param in chunk)
+            responses = self.instrument.ask(query).split(
+                self.response_separator)
+            if len(responses) != len(chunk):
+                raise ValueError('Got {} responses to the {} queries of '
+                                 '{!r}'.format(len(responses), len(chunk),
+                                               query))
+            for param, response in zip(chunk, responses):
+                try:
+                    values.append(param._get_from_raw_value(response))
+                except Exception as e:
+                    e.args = e.args + ('getting {}'.format(param),)
+                    raise e
+        return values
@@ -38,6 +38,10 @@ class VisaInstrument(Instrument):
         metadata (Optional[Dict]): additional static metadata to add to this
             instrument's JSON snapshot.
 
+    As pyvisa is blocking, ``write_async`` and ``ask_async`` call ``write``
+    and ``ask`` in the thread of the instrument, see
+    ``Instrument.call_async``.
+
     See help for ``qcodes.Instrument`` for additional information on writing
     instrument subclasses.
 
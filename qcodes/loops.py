@@ -56,6 +56,7 @@ from qcodes.data.data_set import new_data
 from qcodes.data.data_array import DataArray
 from qcodes.utils.helpers import wait_secs, full_class, tprint
 from qcodes.utils.metadata import Metadatable
+from qcodes.utils.threading import InstrumentThreadPool
 
 from .actions import (_actions_snapshot, Task, Wait, _Measure, _Nest,
                       BreakIf, _QcodesBreak)
@@ -334,6 +335,38 @@ def _attach_bg_task(loop, task, bg_final_task, min_delay):
     return loop
 
 
+class _LoopPlan:
+    """
+    The actions of an ActiveLoop compiled for a run, at one place in its
+    outer loops. A plan is made the first time the loop runs at that place
+    and reused by every following point of the outer loops, such that the
+    callables and the DataArrays the setpoints are stored in are only looked
+    up once per run.
+
+    This should not be constructed manually, only by an ActiveLoop.
+    """
+    def __init__(self, loop, action_indices):
+        data_set = loop.data_set
+        self.callables = loop._compile_actions(loop.actions, action_indices)
+        self.set_array = data_set.arrays[data_set.action_id_map[
+            action_indices]]
+
+        self.combined_arrays = None
+        if hasattr(loop.sweep_values, 'parameters'):
+            # the arrays of the combined parameters come after the ones of
+            # the actions
+            n_callables = 0
+            for item in self.callables:
+                if hasattr(item, 'param_ids'):
+                    n_callables += len(item.param_ids)
+                else:
+                    n_callables += 1
+            self.combined_arrays = [
+                data_set.arrays[data_set.action_id_map[
+                    action_indices + (j + n_callables,)]]
+                for j in range(len(loop.sweep_values.parameters))]
+
+
 class ActiveLoop(Metadatable):
     """
     Created by attaching actions to a *Loop*, this is the object that actually
@@ -362,6 +395,8 @@ class ActiveLoop(Metadatable):
         self.bg_final_task = bg_final_task
         self.bg_min_delay = bg_min_delay
         self.data_set = None
+        self.thread_pool = None
+        self._plans = {}
 
         # if the first action is another loop, it changes how delays
         # happen - the outer delay happens *after* the inner var gets
@@ -600,18 +635,21 @@ class ActiveLoop(Metadatable):
 
         return sp
 
-    def set_common_attrs(self, data_set, use_threads):
+    def set_common_attrs(self, data_set, use_threads, thread_pool=None):
         """
         set a couple of common attributes that the main and nested loops
         all need to have:
         - the DataSet collecting all our measurements
-        - a queue for communicating with the main process
+        - the pool of threads to measure with, if use_threads
         """
         self.data_set = data_set
         self.use_threads = use_threads
+        self.thread_pool = thread_pool
+        # the compiled actions belong to one data set, so start over
+        self._plans = {}
         for action in self.actions:
             if hasattr(action, 'set_common_attrs'):
-                action.set_common_attrs(data_set, use_threads)
+                action.set_common_attrs(data_set, use_threads, thread_pool)
 
     def get_data_set(self, *args, **kwargs):
         """
@@ -641,6 +679,8 @@ class ActiveLoop(Metadatable):
             io: knows how to connect to the storage (disk vs cloud etc)
             write_period: how often to save to storage during the loop.
                 default 5 sec, use None to write only at the end
+            memmap: keep the data in memory-mapped files in the location
+                instead of in memory, for DataSets larger than the memory
 
         returns:
             a DataSet object that we can use to plot
@@ -676,7 +716,9 @@ class ActiveLoop(Metadatable):
         Args:
             use_threads: (default False): whenever there are multiple `get` calls
                 back-to-back, execute them in separate threads so they run in
-                parallel (as long as they don't block each other)
+                parallel (as long as they don't block each other). There is
+                one thread per instrument for the whole run, the parameters
+                of the same instrument are read one after the other.
             quiet: (default False): set True to not print anything except errors
             station: a Station instance for snapshots (omit to use a previously
                 provided Station, or the default Station)
@@ -712,7 +754,9 @@ class ActiveLoop(Metadatable):
 
         data_set = self.get_data_set(*args, **kwargs)
 
-        self.set_common_attrs(data_set=data_set, use_threads=use_threads)
+        thread_pool = InstrumentThreadPool() if use_threads else None
+        self.set_common_attrs(data_set=data_set, use_threads=use_threads,
+                              thread_pool=thread_pool)
 
         station = station or self.station or Station.default
         if station:
@@ -747,6 +791,8 @@ class ActiveLoop(Metadatable):
             # we want to clear the data_set attribute so we don't try to reuse
             # this one later.
             self.data_set = None
+            if thread_pool is not None:
+                thread_pool.close()
             if set_active:
                 ActiveLoop.active_loop = None
 
@@ -762,14 +808,14 @@ class ActiveLoop(Metadatable):
                 continue
             elif measurement_group:
                 callables.append(_Measure(measurement_group, self.data_set,
-                                          self.use_threads))
+                                          self.thread_pool))
                 measurement_group[:] = []
 
             callables.append(self._compile_one(action, new_action_indices))
 
         if measurement_group:
             callables.append(_Measure(measurement_group, self.data_set,
-                                      self.use_threads))
+                                      self.thread_pool))
             measurement_group[:] = []
 
         return callables
@@ -813,13 +859,15 @@ class ActiveLoop(Metadatable):
         # the loop parameter may be increased if an outer loop requested longer
         delay = max(self.delay, first_delay)
 
-        callables = self._compile_actions(self.actions, action_indices)
-        n_callables = 0
-        for item in callables:
-            if hasattr(item, 'param_ids'):
-                n_callables += len(item.param_ids)
-            else:
-                n_callables += 1
+        plan = self._plans.get(action_indices)
+        if plan is None:
+            plan = self._plans[action_indices] = _LoopPlan(self,
+                                                           action_indices)
+        callables = plan.callables
+        set_array = plan.set_array
+        combined_arrays = plan.combined_arrays
+        store_points = self.data_set._store_points
+
         t0 = time.time()
         last_task = t0
         imax = len(self.sweep_values)
@@ -840,28 +888,19 @@ class ActiveLoop(Metadatable):
 
             new_indices = loop_indices + (i,)
             new_values = current_values + (value,)
-            data_to_store = {}
 
-            if hasattr(self.sweep_values, "parameters"):  # combined parameter
-                set_name = self.data_set.action_id_map[action_indices]
+            if combined_arrays is not None:  # combined parameter
                 if hasattr(self.sweep_values, 'aggregate'):
                     value = self.sweep_values.aggregate(*set_val)
-                # below is useful but too verbose even at debug
-                # log.debug('Calling .store method of DataSet because '
-                #           'sweep_values.parameters exist')
-                self.data_set.store(new_indices, {set_name: value})
                 # set_val list of values to set [param1_setpoint, param2_setpoint ..]
-                for j, val in enumerate(set_val):
-                    set_index = action_indices + (j+n_callables, )
-                    set_name = (self.data_set.action_id_map[set_index])
-                    data_to_store[set_name] = val
+                arrays_values = [(set_array, value)]
+                arrays_values.extend(zip(combined_arrays, set_val))
             else:
-                set_name = self.data_set.action_id_map[action_indices]
-                data_to_store[set_name] = value
+                arrays_values = ((set_array, value),)
             # below is useful but too verbose even at debug
             # log.debug('Calling .store method of DataSet because a sweep step'
             #           ' was taken')
-            self.data_set.store(new_indices, data_to_store)
+            store_points(new_indices, arrays_values)
 
             if not self._nest_first:
                 # only wait the delay time if an inner loop will not inherit it
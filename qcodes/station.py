@@ -1,8 +1,12 @@
 """Station objects - collect all the equipment you use to do an experiment."""
-from typing import Dict, List, Optional, Sequence, Any
+from collections import OrderedDict
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Any, Tuple
 
 from qcodes.utils.metadata import Metadatable
 from qcodes.utils.helpers import make_unique, DelegateAttributes
+from qcodes.utils.threading import RespondingThread
 
 from qcodes.instrument.base import Instrument
 from qcodes.instrument.parameter import Parameter
@@ -11,6 +15,8 @@ from qcodes.instrument.parameter import StandardParameter
 
 from qcodes.actions import _actions_snapshot
 
+log = logging.getLogger(__name__)
+
 
 class Station(Metadatable, DelegateAttributes):
 
@@ -34,20 +40,40 @@ class Station(Metadatable, DelegateAttributes):
         update_snapshot (bool): immediately update the snapshot
             of each component as it is added to the Station, default true
 
+        concurrent_snapshot (bool): update the snapshots of the components
+            belonging to different instruments concurrently when taking a
+            snapshot with update=True, default false
+
+        snapshot_timeout (Optional[float]): with concurrent_snapshot, the
+            time in seconds after which the update of an instrument is given
+            up, in which case the latest values in memory are used instead.
+            Default None, i.e. no timeout.
+
     Attributes:
         default (Station): class attribute to store the default station
         delegate_attr_dicts (list): a list of names (strings) of dictionaries which are
             (or will be) attributes of self, whose keys should be treated as
             attributes of self
+        snapshot_timings (dict): the time in seconds that the snapshot of
+            each component took during the last snapshot of the station
     """
 
     default = None # type: 'Station'
 
     def __init__(self, *components: Metadatable,
                  monitor: Any=None, default: bool=True,
-                 update_snapshot: bool=True, **kwargs) -> None:
+                 update_snapshot: bool=True,
+                 concurrent_snapshot: bool=False,
+                 snapshot_timeout: Optional[float]=None, **kwargs) -> None:
         super().__init__(**kwargs)
 
+        self.concurrent_snapshot = concurrent_snapshot
+        self.snapshot_timeout = snapshot_timeout
+        self.snapshot_timings = {} # type: Dict[str, float]
+        # the threads updating an instrument that did not finish within
+        # snapshot_timeout, with the instrument, by id of the instrument
+        self._timed_out_threads = {} # type: Dict[int, Tuple[Any, RespondingThread]]
+
         # when a new station is defined, store it in a class variable
         # so it becomes the globally accessible default station.
         # You can still have multiple stations defined, but to use
@@ -70,6 +96,12 @@ class Station(Metadatable, DelegateAttributes):
         """
         State of the station as a JSON-compatible dict.
 
+        With update=True and concurrent_snapshot set, the components are
+        updated concurrently across instruments: the components belonging to
+        the same (root) instrument are updated one after the other in one
+        thread, such that each instrument is only ever talked to by one
+        thread, while different instruments are updated in parallel.
+
         Args:
             update (bool): If True, update the state by querying the
              all the children: f.ex. instruments, parameters, components, etc.
@@ -86,19 +118,135 @@ class Station(Metadatable, DelegateAttributes):
                 self.default_measurement, update)
         }
 
+        if update:
+            groups = self._group_components()
+            # instruments still talked to by a timed out update are not
+            # updated again
+            snapshots = self._snapshot_busy_groups(groups)
+            if self.concurrent_snapshot:
+                snapshots.update(
+                    self._snapshot_components_concurrently(groups))
+            else:
+                snapshots.update(self._snapshot_components(
+                    [name for _, names in groups.values()
+                     for name in names], True))
+        else:
+            snapshots = self._snapshot_components(list(self.components),
+                                                  update)
+        self.snapshot_timings = {name: duration for name, (_, duration)
+                                 in snapshots.items()}
+
         for name, itm in self.components.items():
             if isinstance(itm, (Instrument)):
-                snap['instruments'][name] = itm.snapshot(update=update)
+                category = 'instruments'
             elif isinstance(itm, (Parameter,
                                   ManualParameter,
                                   StandardParameter
                                   )):
-                snap['parameters'][name] = itm.snapshot(update=update)
+                category = 'parameters'
             else:
-                snap['components'][name] = itm.snapshot(update=update)
+                category = 'components'
+            snap[category][name] = snapshots[name][0]
 
         return snap
 
+    def _snapshot_components(self, names: Sequence[str], update: bool
+                             ) -> Dict[str, Tuple[Dict, float]]:
+        """
+        Take the snapshots of the given components one after the other
+
+        Returns:
+            the snapshot of each component and the time it took
+        """
+        snapshots = {}
+        for name in names:
+            t0 = time.perf_counter()
+            snapshot = self.components[name].snapshot(update=update)
+            snapshots[name] = (snapshot, time.perf_counter() - t0)
+        return snapshots
+
+    def _group_components(self) -> Dict[int, Tuple[Any, List[str]]]:
+        """
+        Group the names of the components by their root instrument
+
+        Returns:
+            the root instrument and the names of its components, by id of
+            the root instrument
+        """
+        groups = OrderedDict() # type: Dict[int, Tuple[Any, List[str]]]
+        for name, component in self.components.items():
+            root = getattr(component, 'root_instrument', None) or component
+            groups.setdefault(id(root), (root, []))[1].append(name)
+        return groups
+
+    def _snapshot_busy_groups(self, groups: Dict[int, Tuple[Any, List[str]]]
+                              ) -> Dict[str, Tuple[Dict, float]]:
+        """
+        Take the snapshots without update of the components of the
+        instruments whose update timed out in an earlier snapshot and is
+        still running, and remove them from groups, such that an instrument
+        is never talked to by two threads.
+
+        Returns:
+            the snapshot of each of these components and the time it took
+        """
+        snapshots = {} # type: Dict[str, Tuple[Dict, float]]
+        for key in list(groups):
+            if key not in self._timed_out_threads:
+                continue
+            if not self._timed_out_threads[key][1].is_alive():
+                del self._timed_out_threads[key]
+                continue
+            names = groups.pop(key)[1]
+            log.warning(f"Snapshot: the update of {', '.join(names)} that "
+                        f"timed out earlier is still running, using the "
+                        f"latest values in memory instead")
+            snapshots.update(self._snapshot_components(names, False))
+        return snapshots
+
+    def _snapshot_components_concurrently(
+            self, groups: Dict[int, Tuple[Any, List[str]]]
+            ) -> Dict[str, Tuple[Dict, float]]:
+        """
+        Take the updated snapshots of the components with one thread per
+        root instrument, see snapshot_base. The update of the components of
+        an instrument that do not finish within snapshot_timeout is given
+        up, and their latest values in memory are used instead. Its thread
+        is kept, and the instrument is not updated again until it finishes.
+
+        Args:
+            groups: the components to snapshot, see _group_components
+
+        Returns:
+            the snapshot of each component and the time it took
+        """
+        threads = [RespondingThread(target=self._snapshot_components,
+                                    args=(names, True), daemon=True)
+                   for _, names in groups.values()]
+        for thread in threads:
+            thread.start()
+
+        # the threads run concurrently, so one deadline for all of them
+        # gives each instrument the full timeout
+        deadline = None
+        if self.snapshot_timeout is not None:
+            deadline = time.perf_counter() + self.snapshot_timeout
+
+        snapshots = {} # type: Dict[str, Tuple[Dict, float]]
+        for thread, (key, (root, names)) in zip(threads, groups.items()):
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.perf_counter())
+            try:
+                snapshots.update(thread.output(timeout))
+            except TimeoutError:
+                self._timed_out_threads[key] = (root, thread)
+                log.warning(f"Snapshot: updating {', '.join(names)} took "
+                            f"longer than {self.snapshot_timeout} s, using "
+                            f"the latest values in memory instead")
+                snapshots.update(self._snapshot_components(names, False))
+        return snapshots
+
     def add_component(self, component: Metadatable, name: str=None,
                       update_snapshot: bool=True) -> str:
         """
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from qcodes.dataset.data_export import (datatype_from_setpoints_2d,
+                                        reshape_2D_data,
+                                        reshape_data_on_grid,
+                                        _rows_from_datapoints)
+
+
+def grid_setpoints(nx, ny, n_missing=0):
+    xx, yy = np.meshgrid(np.linspace(0, 1, nx), np.linspace(-1, 1, ny),
+                         indexing='ij')
+    x = xx.ravel()
+    y = yy.ravel()
+    return x[:len(x)-n_missing], y[:len(y)-n_missing]
+
+
+def test_rows_from_datapoints():
+    rows = _rows_from_datapoints(np.array([1, 2, 3, 1, 2, 3]))
+    assert np.array_equal(rows, [[1, 2, 3], [1, 2, 3]])
+
+    rows = _rows_from_datapoints(np.array([3, 1, 2, 1, 2, 1]))
+    assert len(rows) == 3
+    for row, expected in zip(rows, [[1, 2, 3], [1, 2], [1]]):
+        assert np.array_equal(row, expected)
+
+
+@pytest.mark.parametrize('n_missing', [0, 1, 4])
+def test_datatype_grid(n_missing):
+    x, y = grid_setpoints(5, 7, n_missing)
+    assert datatype_from_setpoints_2d([x, y]) == 'grid'
+    assert datatype_from_setpoints_2d([y, x]) == 'grid'
+
+
+def test_datatype_point_equidistant_unknown():
+    x, y = grid_setpoints(5, 7)
+    assert datatype_from_setpoints_2d([x, np.zeros_like(y)]) == 'point'
+
+    # points missing in several places, so the grid is not filled
+    keep = np.ones(len(x), dtype=bool)
+    keep[[3, 8, 9]] = False
+    assert datatype_from_setpoints_2d([x[keep], y[keep]]) == 'equidistant'
+
+    x = np.array([0, 0.1, 0.35, 0.4])
+    y = np.array([0, 1, 1.3, 2])
+    assert datatype_from_setpoints_2d([x, y]) == 'unknown'
+
+
+def test_reshape_2D_data():
+    x, y = grid_setpoints(4, 3, n_missing=2)
+    z = np.arange(len(x), dtype=float)
+
+    xrow, yrow, z_to_plot = reshape_2D_data(x, y, z)
+
+    assert np.array_equal(xrow, np.linspace(0, 1, 4))
+    assert np.array_equal(yrow, np.linspace(-1, 1, 3))
+    assert z_to_plot.shape == (3, 4)
+    expected = np.append(np.arange(10.), [np.nan, np.nan]).reshape(4, 3).T
+    np.testing.assert_array_equal(z_to_plot, expected)
+
+
+def test_reshape_data_on_grid_nd():
+    shape = (3, 4, 2)
+    axes = [np.arange(n)*0.5 for n in shape]
+    grids = np.meshgrid(*axes, indexing='ij')
+    data = np.random.rand(*shape)
+
+    # shuffle the points to make sure the order of the sweep does not matter
+    order = np.random.permutation(data.size)
+    setpoints = [grid.ravel()[order] for grid in grids]
+
+    found_axes, shaped = reshape_data_on_grid(setpoints,
+                                              data.ravel()[order])
+
+    for axis, found_axis in zip(axes, found_axes):
+        assert np.array_equal(axis, found_axis)
+    np.testing.assert_array_equal(shaped, data)
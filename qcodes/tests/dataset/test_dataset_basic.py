@@ -10,6 +10,7 @@ from qcodes.dataset.sqlite_base import connect, init_db, _unicode_categories
 import qcodes.dataset.data_set
 from qcodes.dataset.sqlite_base import get_user_version, set_user_version, atomic_transaction
 from qcodes.dataset.data_set import CompletedError
+from qcodes.dataset.data_export import get_data_by_id
 from qcodes.dataset.database import initialise_database, \
     initialise_or_create_database_at
 
@@ -315,6 +316,73 @@ def test_modify_result(experiment):
         dataset.modify_result(0, {'x': 2})
 
 
+@settings(max_examples=10, deadline=None)
+@given(N=hst.integers(min_value=2, max_value=500),
+       start=hst.integers(min_value=0, max_value=10))
+def test_modify_results(experiment, N, start):
+    xparam = ParamSpec("x", "numeric")
+    yparam = ParamSpec("y", "numeric", depends_on=[xparam])
+    x = np.arange(N + start, dtype=float)
+    y = np.random.rand(N + start)
+    new_x = np.random.rand(N)
+    new_y = np.random.rand(N)
+
+    datasets = []
+    for _ in range(3):
+        dataset = new_data_set("test_modify_results")
+        dataset.add_parameters([xparam, yparam])
+        dataset.add_result_columns({'x': x, 'y': y})
+        datasets.append(dataset)
+    per_row, bulk, columns = datasets
+
+    # only every other result gets a new x value
+    updates = [{'y': yv, 'x': xv} if n % 2 else {'y': yv}
+               for n, (xv, yv) in enumerate(zip(new_x, new_y))]
+
+    for n, update in enumerate(updates):
+        per_row.modify_result(start + n, update)
+    bulk.modify_results(start, updates)
+    columns.modify_result_columns(start, {'y': new_y})
+    columns.modify_result_columns(start + 1, {'x': new_x[1::2]})
+
+    expected = per_row.get_data_as_arrays('x', 'y')
+    assert (expected[0][start + 1], expected[1][start + 1]) == (new_x[1],
+                                                                new_y[1])
+    np.testing.assert_array_equal(bulk.get_data_as_arrays('x', 'y'),
+                                  expected)
+
+    # the columnar path modifies consecutive results only
+    expected_x = x.copy()
+    expected_y = y.copy()
+    expected_y[start:] = new_y
+    expected_x[start + 1:start + 1 + len(new_x[1::2])] = new_x[1::2]
+    np.testing.assert_array_equal(columns.get_data_as_arrays('x', 'y'),
+                                  [expected_x, expected_y])
+
+
+def test_modify_results_raises(experiment):
+    dataset = new_data_set("test_modify_results")
+    dataset.add_parameter(ParamSpec("x", "numeric"))
+    dataset.add_result_columns({'x': np.arange(10)})
+
+    with pytest.raises(ValueError):
+        dataset.modify_results(0, [{'y': 1}])
+    with pytest.raises(ValueError):
+        dataset.modify_result_columns(0, {'y': [1, 2]})
+    with pytest.raises(RuntimeError):
+        dataset.modify_results(8, [{'x': 1}]*3)
+    with pytest.raises(RuntimeError):
+        dataset.modify_result_columns(8, {'x': [1, 2, 3]})
+    # nothing was modified
+    assert dataset.get_data('x') == [[n] for n in range(10)]
+
+    dataset.mark_complete()
+    with pytest.raises(CompletedError):
+        dataset.modify_results(0, [{'x': 1}])
+    with pytest.raises(CompletedError):
+        dataset.modify_result_columns(0, {'x': 1})
+
+
 @settings(max_examples=25)
 @given(N=hst.integers(min_value=1, max_value=10000),
        M=hst.integers(min_value=1, max_value=10000))
@@ -361,14 +429,14 @@ def test_database_upgrade(empty_temp_db):
     connection = connect(qc.config["core"]["db_location"],
                  qc.config["core"]["db_debug"])
     userversion = get_user_version(connection)
-    if userversion != 0:
-        raise RuntimeError("trying to upgrade from version 0"
+    if userversion != 3:
+        raise RuntimeError("trying to upgrade from version 3"
                            " but your database is version"
                            " {}".format(userversion))
     sql = 'ALTER TABLE "runs" ADD COLUMN "quality"'
 
     atomic_transaction(connection, sql)
-    set_user_version(connection, 1)
+    set_user_version(connection, 4)
 
 
 def test_numpy_ints(dataset):
@@ -457,3 +525,146 @@ def test_missing_keys(dataset):
     expected_setpoints = [[[v] for v in vals] for vals in tmp]
 
     assert dataset.get_setpoints("b") == expected_setpoints
+
+
+def test_add_result_columns(dataset):
+    """
+    Test that whole columns of results can be added in one go and that
+    scalars are broadcast to the length of the arrays
+    """
+    x = ParamSpec("x", paramtype='numeric')
+    y = ParamSpec("y", paramtype='numeric', depends_on=[x])
+    z = ParamSpec("z", paramtype='numeric')
+
+    dataset.add_parameters([x, y, z])
+
+    xvals = np.linspace(0, 1, 10)
+    yvals = np.random.randn(10)
+
+    index = dataset.add_result_columns({'x': xvals, 'y': yvals, 'z': 5})
+    assert index == 0
+    assert len(dataset) == 10
+
+    index = dataset.add_result_columns({'x': [2, 3], 'z': 7})
+    assert index == 10
+    assert len(dataset) == 12
+
+    np.testing.assert_allclose(dataset.get_values('x'),
+                               [[v] for v in xvals] + [[2], [3]])
+    np.testing.assert_allclose(dataset.get_values('y'),
+                               [[v] for v in yvals])
+    assert dataset.get_values('z') == 10 * [[5]] + 2 * [[7]]
+
+    with pytest.raises(ValueError):
+        dataset.add_result_columns({'x': [1, 2], 'y': [1, 2, 3]})
+
+    dataset.mark_complete()
+
+    with pytest.raises(CompletedError):
+        dataset.add_result_columns({'x': [1, 2]})
+
+
+def test_get_data_as_arrays(dataset):
+    x = ParamSpec("x", paramtype='numeric')
+    y = ParamSpec("y", paramtype='numeric', depends_on=[x])
+    t = ParamSpec("t", paramtype='text')
+    z = ParamSpec("z", paramtype='array')
+
+    dataset.add_parameters([x, y, t, z])
+
+    xvals = np.linspace(0, 1, 11)
+    yvals = np.random.randn(11)
+    yvals[3] = np.nan
+    dataset.add_result_columns({'x': xvals, 'y': yvals, 't': 'abc'})
+    dataset.add_result({'x': 2, 'z': np.arange(3)})
+
+    xdata, ydata = dataset.get_data_as_arrays('x', y)
+    assert xdata.dtype == np.float64
+    assert xdata.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(xdata, np.append(xvals, 2))
+    np.testing.assert_array_equal(ydata, np.append(yvals, np.nan))
+
+    tdata, zdata, xdata = dataset.get_data_as_arrays('t', 'z', 'x')
+    assert tdata.dtype == object
+    assert list(tdata) == 11 * ['abc'] + [None]
+    assert list(zdata[:-1]) == 11 * [None]
+    np.testing.assert_array_equal(zdata[-1], np.arange(3))
+    np.testing.assert_array_equal(xdata, np.append(xvals, 2))
+
+    # the range works as for get_data (which goes through the 'numeric'
+    # converter, and hence only agrees up to the converter's precision)
+    for start, end in [(None, None), (2, None), (None, 5), (2, 5)]:
+        expected = np.array(dataset.get_data('x', start=start, end=end),
+                            dtype=float).flatten()
+        xdata, = dataset.get_data_as_arrays('x', start=start, end=end)
+        np.testing.assert_allclose(xdata, expected)
+
+    xdata, tdata = dataset.get_data_as_arrays('x', 't', start=20)
+    assert xdata.shape == (0,)
+    assert tdata.shape == (0,)
+
+
+def test_get_parameter_data_and_dependency_graph(dataset):
+    x = ParamSpec("x", paramtype='numeric', label='x label', unit='V')
+    y = ParamSpec("y", paramtype='numeric')
+    a = ParamSpec("a", paramtype='numeric', depends_on=[x])
+    # note that the setpoints are registered in the opposite order of
+    # the axes
+    b = ParamSpec("b", paramtype='numeric', depends_on=[y, x])
+
+    dataset.add_parameter(x)
+    assert dataset.dependency_graph == {}
+    dataset.add_parameters([y, a, b])
+
+    assert dataset.dependency_graph == {'a': ['x'], 'b': ['y', 'x']}
+    assert list(dataset.layouts.keys()) == ['x', 'y', 'a', 'b']
+    assert dataset.layouts['x'] == {'name': 'x', 'label': 'x label',
+                                    'unit': 'V'}
+
+    xvals = [1, 2, 3]
+    yvals = [2, 3, 4]
+    results = []
+    for xv in xvals:
+        results.append({"x": xv, "a": xv + 1})
+        for yv in yvals:
+            results.append({"x": xv, "y": yv, "b": xv - 3*yv})
+    dataset.add_results(results)
+
+    b_data = dataset.get_parameter_data('b')
+    assert list(b_data.keys()) == ['y', 'x', 'b']
+    expected = [r for r in results if 'b' in r]
+    for name in ('y', 'x', 'b'):
+        np.testing.assert_array_equal(b_data[name],
+                                      [r[name] for r in expected])
+
+    # the setpoints come in the order of the axes
+    assert dataset.get_setpoints('b') == [[[r['y']] for r in expected],
+                                          [[r['x']] for r in expected]]
+
+    a_data = dataset.get_parameter_data('a')
+    assert list(a_data.keys()) == ['x', 'a']
+    np.testing.assert_array_equal(a_data['a'], [xv + 1 for xv in xvals])
+
+    with pytest.raises(ValueError):
+        dataset.get_parameter_data('c')
+    with pytest.raises(ValueError):
+        dataset.get_setpoints('x')
+
+
+def test_get_data_by_id(dataset):
+    x = ParamSpec("x", paramtype='numeric', label='x label', unit='V')
+    y = ParamSpec("y", paramtype='numeric', depends_on=[x])
+    dataset.add_parameters([x, y])
+    xvals = np.linspace(0, 1, 10)
+    dataset.add_result_columns({'x': xvals, 'y': 2*xvals})
+
+    data = get_data_by_id(dataset.run_id)
+
+    assert len(data) == 1
+    x_axis, y_axis = data[0]
+    assert x_axis['name'] == 'x'
+    assert x_axis['label'] == 'x label'
+    assert x_axis['unit'] == 'V'
+    np.testing.assert_array_equal(x_axis['data'], xvals)
+    assert y_axis['name'] == 'y'
+    np.testing.assert_array_equal(y_axis['data'], 2*xvals)
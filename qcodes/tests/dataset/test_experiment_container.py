@@ -4,7 +4,9 @@ import os
 
 import qcodes as qc
 from qcodes.dataset.experiment_container import load_experiment_by_name, \
-    new_experiment, load_or_create_experiment, experiments
+    new_experiment, load_or_create_experiment, experiments, run_catalog
+from qcodes.dataset.data_set import new_data_set
+from qcodes.dataset.param_spec import ParamSpec
 from qcodes.dataset.sqlite_base import connect, init_db
 from qcodes.dataset.measurements import Measurement
 from qcodes.dataset.database import initialise_database
@@ -81,3 +83,41 @@ def test_load_or_create_experiment_creating_not_empty(empty_temp_db):
 
     assert_experiments_equal(actual_experiments[0], exp)
     assert_experiments_equal(actual_experiments[1], exp_2)
+
+
+def test_run_catalog(empty_temp_db):
+    exp_1 = new_experiment("experiment_1", "sample_1")
+    for n in range(3):
+        dataset = exp_1.new_data_set(f"run_{n}",
+                                     specs=[ParamSpec("x", "numeric"),
+                                            ParamSpec("y", "numeric")])
+        for m in range(n):
+            dataset.add_result({'x': m, 'y': m})
+    dataset.mark_complete()
+    exp_2 = new_experiment("experiment_2", "sample_2")
+    new_data_set("run_0", exp_id=exp_2.exp_id)
+
+    catalog = run_catalog()
+    assert [run['run_id'] for run in catalog] == [1, 2, 3, 4]
+    assert [run['result_length'] for run in catalog] == [0, 1, 2, 0]
+    assert [run['is_completed'] for run in catalog] == [False, False,
+                                                        True, False]
+    assert catalog[0]['parameters'] == ['x', 'y']
+    assert catalog[3]['parameters'] == []
+    assert catalog[3]['exp_name'] == 'experiment_2'
+    assert catalog[3]['sample_name'] == 'sample_2'
+    assert catalog[1]['result_counter'] == 2
+
+    assert run_catalog(exp_id=exp_2.exp_id) == catalog[3:]
+    assert run_catalog(sample_name='sample_1') == catalog[:3]
+    assert run_catalog(name='run_0') == [catalog[0], catalog[3]]
+
+    # pagination
+    assert run_catalog(limit=2) == catalog[:2]
+    assert run_catalog(limit=2, offset=2) == catalog[2:]
+    assert run_catalog(limit=2, offset=4) == []
+    assert run_catalog(offset=3) == catalog[3:]
+
+    assert len(exp_1) == 3
+    assert len(exp_2) == 1
+    assert repr(exp_1).splitlines()[-1] == '3-run_2-3-x,y-2'
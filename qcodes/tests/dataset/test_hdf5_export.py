@@ -0,0 +1,153 @@
+import os
+import tempfile
+
+import h5py
+import numpy as np
+import pytest
+
+import qcodes as qc
+from qcodes import ParamSpec, new_data_set, new_experiment
+from qcodes.dataset.data_export import reshape_data_on_grid
+from qcodes.dataset.database import initialise_database, close_connections
+from qcodes.dataset.hdf5_export import export_to_hdf5, export_runs_to_hdf5
+
+
+@pytest.fixture(scope="function")
+def empty_temp_db():
+    # create a temp database for testing
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        qc.config["core"]["db_location"] = os.path.join(tmpdirname, 'temp.db')
+        qc.config["core"]["db_debug"] = False
+        initialise_database()
+        yield tmpdirname
+        close_connections()
+
+
+@pytest.fixture(scope='function')
+def experiment(empty_temp_db):
+    e = new_experiment("test-experiment", sample_name="test-sample")
+    yield e
+    e.conn.close()
+
+
+def add_2d_run(n_x, n_y, n_missing=0):
+    x = ParamSpec('x', 'numeric', label='x', unit='V')
+    y = ParamSpec('y', 'numeric', label='y', unit='V')
+    z = ParamSpec('z', 'numeric', label='z', unit='A', depends_on=[x, y])
+    dataset = new_data_set('test-2d', specs=[x, y, z])
+    xx, yy = np.meshgrid(np.linspace(0, 1, n_x), np.linspace(-1, 1, n_y),
+                         indexing='ij')
+    n_points = n_x*n_y - n_missing
+    dataset.add_result_columns({'x': xx.ravel()[:n_points],
+                                'y': yy.ravel()[:n_points],
+                                'z': np.random.rand(n_points)})
+    dataset.mark_complete()
+    return dataset
+
+
+def check_2d_export(dataset, path):
+    x, y, z = dataset.get_data_as_arrays('x', 'y', 'z')
+    with h5py.File(path, 'r') as h5file:
+        assert h5file.attrs['run_id'] == dataset.run_id
+        assert h5file.attrs['name'] == 'test-2d'
+        assert h5file.attrs['exp_name'] == 'test-experiment'
+
+        columns = h5file['columns']
+        for name, values in zip('xyz', (x, y, z)):
+            np.testing.assert_array_equal(columns[name][()], values)
+        assert columns['z'].attrs['unit'] == 'A'
+        assert columns['z'].attrs['depends_on'] == 'x, y'
+
+        (x_axis, y_axis), expected = reshape_data_on_grid([x, y], z)
+        shaped = h5file['shaped/z']
+        np.testing.assert_array_equal(shaped['z'][()], expected)
+        np.testing.assert_array_equal(shaped['x'][()], x_axis)
+        np.testing.assert_array_equal(shaped['y'][()], y_axis)
+        assert list(shaped['z'].attrs['setpoints']) == ['x', 'y']
+
+
+@pytest.mark.parametrize('chunk_size', [7, 100_000])
+def test_export_2d_run(experiment, chunk_size):
+    dataset = add_2d_run(6, 5, n_missing=3)
+    path = os.path.join(os.path.dirname(dataset.path_to_db), 'run.h5')
+
+    assert export_to_hdf5(dataset.run_id, path,
+                          chunk_size=chunk_size) == path
+    check_2d_export(dataset, path)
+
+
+def test_export_2d_run_with_fast_first_axis(experiment):
+    # x varies fastest, so every chunk spans the whole first axis, and the
+    # last point is measured twice
+    x = ParamSpec('x', 'numeric')
+    y = ParamSpec('y', 'numeric')
+    z = ParamSpec('z', 'numeric', depends_on=[x, y])
+    dataset = new_data_set('test-2d', specs=[x, y, z])
+    yy, xx = np.meshgrid(np.linspace(-1, 1, 5), np.linspace(0, 1, 6),
+                         indexing='ij')
+    dataset.add_result_columns({'x': np.append(xx.ravel(), 1),
+                                'y': np.append(yy.ravel(), 1),
+                                'z': np.random.rand(31)})
+    dataset.mark_complete()
+    path = os.path.join(os.path.dirname(dataset.path_to_db), 'run.h5')
+
+    export_to_hdf5(dataset.run_id, path, chunk_size=4)
+
+    x, y, z = dataset.get_data_as_arrays('x', 'y', 'z')
+    _, expected = reshape_data_on_grid([x, y], z)
+    with h5py.File(path, 'r') as h5file:
+        shaped = h5file['shaped/z/z'][()]
+    np.testing.assert_array_equal(shaped, expected)
+    assert shaped[-1, -1] == z[-1]
+
+
+def test_export_text_and_array_columns(experiment):
+    x = ParamSpec('x', 'numeric')
+    trace = ParamSpec('trace', 'array', depends_on=[x])
+    comment = ParamSpec('comment', 'text')
+    dataset = new_data_set('test-mixed', specs=[x, trace, comment])
+    dataset.add_result({'comment': 'start'})
+    for n in range(5):
+        dataset.add_result({'x': n, 'trace': np.arange(3)*n})
+    dataset.mark_complete()
+    path = os.path.join(os.path.dirname(dataset.path_to_db), 'run.h5')
+
+    export_to_hdf5(dataset.run_id, path, chunk_size=2)
+
+    with h5py.File(path, 'r') as h5file:
+        columns = h5file['columns']
+        assert columns['comment'][0] == 'start'
+        assert list(columns['comment'][1:]) == [''] * 5
+        traces = columns['trace'][()]
+        assert traces.shape == (6, 3)
+        assert np.all(np.isnan(traces[0]))
+        np.testing.assert_array_equal(traces[1:],
+                                      np.outer(np.arange(5), np.arange(3)))
+        # an array parameter is not put on a grid
+        assert list(h5file['shaped']) == []
+
+
+def test_export_arrays_of_different_shapes_raises(experiment):
+    trace = ParamSpec('trace', 'array')
+    dataset = new_data_set('test-ragged', specs=[trace])
+    dataset.add_result({'trace': np.arange(3)})
+    dataset.add_result({'trace': np.arange(4)})
+    path = os.path.join(os.path.dirname(dataset.path_to_db), 'run.h5')
+
+    with pytest.raises(ValueError):
+        export_to_hdf5(dataset.run_id, path)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_export_runs(experiment, processes):
+    datasets = [add_2d_run(4, 3), add_2d_run(3, 5, n_missing=1)]
+    directory = os.path.join(os.path.dirname(datasets[0].path_to_db),
+                             'export')
+
+    paths = export_runs_to_hdf5([d.run_id for d in datasets], directory,
+                                processes=processes)
+
+    assert [os.path.basename(path) for path in paths] == ['run_1.h5',
+                                                          'run_2.h5']
+    for dataset, path in zip(datasets, paths):
+        check_2d_export(dataset, path)
@@ -0,0 +1,139 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+import qcodes as qc
+from qcodes import new_experiment
+from qcodes.data.data_array import DataArray
+from qcodes.data.data_set import new_data
+from qcodes.data.io import DiskIO
+from qcodes.dataset.data_set import load_by_id
+from qcodes.dataset.database import initialise_database, close_connections
+from qcodes.dataset import legacy_import
+from qcodes.dataset.legacy_import import (array_to_columns, import_dat_file,
+                                          import_dat_files,
+                                          store_dataset_to_database)
+
+
+@pytest.fixture(scope="function")
+def empty_temp_db():
+    # create a temp database for testing
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        qc.config["core"]["db_location"] = os.path.join(tmpdirname, 'temp.db')
+        qc.config["core"]["db_debug"] = False
+        initialise_database()
+        yield tmpdirname
+        close_connections()
+
+
+@pytest.fixture(scope='function')
+def experiment(empty_temp_db):
+    e = new_experiment("test-experiment", sample_name="test-sample")
+    yield e
+    e.conn.close()
+
+
+def legacy_3d_arrays(nx=2, ny=3, nz=4):
+    x = DataArray(name='x', label='X', unit='V', is_setpoint=True,
+                  preset_data=np.arange(nx) + 10.)
+    y = DataArray(name='y', label='Y', unit='V', is_setpoint=True,
+                  preset_data=np.arange(ny) + 20.)
+    y.nest(nx, set_array=x)
+    z = DataArray(name='z', label='Z', unit='V', is_setpoint=True,
+                  preset_data=np.arange(nz) + 30.)
+    z.nest(ny, set_array=y)
+    z.nest(nx, set_array=x)
+    m = DataArray(name='m', label='M', unit='A', set_arrays=(x, y, z),
+                  preset_data=np.random.rand(nx, ny, nz))
+    return x, y, z, m
+
+
+def write_legacy_data(location, arrays):
+    data = new_data(arrays=arrays, location=location,
+                    io=DiskIO(os.path.dirname(location)))
+    data.finalize()
+    return data
+
+
+def test_array_to_columns_3d():
+    x, y, z, m = legacy_3d_arrays()
+    columns = array_to_columns(m)
+
+    assert list(columns) == ['x', 'y', 'z', 'm']
+    xx, yy, zz = np.meshgrid(x.ndarray, y.ndarray[0], z.ndarray[0, 0],
+                             indexing='ij')
+    for name, expected in zip('xyz', (xx, yy, zz)):
+        np.testing.assert_array_equal(columns[name], expected.ravel())
+    np.testing.assert_array_equal(columns['m'], m.ndarray.ravel())
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_import_dat_files_3d(experiment, empty_temp_db, processes):
+    locations = [os.path.join(empty_temp_db, f'legacy_{n}')
+                 for n in range(3)]
+    legacy = [write_legacy_data(location, legacy_3d_arrays(n + 1, 3, 2))
+              for n, location in enumerate(locations)]
+
+    run_ids = import_dat_files(locations, processes=processes)
+
+    assert run_ids == [1, 2, 3]
+    for run_id, old_data in zip(run_ids, legacy):
+        data = load_by_id(run_id)
+        assert data.parameters == 'x,y,z,m'
+        assert data.paramspecs['m'].depends_on == 'x, y, z'
+        assert data.paramspecs['m'].unit == 'A'
+        columns = array_to_columns(old_data.m)
+        assert data.number_of_results == len(columns['m'])
+        for name, values in zip('xyzm', data.get_data_as_arrays(*'xyzm')):
+            np.testing.assert_allclose(values, columns[name])
+
+
+def test_import_dat_files_reads_ahead_boundedly(experiment, empty_temp_db,
+                                               monkeypatch):
+    locations = [os.path.join(empty_temp_db, f'legacy_{n}')
+                 for n in range(10)]
+    for location in locations:
+        write_legacy_data(location, legacy_3d_arrays())
+
+    consumed = []
+
+    def location_iterator():
+        for location in locations:
+            consumed.append(location)
+            yield location
+
+    # the number of locations taken from the iterator before each write
+    taken = []
+
+    def store(dataset):
+        taken.append(len(consumed))
+        return store_dataset_to_database(dataset)
+
+    monkeypatch.setattr(legacy_import, 'store_dataset_to_database', store)
+    run_ids = import_dat_files(location_iterator(), processes=2)
+
+    assert run_ids == list(range(1, 11))
+    # 4 DataSets are read ahead, and one more is submitted before each write
+    assert taken == [5, 6, 7, 8, 9, 10, 10, 10, 10, 10]
+
+
+def test_import_arrays_with_different_setpoints(experiment, empty_temp_db):
+    x = DataArray(name='x', is_setpoint=True, preset_data=[1., 2., 3.])
+    t = DataArray(name='t', is_setpoint=True, preset_data=[5., 6.])
+    a = DataArray(name='a', set_arrays=(x,), preset_data=[7., 8., 9.])
+    b = DataArray(name='b', set_arrays=(x,), preset_data=[0., 1., 2.])
+    c = DataArray(name='c', set_arrays=(t,), preset_data=[3., 4.])
+    location = os.path.join(empty_temp_db, 'legacy')
+    write_legacy_data(location, (x, t, a, b, c))
+
+    run_id, = import_dat_file(location)
+
+    data = load_by_id(run_id)
+    assert data.number_of_results == 5
+    # the arrays measured at x share their rows, c gets rows of its own
+    rows = data.get_data('x', 'a', 'b', 't', 'c')
+    assert sorted(rows, key=repr) == sorted([
+        [1, 7, 0, None, None], [2, 8, 1, None, None], [3, 9, 2, None, None],
+        [None, None, None, 5, 3], [None, None, None, 6, 4]], key=repr)
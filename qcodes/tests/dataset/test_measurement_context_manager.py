@@ -11,7 +11,9 @@ import numpy as np
 from qcodes.tests.common import retry_until_does_not_throw
 
 import qcodes as qc
-from qcodes.dataset.measurements import Measurement
+from qcodes.dataset.measurements import (Measurement, DataSaver,
+                                         DataWriteError, WriteQueueFullError,
+                                         _BackgroundWriter)
 from qcodes.dataset.experiment_container import new_experiment
 from qcodes.tests.instrument_mocks import DummyInstrument, DummyChannelInstrument
 from qcodes.dataset.param_spec import ParamSpec
@@ -691,6 +693,160 @@ def test_datasaver_unsized_arrays(empty_temp_db, N):
     assert datasaver.points_written == N
 
 
+@settings(max_examples=10, deadline=None)
+@given(N=hst.integers(min_value=2, max_value=500))
+def test_datasaver_write_in_background(experiment, DAC, DMM, N):
+
+    meas = Measurement(exp=experiment)
+    meas.write_period = 1e-3
+    meas.register_parameter(DAC.ch1)
+    meas.register_parameter(DMM.v1, setpoints=(DAC.ch1,))
+
+    collected_x_vals = []
+
+    def collect_x_vals(results, length, state):
+        state += [res[0] for res in results]
+
+    meas.add_subscriber(collect_x_vals, state=collected_x_vals)
+
+    with meas.run(write_in_background=True) as datasaver:
+        assert datasaver._writer is not None
+        for x in range(N):
+            datasaver.add_result((DAC.ch1, x), (DMM.v1, 2*x))
+
+    # exiting the context waits for the writer to write everything
+    assert not datasaver._writer.is_alive()
+    assert datasaver.points_written == N
+    assert datasaver.dataset.get_values('dummy_dac_ch1') == \
+        [[x] for x in range(N)]
+    assert datasaver.dataset.get_values('dummy_dmm_v1') == \
+        [[2*x] for x in range(N)]
+    assert collected_x_vals == list(range(N))
+
+
+@pytest.mark.parametrize('use_threads', [False, True])
+def test_datasaver_get_results(experiment, DAC, DMM, use_threads):
+    meas = Measurement(exp=experiment)
+    meas.register_parameter(DAC.ch1)
+    meas.register_parameter(DMM.v1, setpoints=(DAC.ch1,))
+    meas.register_parameter(DMM.v2, setpoints=(DAC.ch1,))
+
+    with meas.run(use_threads=use_threads) as datasaver:
+        for x in range(5):
+            DAC.ch1(x)
+            DMM.v1(2*x)
+            DMM.v2(3*x)
+            results = datasaver.get_results(DAC.ch1, DMM.v1, DMM.v2)
+            assert results == [(DAC.ch1, x), (DMM.v1, 2*x), (DMM.v2, 3*x)]
+            datasaver.add_result(*results)
+        pool = datasaver._thread_pool
+        if use_threads:
+            assert pool.n_workers == 2
+        else:
+            assert pool is None
+
+    if use_threads:
+        # the threads are stopped at the end of the run
+        assert pool.n_workers == 0
+    assert datasaver.dataset.get_values('dummy_dmm_v2') == \
+        [[3*x] for x in range(5)]
+
+
+def test_background_writer_queue_policy(experiment):
+    dataset = qc.new_data_set('test-dataset')
+
+    writer = _BackgroundWriter(dataset, max_queued_bytes=40,
+                               queue_policy='raise')
+    # the writer is not started, so nothing leaves the queue
+    writer.put({'x': [1, 2, 3]}, 3)
+    writer.put({'x': [4, 5]}, 2)
+    assert writer.queued_points == 5
+    assert writer.queued_bytes == 40
+
+    with pytest.raises(WriteQueueFullError):
+        writer.put({'x': [6]}, 1)
+
+    assert writer.queued_points == 5
+
+    with pytest.raises(ValueError):
+        _BackgroundWriter(dataset, max_queued_bytes=40, queue_policy='drop')
+
+    dataset.conn.close()
+
+
+def test_background_writer_counts_array_bytes(experiment):
+    dataset = qc.new_data_set('test-dataset')
+
+    writer = _BackgroundWriter(dataset, max_queued_bytes=10_000,
+                               queue_policy='raise')
+    # a single result holding a large array fills the queue
+    writer.put({'x': [np.zeros(1000)], 'name': ['abcd']}, 1)
+    assert writer.queued_bytes == 8004
+
+    with pytest.raises(WriteQueueFullError):
+        writer.put({'x': [np.zeros(500)], 'name': ['abcd']}, 1)
+    writer.put({'x': [np.zeros(10)], 'name': [b'ab']}, 1)
+    assert writer.queued_points == 2
+    assert writer.queued_bytes == 8086
+
+    dataset.conn.close()
+
+
+def test_datasaver_keeps_results_if_queue_is_full(experiment):
+    dataset = qc.new_data_set('test-dataset')
+    xparam = ParamSpec('x', 'numeric')
+    dataset.add_parameter(xparam)
+
+    datasaver = DataSaver(dataset=dataset, write_period=1000,
+                          parameters={'x': xparam})
+    # a writer that is not started, so nothing leaves its queue
+    datasaver._writer = _BackgroundWriter(dataset, max_queued_bytes=16,
+                                          queue_policy='raise')
+    datasaver._writer.put({'x': [0]}, 1)
+
+    datasaver.add_result(('x', 1))
+    datasaver.add_result(('x', 2))
+    with pytest.raises(WriteQueueFullError):
+        datasaver.flush_data_to_database()
+
+    assert datasaver._results == [{'x': [1, 2]}]
+    assert datasaver._writer.queued_points == 1
+
+    dataset.conn.close()
+
+
+@pytest.mark.parametrize('write_in_background', [False, True])
+def test_datasaver_failed_commit_raises(experiment, write_in_background):
+    dataset = qc.new_data_set('test-dataset')
+    xparam = ParamSpec('x', 'numeric')
+    dataset.add_parameter(xparam)
+
+    datasaver = DataSaver(dataset=dataset, write_period=1000,
+                          parameters={'x': xparam},
+                          write_in_background=write_in_background)
+    datasaver.add_result(('x', 1))
+    datasaver.flush_data_to_database(block=True)
+    assert datasaver.points_written == 1
+
+    atomic_transaction(dataset.conn, f'DROP TABLE "{dataset.table_name}"')
+
+    datasaver.add_result(('x', 2))
+    with pytest.raises(DataWriteError):
+        datasaver.flush_data_to_database(block=True)
+
+    if write_in_background:
+        # the writer has stopped and keeps refusing new results
+        with pytest.raises(DataWriteError):
+            datasaver.add_result(('x', 3))
+            datasaver.flush_data_to_database()
+    else:
+        # the results that could not be written are kept
+        assert datasaver._results == [{'x': [2]}]
+
+    datasaver._stop_writer()
+    dataset.conn.close()
+
+
 @settings(max_examples=5, deadline=None)
 @given(N=hst.integers(min_value=5, max_value=500),
        M=hst.integers(min_value=4, max_value=250))
@@ -877,3 +1033,50 @@ def test_load_legacy_files_1D(experiment):
     assert sorted(list(snapshot.keys())) == ['__class__', 'arrays',
                                              'formatter', 'io', 'location',
                                              'loop', 'station']
+
+
+@settings(max_examples=5, deadline=None)
+@given(N=hst.integers(min_value=5, max_value=50),
+       M=hst.integers(min_value=4, max_value=250),
+       compression=hst.sampled_from(['none', 'zlib']))
+def test_datasaver_blob_array_parameters(experiment, SpectrumAnalyzer, DAC,
+                                         N, M, compression):
+    spectrum = SpectrumAnalyzer.listspectrum
+    spectrum.npts = M
+
+    meas = Measurement()
+    meas.register_parameter(DAC.ch1)
+    meas.register_parameter(spectrum, setpoints=[DAC.ch1],
+                            paramtype='blob')
+
+    assert meas.parameters[str(spectrum)].type == 'blob'
+    assert meas.parameters['dummy_SA_Frequency'].type == 'blob'
+
+    traces = []
+    qc.config['dataset']['blob_compression'] = compression
+    try:
+        with meas.run() as datasaver:
+            for set_v in np.linspace(0, 0.01, N):
+                trace = spectrum.get()
+                traces.append(trace)
+                datasaver.add_result((DAC.ch1, set_v), (spectrum, trace))
+    finally:
+        qc.config['dataset']['blob_compression'] = 'none'
+
+    # one row per trace
+    assert datasaver.points_written == N
+
+    data = datasaver.dataset.get_parameter_data(str(spectrum))
+    ch1, freqs, spectra = data.values()
+    np.testing.assert_allclose(ch1, np.linspace(0, 0.01, N))
+    for freq, spec, trace in zip(freqs, spectra, traces):
+        np.testing.assert_array_equal(freq, np.linspace(0, 2e6, M))
+        np.testing.assert_array_equal(spec, trace)
+
+
+def test_register_invalid_paramtype(DAC):
+    meas = Measurement()
+    with pytest.raises(ValueError):
+        meas.register_parameter(DAC.ch1, paramtype='array')
+    with pytest.raises(ValueError):
+        meas.register_custom_parameter('custom', paramtype='text')
@@ -50,7 +50,7 @@ def test_creation(name, sp1, sp2, inff1, inff2):
 
 @given(name=hst.text(min_size=1))
 def test_repr(name):
-    okay_types = ['array', 'numeric', 'text']
+    okay_types = ['array', 'numeric', 'text', 'blob']
 
     for okt in okay_types:
         if name.isidentifier():
@@ -1,10 +1,14 @@
 # Since all other tests of data_set and measurements will inevitably also
 # test the sqlite_base module, we mainly test exceptions here
 
+import copy
+import json
 import tempfile
 import os
+from threading import Thread
 from sqlite3 import OperationalError
 
+import numpy as np
 import pytest
 import hypothesis.strategies as hst
 from hypothesis import given
@@ -12,7 +16,8 @@ import unicodedata
 
 import qcodes as qc
 import qcodes.dataset.sqlite_base as mut  # mut: module under test
-from qcodes.dataset.database import initialise_database
+from qcodes.dataset.database import (initialise_database, get_connection,
+                                     close_connections)
 from qcodes.dataset.param_spec import ParamSpec
 
 _unicode_categories = ('Lu', 'Ll', 'Lt', 'Lm', 'Lo', 'Nd', 'Pc', 'Pd', 'Zs')
@@ -72,6 +77,14 @@ def test_insert_many_values_raises(experiment):
                                values=[[1], [1, 3]])
 
 
+def test_insert_columns_raises(experiment):
+    conn = experiment.conn
+
+    with pytest.raises(ValueError):
+        mut.insert_columns(conn, 'some_string', ['column1', 'column2'],
+                           values=[[1], [1, 3]])
+
+
 @given(table_name=hst.text(max_size=50))
 def test__validate_table_raises(table_name):
     should_raise = False
@@ -123,3 +136,226 @@ def test_get_dependents(experiment):
                      mut.get_layout_id(experiment.conn, 'z', run_id)]
 
     assert deps == expected_deps
+
+
+@pytest.mark.parametrize('compression', ['none', 'zlib'])
+@pytest.mark.parametrize('array', [np.linspace(0, 1, 11),
+                                   np.arange(12, dtype=np.int16).reshape(3, 4),
+                                   np.array(2.5),
+                                   np.zeros((0, 3)),
+                                   np.ones(5, dtype=complex)])
+def test_array_blob_roundtrip(array, compression):
+    blob = mut.encode_array_blob(array, compression)
+    converted = mut._convert_blob(blob)
+    assert converted.dtype == array.dtype
+    assert converted.shape == array.shape
+    np.testing.assert_array_equal(converted, array)
+    if compression == 'none':
+        # a view on the buffer, not a copy
+        assert converted.base is not None
+        assert not converted.flags.writeable
+
+
+def test_array_blob_raises():
+    with pytest.raises(ValueError):
+        mut.encode_array_blob(np.arange(3), compression='lz5')
+    with pytest.raises(ValueError):
+        mut.encode_array_blob(np.array([1, 'a', None], dtype=object))
+
+
+@pytest.mark.parametrize('profile', ['rollback', 'wal'])
+def test_connection_profile(profile):
+    pragmas = qc.config['dataset']['sqlite_profiles'][profile]
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        conn = mut.connect(os.path.join(tmpdirname, 'temp.db'),
+                           profile=profile)
+        journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        assert journal_mode.upper() == pragmas['journal_mode']
+        cache_size = conn.execute('PRAGMA cache_size').fetchone()[0]
+        assert cache_size == pragmas['cache_size']
+        conn.close()
+
+
+def test_connection_profile_raises():
+    with pytest.raises(ValueError):
+        mut.connect(':memory:', profile='no_such_profile')
+
+
+def test_get_connection(empty_temp_db):
+    conn = get_connection()
+    assert get_connection() is conn
+    assert get_connection(debug=not qc.config['core']['db_debug']) is not conn
+
+    other_conns = []
+    thread = Thread(target=lambda: other_conns.append(get_connection()))
+    thread.start()
+    thread.join()
+    assert other_conns[0] is not conn
+
+    conn.close()
+    new_conn = get_connection()
+    assert new_conn is not conn
+    new_conn.execute('SELECT 1')
+
+    close_connections()
+    assert get_connection() is not new_conn
+
+
+def test_closing_a_pooled_connection(experiment):
+    dataset = qc.new_data_set('test-dataset', conn=experiment.conn)
+    # one connection, also with db_debug on
+    assert dataset.conn is experiment.conn
+
+    dataset.conn.close()
+    # the other holders get a new connection
+    assert experiment.last_counter == 1
+    assert dataset.name == 'test-dataset'
+    assert dataset.conn is experiment.conn
+
+
+def test_length_is_tracked_in_runs_table(experiment):
+    dataset = qc.new_data_set("test-dataset",
+                              specs=[ParamSpec('x', 'numeric')])
+    table = dataset.table_name
+    assert mut.length(experiment.conn, table) == 0
+
+    mut.insert_values(experiment.conn, table, ['x'], [1])
+    mut.insert_many_values(experiment.conn, table, ['x'], [[2], [3]])
+    mut.insert_columns(experiment.conn, table, ['x'], [np.arange(4)])
+
+    c = experiment.conn.execute(f'SELECT MAX(id) FROM "{table}"')
+    assert c.fetchone()[0] == 7
+    assert mut.length(experiment.conn, table) == 7
+    assert len(dataset) == dataset.number_of_results == 7
+
+    # a failed insert does not change the length
+    with pytest.raises(RuntimeError):
+        mut.insert_columns(experiment.conn, table, ['no_such_column'],
+                           [np.arange(4)])
+    assert mut.length(experiment.conn, table) == 7
+
+
+def test_perform_db_upgrade_0_to_1():
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        path = os.path.join(tmpdirname, 'old.db')
+        old_schema = mut._runs_table_schema.replace(
+            'result_length INTEGER,', '')
+        conn = mut.sqlite3.connect(path)
+        conn.executescript(mut._experiment_table_schema + old_schema + """
+            INSERT INTO experiments (name) VALUES ("old");
+            CREATE TABLE "results-1-1" (id INTEGER PRIMARY KEY, x numeric);
+            INSERT INTO "results-1-1" (x) VALUES (1), (2), (3);
+            INSERT INTO runs (name, exp_id, result_table_name)
+                VALUES ("present", 1, "results-1-1");
+            INSERT INTO runs (name, exp_id, result_table_name)
+                VALUES ("missing", 1, "missing");
+            """)
+        conn.commit()
+        conn.close()
+
+        # reading does not upgrade the database
+        conn = mut.connect(path)
+        assert mut.length(conn, "results-1-1") == 3
+        assert [run['result_length'] for run in
+                mut.get_run_summaries(conn, name='present')] == [3]
+        assert mut.get_user_version(conn) == 0
+
+        mut.perform_db_upgrade(conn)
+        assert mut.get_user_version(conn) == 3
+        assert mut.length(conn, "results-1-1") == 3
+        assert mut.length(conn, "missing") == 0
+
+        # a run that an older version creates after the upgrade is not
+        # counted, its length is read from its result table
+        conn.executescript("""
+            CREATE TABLE "results-1-3" (id INTEGER PRIMARY KEY, x numeric);
+            INSERT INTO "results-1-3" (x) VALUES (1), (2);
+            INSERT INTO runs (exp_id, result_table_name)
+                VALUES (1, "results-1-3");
+            """)
+        assert mut.length(conn, "results-1-3") == 2
+        assert [run['result_length'] for run in
+                mut.get_run_summaries(conn)] == [3, 0, 2]
+        conn.close()
+
+
+def test_perform_db_upgrade_1_to_2(experiment):
+    conn = experiment.conn
+    assert mut.get_user_version(conn) == 3
+
+    c = mut.atomic_transaction(conn, "SELECT name FROM sqlite_master "
+                                     "WHERE type = 'index'")
+    indexes = [row['name'] for row in c.fetchall()]
+    for index, _, _ in mut._catalog_indexes:
+        assert index in indexes
+
+    c = mut.atomic_transaction(conn, "EXPLAIN QUERY PLAN SELECT * FROM runs "
+                                     "WHERE exp_id = 1")
+    assert 'runs_exp_id' in ' '.join(str(tuple(row)) for row in c)
+
+
+def test_snapshot_delta_roundtrip():
+    old = {'a': 1, 'b': {'c': [1, 2], 'd': 'x'}, 'e': None}
+    new = {'a': True, 'b': {'c': [1, 2], 'd': 'y', 'f': {}}, 'g': 1.5}
+
+    delta = mut._snapshot_delta(old, new)
+    assert delta == {'changed': {'a': True, 'g': 1.5},
+                     'nested': {'b': {'changed': {'d': 'y', 'f': {}}}},
+                     'removed': ['e']}
+    assert mut._apply_snapshot_delta(old, delta) == new
+    assert old['b']['d'] == 'x'
+    assert mut._snapshot_delta(new, new) == {}
+
+
+def test_insert_snapshot(experiment):
+    conn = experiment.conn
+    snapshots = [{'station': {'instruments': {
+                     f'dac{n}': {'parameters': {'v': {'value': n*0.1,
+                                                      'unit': 'V'}}}
+                     for n in range(20)}}}]
+    for n in range(mut._MAX_SNAPSHOT_DELTA_DEPTH + 3):
+        snapshot = copy.deepcopy(snapshots[-1])
+        snapshot['station']['instruments']['dac0']['parameters']['v'][
+            'value'] = n
+        snapshots.append(snapshot)
+    snapshots.append(snapshots[0])
+
+    hashes = [mut.insert_snapshot(conn, json.dumps(snapshot))
+              for snapshot in snapshots]
+
+    # identical snapshots are stored once
+    assert hashes[0] == hashes[-1]
+    c = mut.atomic_transaction(conn, 'SELECT snapshot_hash, base_hash, '
+                                     'depth FROM snapshots ORDER BY rowid')
+    rows = c.fetchall()
+    assert len(rows) == len(snapshots) - 1
+    assert [row['depth'] for row in rows[:3]] == [0, 1, 2]
+    assert rows[1]['base_hash'] == rows[0]['snapshot_hash']
+    assert max(row['depth'] for row in rows) == \
+        mut._MAX_SNAPSHOT_DELTA_DEPTH
+
+    # the snapshots are reconstructed from the deltas, also when they are
+    # not cached
+    mut._snapshot_cache.clear()
+    for snapshot_hash, snapshot in zip(hashes, snapshots):
+        assert json.loads(mut.get_snapshot(conn, snapshot_hash)) == snapshot
+
+    with pytest.raises(ValueError):
+        mut.get_snapshot(conn, 'no-such-hash')
+
+
+def test_run_snapshot(experiment):
+    dataset = qc.new_data_set('test-snapshot')
+    assert dataset.snapshot is None
+
+    snapshot = {'station': {'instruments': {}, 'parameters': {}}}
+    dataset.add_snapshot(json.dumps(snapshot))
+    assert dataset.snapshot == snapshot
+    assert json.loads(dataset.get_metadata('snapshot')) == snapshot
+    assert dataset.get_metadata('snapshot_hash') == \
+        mut.insert_snapshot(experiment.conn, json.dumps(snapshot))
+
+    # snapshots stored by older versions in the runs table are still found
+    legacy_dataset = qc.new_data_set('test-legacy-snapshot')
+    legacy_dataset.add_metadata('snapshot', json.dumps(snapshot))
+    assert legacy_dataset.snapshot == snapshot
@@ -3,8 +3,10 @@ import tempfile
 import os
 from typing import List, Tuple, Dict, Union
 from numbers import Number
+import time
 
 import pytest
+import numpy as np
 from numpy import ndarray
 
 import qcodes as qc
@@ -15,6 +17,16 @@ from qcodes.dataset.database import initialise_database
 VALUE = Union[str, Number, List, ndarray, bool]
 
 
+def wait_until(condition, timeout=5):
+    """
+    Wait for a condition to become true, e.g. for a subscriber thread to
+    have called its callback
+    """
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
 @pytest.fixture(scope="function")
 def empty_temp_db():
     # create a temp database for testing
@@ -74,4 +86,85 @@ def test_basic_subscription(dataset, basic_subscriber):
         y = -x**2
         dataset.add_result({'x': x, 'y': y})
         expected_state[x+1] = [(x, y)]
+        # the callback is called from the subscriber thread
+        wait_until(lambda: len(dataset.subscribers[sub_id].state) == x+1)
         assert dataset.subscribers[sub_id].state == expected_state
+
+
+def test_subscription_one_call_per_batch(dataset, basic_subscriber):
+    xparam = ParamSpec(name='x', paramtype='numeric')
+    yparam = ParamSpec(name='y', paramtype='numeric', depends_on=[xparam])
+    dataset.add_parameters([xparam, yparam])
+
+    state: Dict = {}
+    dataset.subscribe(basic_subscriber, min_wait=0, min_count=1,
+                      state=state)
+
+    dataset.add_results([{'x': x, 'y': -x} for x in range(100)])
+    wait_until(lambda: len(state) == 1)
+    assert state == {100: [(x, -x) for x in range(100)]}
+
+    dataset.add_result_columns({'x': np.arange(100, 150),
+                                'y': -np.arange(100, 150)})
+    wait_until(lambda: len(state) == 2)
+    assert state[150] == [(x, -x) for x in range(100, 150)]
+
+    dataset.mark_complete()
+    # completing calls the callback a last time, synchronously
+    assert state[150] == []
+
+
+def test_columnar_subscription(dataset):
+    xparam = ParamSpec(name='x', paramtype='numeric')
+    yparam = ParamSpec(name='y', paramtype='numeric', depends_on=[xparam])
+    dataset.add_parameters([xparam, yparam])
+
+    batches: List[Dict[str, ndarray]] = []
+
+    def subscriber(results, length, state):
+        if length:
+            batches.append(results)
+
+    dataset.subscribe(subscriber, min_wait=0, min_count=10, columnar=True)
+
+    for x in range(25):
+        dataset.add_result({'x': x, 'y': 2*x})
+    dataset.mark_complete()
+
+    x = np.concatenate([batch['x'] for batch in batches])
+    y = np.concatenate([batch['y'] for batch in batches])
+    np.testing.assert_array_equal(x, np.arange(25))
+    np.testing.assert_array_equal(y, 2*np.arange(25))
+    # all but the last call have at least min_count results
+    assert all(len(batch['x']) >= 10 for batch in batches[:-1])
+
+
+@pytest.mark.parametrize('action', ['done_callback', 'unsubscribe'])
+def test_callback_stopping_its_own_subscriber(dataset, action):
+    xparam = ParamSpec(name='x', paramtype='numeric')
+    dataset.add_parameter(xparam)
+
+    errors: List[Exception] = []
+    ids: List[str] = []
+
+    def subscriber(results, length, state):
+        # called in the thread of the subscriber, which must not wait for
+        # itself
+        try:
+            if action == 'done_callback':
+                dataset.subscribers[ids[0]].done_callback()
+            else:
+                dataset.unsubscribe(ids[0])
+        except Exception as e:
+            errors.append(e)
+
+    ids.append(dataset.subscribe(subscriber, min_wait=0, min_count=1))
+    thread = dataset.subscribers[ids[0]]
+
+    dataset.add_result({'x': 1})
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert errors == []
+    if action == 'unsubscribe':
+        assert dataset.subscribers == {}
@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from qcodes.instrument.base import Instrument
+from qcodes.instrument.channel import InstrumentChannel
+from qcodes.instrument.ip import IPInstrument
+from qcodes.tests.test_ip import StandInServer
+from qcodes.utils.async_helpers import gather_get, gather_set, run_coroutine
+from qcodes.utils.tracing import trace_io
+
+
+class SlowInstrument(Instrument):
+    """
+    An instrument of which every ask and write takes `delay` seconds,
+    recording the commands and the threads they were sent in
+    """
+
+    def __init__(self, name, delay, **kwargs):
+        super().__init__(name, **kwargs)
+        self.delay = delay
+        self.commands = []
+        self.threads = set()
+        self._busy = False
+
+        self.add_parameter('voltage', get_cmd='VOLT?', set_cmd='VOLT {}',
+                           get_parser=float, scale=10)
+        self.add_parameter('mode', get_cmd='MODE?', set_cmd='MODE {}',
+                           val_mapping={'dc': 0, 'ac': 1})
+        self.add_parameter('callable', get_cmd=lambda: self.ask('CALL?'),
+                           set_cmd=False)
+        channel = InstrumentChannel(self, 'channel')
+        channel.add_parameter('current', get_cmd='CURR?', get_parser=float)
+        self.add_submodule('channel', channel)
+
+    def _communicate(self, cmd):
+        # the lock of the instrument never lets two commands overlap
+        assert not self._busy
+        self._busy = True
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        self.commands.append(cmd)
+        self._busy = False
+
+    def write_raw(self, cmd):
+        self._communicate(cmd)
+
+    def ask_raw(self, cmd):
+        self._communicate(cmd)
+        return '0' if cmd in ('MODE?', 'CALL?') else '1.5'
+
+
+class TestAsyncParameters(TestCase):
+
+    def setUp(self):
+        self.instruments = [SlowInstrument(f'slow{n}', 0.1)
+                            for n in range(4)]
+
+    def tearDown(self):
+        for instrument in self.instruments:
+            instrument.close()
+
+    def test_gather_get_is_concurrent_across_instruments(self):
+        parameters = [instrument.voltage for instrument in self.instruments]
+        t0 = time.perf_counter()
+        values = run_coroutine(gather_get(parameters))
+        self.assertLess(time.perf_counter() - t0, 0.3)
+
+        self.assertEqual(values, [0.15] * 4)
+        for instrument in self.instruments:
+            self.assertEqual(instrument.voltage.get_latest(), 0.15)
+            self.assertEqual(instrument.voltage.raw_value, '1.5')
+        threads = [instrument.threads for instrument in self.instruments]
+        self.assertEqual(len(set.union(*threads)), len(self.instruments))
+
+    def test_gather_get_of_one_instrument_is_serial(self):
+        slow = self.instruments[0]
+        parameters = [slow.voltage, slow.mode, slow.callable,
+                      slow.channel.current]
+        t0 = time.perf_counter()
+        values = run_coroutine(gather_get(parameters))
+        self.assertGreater(time.perf_counter() - t0, 0.35)
+
+        self.assertEqual(values, [0.15, 'dc', '0', 1.5])
+        self.assertEqual(slow.commands, ['VOLT?', 'MODE?', 'CALL?', 'CURR?'])
+        self.assertEqual(len(slow.threads), 1)
+
+    def test_gather_set(self):
+        first, second = self.instruments[:2]
+        first.voltage.step = 0.1
+        first.voltage.set(0)
+        first.commands.clear()
+
+        t0 = time.perf_counter()
+        run_coroutine(gather_set({first.voltage: 0.2, first.mode: 'ac',
+                                  second.voltage: 0.3}))
+        # the ramp of the first instrument takes longest
+        self.assertLess(time.perf_counter() - t0, 0.45)
+
+        self.assertEqual(first.commands, ['VOLT 1.0', 'VOLT 2.0', 'MODE 1'])
+        self.assertEqual(second.commands, ['VOLT 3.0'])
+        self.assertEqual(first.voltage.get_latest(), 0.2)
+        self.assertEqual(first.mode.get_latest(), 'ac')
+
+    def test_errors(self):
+        slow = self.instruments[0]
+        with self.assertRaises(ValueError) as context:
+            run_coroutine(slow.mode.set_async('off'))
+        self.assertIn('setting slow0_mode to off', context.exception.args)
+        self.assertEqual(slow.commands, [])
+
+    def test_sync_and_async_use_of_one_instrument(self):
+        slow = self.instruments[0]
+        thread = threading.Thread(target=lambda: [slow.voltage.get()
+                                                  for _ in range(3)])
+        thread.start()
+        run_coroutine(gather_get([slow.voltage] * 3))
+        thread.join()
+        self.assertEqual(slow.commands, ['VOLT?'] * 6)
+
+    def test_run_coroutine_in_running_loop(self):
+        slow = self.instruments[0]
+
+        async def measure():
+            # as in a notebook with a running event loop
+            return run_coroutine(gather_get([slow.voltage]))
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(loop.run_until_complete(measure()), [0.15])
+        finally:
+            loop.close()
+
+
+class TestIPInstrumentAsync(TestCase):
+
+    def setUp(self):
+        # every response takes about 0.1 s
+        delay = [b''] * 10
+        self.server = StandInServer({
+            'VOLT?': delay + [b'1.5\r\n'],
+            'VOLT 2': delay + [b'OK\r\n'],
+            'LONG?': delay + [b'a' * 100_000 + b'\r\n'],
+        })
+        self.instruments = []
+
+    def tearDown(self):
+        for instrument in self.instruments:
+            instrument.close()
+        self.server.close()
+
+    def make_instrument(self, name, **kwargs):
+        kwargs.setdefault('read_terminator', '\r\n')
+        instrument = IPInstrument(name, *self.server.server_address,
+                                  terminator='\n', **kwargs)
+        instrument.add_parameter('voltage', get_cmd='VOLT?',
+                                 set_cmd='VOLT {}', get_parser=float)
+        self.instruments.append(instrument)
+        return instrument
+
+    def test_concurrent_asks(self):
+        first, second = (self.make_instrument(f'ip{n}') for n in range(2))
+
+        async def measure():
+            return await asyncio.gather(first.ask_async('LONG?'),
+                                        gather_get([first.voltage,
+                                                    second.voltage,
+                                                    second.voltage]))
+
+        t0 = time.perf_counter()
+        with trace_io() as tracer:
+            long, values = run_coroutine(measure())
+        duration = time.perf_counter() - t0
+
+        self.assertEqual(long, 'a' * 100_000)
+        self.assertEqual(values, [1.5, 1.5, 1.5])
+        # two asks of each instrument one after the other
+        self.assertGreater(duration, 0.2)
+        self.assertLess(duration, 0.35)
+        stats = tracer.stats()
+        self.assertEqual(stats['ip0']['commands']['VOLT?']['count'], 1)
+        self.assertEqual(stats['ip1']['commands']['VOLT?']['count'], 2)
+        # the socket was used with asyncio, not in threads
+        self.assertFalse(first.thread_worker.is_alive())
+        self.assertFalse(second.thread_worker.is_alive())
+
+        # the socket can be used without asyncio afterwards
+        self.assertEqual(first.voltage.get(), 1.5)
+
+    def test_ask_of_another_thread_does_not_block_the_loop(self):
+        first, second = (self.make_instrument(f'ip{n}') for n in range(2))
+        thread = threading.Thread(target=first.voltage.get)
+
+        async def measure():
+            t0 = time.perf_counter()
+
+            async def get(parameter):
+                value = await parameter.get_async()
+                return value, time.perf_counter() - t0
+
+            return await asyncio.gather(get(first.voltage),
+                                        get(second.voltage))
+
+        thread.start()
+        time.sleep(0.02)
+        (_, first_done), (_, second_done) = run_coroutine(measure())
+        thread.join()
+        # the first instrument waits for the thread, the second doesn't
+        self.assertGreater(first_done, 0.15)
+        self.assertLess(second_done, 0.15)
+        self.assertEqual(first.voltage.get_latest(), 1.5)
+        self.assertEqual(first.voltage.get(), 1.5)
+
+    def test_set_async_with_confirmation(self):
+        instrument = self.make_instrument('ip', write_confirmation=True)
+        run_coroutine(instrument.voltage.set_async(2))
+        self.assertEqual(instrument.voltage.get_latest(), 2)
+        self.assertEqual(instrument.voltage.get(), 1.5)
+
+    def test_timeout(self):
+        instrument = self.make_instrument('ip', timeout=0.05)
+        with self.assertRaises(OSError) as context:
+            run_coroutine(instrument.ask_async('VOLT?'))
+        self.assertIn("asking 'VOLT?' to <IPInstrument: ip>",
+                      context.exception.args)
+        self.assertEqual(instrument._socket.gettimeout(), 0.05)
@@ -3,6 +3,7 @@ import numpy as np
 import os
 import pickle
 import logging
+import tempfile
 
 from qcodes.data.data_array import DataArray
 from qcodes.data.io import DiskIO
@@ -181,6 +182,21 @@ class TestDataArray(TestCase):
         ])
         self.assertEqual(data.modified_range, (2, 14))
 
+    def test_store_point(self):
+        data = DataArray(preset_data=[[[1] * 4] * 3] * 2)
+        reference = DataArray(preset_data=[[[1] * 4] * 3] * 2)
+        data.modified_range = None
+        reference.modified_range = None
+
+        for indices, value in [((1, 0, 2), 5), ((0, 2), [6, 7, 8, 9]),
+                               ((1,), 3), ((0, 0, 0), 2)]:
+            data._store_point(indices, value)
+            reference[indices] = value
+            self.assertEqual(data.tolist(), reference.tolist())
+            self.assertEqual(data.modified_range, reference.modified_range)
+
+        self.assertEqual(data.modified_range, (0, 23))
+
     def test_repr(self):
         array2d = [[1, 2], [3, 4]]
         arrayrepr = repr(np.array(array2d))
@@ -564,3 +580,74 @@ class TestDataSet(TestCase):
         m.remove_array('z')
         _ = m.__repr__()
         self.assertFalse('z' in m.arrays)
+
+    def test_memmap_of_nested_setpoints(self):
+        # the setpoints of an array parameter measured in a 2D loop are
+        # nested without making a full array, and go straight into the
+        # memory-mapped file
+        sp = DataArray(name='sp', preset_data=np.linspace(5, 9, 64),
+                       is_setpoint=True)
+        x = DataArray(name='x', preset_data=np.arange(3.), is_setpoint=True)
+        y = DataArray(name='y', shape=(3,), is_setpoint=True)
+        y.nest(4, set_array=x)
+        sp.nest(4, set_array=y)
+        sp.nest(3, set_array=x)
+        self.assertEqual(sp.ndarray.shape, (3, 4, 64))
+        self.assertEqual(sp.ndarray.strides[:2], (0, 0))
+        self.assertFalse(sp.ndarray.flags.writeable)
+
+        with tempfile.TemporaryDirectory() as base:
+            new_data(arrays=(x, y, sp), location='mm', io=DiskIO(base),
+                     memmap=True, write_period=None)
+            self.assertIsInstance(sp.ndarray, np.memmap)
+            np.testing.assert_array_equal(
+                sp.ndarray, np.broadcast_to(np.linspace(5, 9, 64),
+                                            (3, 4, 64)))
+
+        # without memmap, the nested array gets its own memory
+        sp = DataArray(name='sp', preset_data=np.arange(4.), is_setpoint=True)
+        sp.nest(2)
+        new_data(arrays=(sp,), location=False)
+        self.assertTrue(sp.ndarray.flags.writeable)
+        sp.ndarray[0, 0] = -1
+        np.testing.assert_array_equal(sp.ndarray[1], np.arange(4.))
+
+    def test_memmap(self):
+        with self.assertRaises(ValueError):
+            DataSet(location=False, memmap=True)
+
+        with tempfile.TemporaryDirectory() as base:
+            io = DiskIO(base)
+            x = DataArray(name='x', preset_data=np.arange(3.),
+                          is_setpoint=True)
+            y = DataArray(name='y', preset_data=np.arange(4.),
+                          is_setpoint=True)
+            y.nest(3, set_array=x)
+            z = DataArray(name='z', shape=(3, 4), set_arrays=(x, y))
+            data = new_data(arrays=(x, y, z), location='mm', io=io,
+                            memmap=True, write_period=None)
+
+            for array in (x, y, z):
+                self.assertIsInstance(array.ndarray, np.memmap)
+                self.assertTrue(os.path.isfile(os.path.join(
+                    base, 'mm', 'memmap', array.array_id + '.npy')))
+            np.testing.assert_array_equal(y.ndarray, [np.arange(4.)] * 3)
+            self.assertTrue(np.all(np.isnan(z.ndarray)))
+
+            data.store((0,), {'z': [1, 2, 3, 4]})
+            data.store((1, 0), {'z': 5})
+            self.assertEqual(z.get_changes(-1),
+                             {'start': 0, 'stop': 4, 'vals': [1, 2, 3, 4, 5]})
+            self.assertEqual(z.get_changes(2),
+                             {'start': 3, 'stop': 4, 'vals': [4, 5]})
+            self.assertIsNone(z.get_changes(4))
+
+            data.finalize(write_metadata=False)
+
+            loaded = load_data('mm', io=io, memmap=True)
+            self.assertIsInstance(loaded.z.ndarray, np.memmap)
+            np.testing.assert_array_equal(loaded.z.ndarray, z.ndarray)
+            np.testing.assert_array_equal(loaded.y_set.ndarray, y.ndarray)
+            np.testing.assert_array_equal(
+                np.load(os.path.join(base, 'mm', 'memmap', 'z.npy')),
+                z.ndarray)
@@ -356,6 +356,58 @@ class TestGNUPlotFormat(TestCase):
             self.assertEqual(f.read(), starred_file)
         self.assertEqual(self.stars_before_write, 1)
 
+    def test_multifile_chunked_write(self):
+        # formatting the rows in small chunks gives the same files, also
+        # when a chunk starts with a blank line
+        formatter = GNUPlotFormat()
+        formatter.write_chunk_size = 2
+        location = self.locations[1]
+        data = DataSetCombined(location)
+
+        formatter.write(data, data.io, data.location)
+
+        filex, filexy = files_combined()
+        with open(location + '/x_set.dat', 'r') as f:
+            self.assertEqual(f.read(), filex)
+        with open(location + '/x_set_y_set.dat', 'r') as f:
+            self.assertEqual(f.read(), filexy)
+
+    def test_read_3d(self):
+        formatter = GNUPlotFormat()
+        location = self.locations[0]
+        os.makedirs(location, exist_ok=True)
+        lines = ['# x_set\ty_set\tz_set\tv', '# "X"\t"Y"\t"Z"\t"V"',
+                 '# 2\t2\t3',
+                 '1\t5\t7\t0', '1\t5\t8\t1', '1\t5\t9\t2', '',
+                 '1\t6\t7\t3', '# a comment does not end the block',
+                 '1\t6\t8\t4', '1\t6\t9\t5', '', '',
+                 '2\t5\t7\t6', '2\t5\t8',  # the value of v is missing
+                 '2\t5\t9\t8', '', '2\t6\t7\t9', '']
+        with open(location + '/x_set.dat', 'w') as f:
+            f.write('\n'.join(lines))
+
+        data = DataSet(location=location)
+        formatter.read(data)
+
+        self.assertEqual(data.x_set.tolist(), [1, 2])
+        self.assertEqual(data.y_set.tolist(), [[5, 6], [5, 6]])
+        nan = float('nan')
+        self.assertEqual(repr(data.z_set.tolist()),
+                         repr([[[7., 8., 9.]] * 2,
+                               [[7., 8., 9.], [7., nan, nan]]]))
+        self.assertEqual(repr(data.v.tolist()),
+                         repr([[[0., 1., 2.], [3., 4., 5.]],
+                               [[6., nan, 8.], [9., nan, nan]]]))
+        self.assertEqual(data.v.last_saved_index, 9)
+
+        # an outer setpoint that changes within an inner loop
+        lines[10] = '1\t7\t9\t5'
+        with open(location + '/x_set.dat', 'w') as f:
+            f.write('\n'.join(lines))
+        with LogCapture() as logs:
+            formatter.read(data)
+        self.assertIn('inconsistent setpoint values', logs.value)
+
     def test_constructor_errors(self):
         with self.assertRaises(AttributeError):
             # extension must be a string
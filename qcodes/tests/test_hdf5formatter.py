@@ -3,6 +3,7 @@ import os
 import numpy as np
 import h5py
 from shutil import copy
+from unittest.mock import patch
 
 import qcodes.data
 from qcodes.station import Station
@@ -112,6 +113,92 @@ class TestHDF5_Format(TestCase):
         self.formatter.close_file(data)
         self.formatter.close_file(data2)
 
+    def test_nd_datasets(self):
+        formatter = HDF5Format(chunks=(2, 2), compression='gzip',
+                               compression_opts=4)
+        data = DataSet2D(location=self.loc_provider, name='test_nd')
+        formatter.write(data)
+
+        dset = data._h5_base_group['Data Arrays']['z']
+        self.assertEqual(dset.shape, (6, 4))
+        self.assertEqual(dset.chunks, (2, 2))
+        self.assertEqual(dset.compression, 'gzip')
+        self.assertEqual(dset.compression_opts, 4)
+        np.testing.assert_array_equal(dset[()], data.z.ndarray)
+        self.assertEqual(data._h5_base_group['Data Arrays']['x_set'].shape,
+                         (6,))
+        formatter.close_file(data)
+
+    def test_incremental_write_2D(self):
+        data = DataSet2D(location=self.loc_provider,
+                         name='test_incremental_2D')
+        data_copy = DataSet2D(False)
+        for array in data.arrays.values():
+            array.ndarray.fill(np.nan)
+            array.modified_range = None
+
+        written = []
+        # record the parts of the arrays written to the file
+        original = h5py.Dataset.__setitem__
+
+        def setitem(dset, index, value):
+            written.append((dset.name.split('/')[-1], index))
+            original(dset, index, value)
+
+        with patch.object(h5py.Dataset, '__setitem__', setitem):
+            # fill the 2D array point by point, writing after every point
+            for i in range(6):
+                data.x_set[i] = data_copy.x_set[i]
+                for j in range(4):
+                    data.y_set[i, j] = data_copy.y_set[i, j]
+                    data.z[i, j] = data_copy.z[i, j]
+                    written[:] = []
+                    self.formatter.write(data, write_metadata=False)
+                    # only the new point is written
+                    self.assertIn(('z', (slice(i, i + 1), slice(j, j + 1))),
+                                  written)
+                    self.assertEqual(data.z.last_saved_index, 4 * i + j)
+                    self.assertIsNone(data.z.modified_range)
+
+            # rewriting an earlier point writes only that point
+            data.z[1, 2] = -1
+            written[:] = []
+            self.formatter.write(data, write_metadata=False)
+            self.assertEqual(written, [('z', (slice(1, 2), slice(2, 3)))])
+
+        self.formatter.close_file(data)
+        data_copy.z[1, 2] = -1
+        data2 = DataSet(location=data.location, formatter=self.formatter)
+        data2.read()
+        for array_id in ('x_set', 'y_set', 'z'):
+            self.checkArraysEqual(data2.arrays[array_id],
+                                  data_copy.arrays[array_id])
+        self.formatter.close_file(data2)
+
+    def test_read_flat_layout(self):
+        # files written by older versions store every array flat, as
+        # (n, 1) datasets that are only as long as the data written
+        data = DataSet2D(location=self.loc_provider, name='test_flat')
+        self.formatter.write(data)
+        group = data._h5_base_group['Data Arrays']
+        for array_id, array in data.arrays.items():
+            attrs = dict(group[array_id].attrs)
+            del group[array_id]
+            values = array.ndarray.reshape(-1, 1)[:-3]
+            dset = group.create_dataset(array_id, data=values,
+                                        maxshape=(None, 1))
+            dset.attrs.update(attrs)
+        self.formatter.close_file(data)
+
+        data2 = DataSet(location=data.location, formatter=self.formatter)
+        data2.read()
+        z = data.z.ndarray.astype(float)
+        z[-1, -3:] = np.nan
+        np.testing.assert_array_equal(data2.z.ndarray, z)
+        np.testing.assert_array_equal(data2.x_set.ndarray,
+                                      [0, 1, 2, np.nan, np.nan, np.nan])
+        self.formatter.close_file(data2)
+
     def test_metadata_write_read(self):
         """
         Test is based on the snapshot of the 1D dataset.
@@ -0,0 +1,130 @@
+import socket
+import socketserver
+import threading
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from qcodes.instrument.ip import IPInstrument
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """
+    Answers every line received with the pieces of bytes in the responses
+    of the server for it, each piece sent separately
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            pieces = self.server.responses.get(line.decode().strip(), [])
+            for piece in pieces:
+                self.wfile.write(piece)
+                time.sleep(0.01)
+
+
+class StandInServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, responses):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.responses = responses
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def binary_block(values):
+    data = values.tobytes()
+    length = str(len(data)).encode()
+    return b'#' + str(len(length)).encode() + length + data
+
+
+class TestIPInstrument(TestCase):
+
+    def setUp(self):
+        self.values = np.linspace(0, 1, 1000, dtype='<f4')
+        block = binary_block(self.values)
+        self.server = StandInServer({
+            'IDN?': [b'QCoDeS,StandIn,1,0.1\r\n'],
+            'SPLIT?': [b'12', b'34\r', b'\n'],
+            'TWO?': [b'1\r\n2\r\n'],
+            'DATA?': [block[:5], block[5:2000], block[2000:] + b'\r\n'],
+            'RAW?': [b'#0' + b'abcd' + b'\n'],
+        })
+        self.address, self.port = self.server.server_address
+        self.instruments = []
+
+    def tearDown(self):
+        for instrument in self.instruments:
+            instrument.close()
+        self.server.close()
+
+    def make_instrument(self, name, **kwargs):
+        instrument = IPInstrument(name, address=self.address,
+                                  port=self.port, terminator='\n',
+                                  write_confirmation=False, **kwargs)
+        self.instruments.append(instrument)
+        return instrument
+
+    def test_single_recv(self):
+        instrument = self.make_instrument('single')
+        self.assertEqual(instrument.ask('IDN?'), 'QCoDeS,StandIn,1,0.1\r\n')
+
+    def test_read_terminator(self):
+        instrument = self.make_instrument('framed', read_terminator='\r\n')
+        self.assertEqual(instrument.ask('IDN?'), 'QCoDeS,StandIn,1,0.1')
+        # a response arriving in several segments
+        self.assertEqual(instrument.ask('SPLIT?'), '1234')
+        # several responses arriving in one segment
+        self.assertEqual(instrument.ask('TWO?'), '1')
+        self.assertEqual(instrument._recv(), '2')
+        self.assertEqual(instrument.snapshot()['read_terminator'], '\r\n')
+
+    def test_binary_block(self):
+        instrument = self.make_instrument('binary', read_terminator='\r\n')
+
+        values = instrument.ask_binary_block('DATA?', dtype='<f4')
+        np.testing.assert_array_equal(values, self.values)
+
+        out = np.zeros(1200, dtype='<f4')
+        values = instrument.ask_binary_block('DATA?', dtype='<f4', out=out)
+        self.assertTrue(np.shares_memory(values, out))
+        np.testing.assert_array_equal(values, self.values)
+        # the terminator after the block has been read
+        self.assertEqual(instrument.ask('IDN?'), 'QCoDeS,StandIn,1,0.1')
+
+        with self.assertRaises(ValueError):
+            instrument.ask_binary_block('IDN?')
+        instrument.set_persistent(True)  # reconnect to drop the response
+        # indefinite length blocks cannot be framed over a socket
+        with self.assertRaises(ValueError):
+            instrument.ask_binary_block('RAW?')
+        instrument.set_persistent(True)  # reconnect to drop the response
+        with self.assertRaises(ValueError):
+            instrument.ask_binary_block('DATA?', dtype='<f4',
+                                        out=np.zeros(10, dtype='<f4'))
+
+    def test_binary_block_without_read_terminator(self):
+        instrument = self.make_instrument('binary')
+        values = instrument.ask_binary_block('DATA?', dtype='<f4')
+        np.testing.assert_array_equal(values, self.values)
+        # the newline after the block is not taken for the next response
+        self.assertEqual(instrument.ask('IDN?'), 'QCoDeS,StandIn,1,0.1\r\n')
+
+    def test_socket_options(self):
+        instrument = self.make_instrument('options',
+                                          socket_buffer_size=1 << 18)
+        sock = instrument._socket
+        self.assertTrue(sock.getsockopt(socket.IPPROTO_TCP,
+                                        socket.TCP_NODELAY))
+        self.assertGreaterEqual(sock.getsockopt(socket.SOL_SOCKET,
+                                                socket.SO_RCVBUF), 1 << 18)
+
+        instrument = self.make_instrument('nagle', nodelay=False)
+        self.assertFalse(instrument._socket.getsockopt(socket.IPPROTO_TCP,
+                                                       socket.TCP_NODELAY))
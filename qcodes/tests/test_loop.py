@@ -93,6 +93,33 @@ class TestLoop(TestCase):
         keys2 = set(data.arrays.keys())
         self.assertEqual(keys, keys2)
 
+    def test_actions_compiled_once(self):
+        loop = Loop(self.p1[1:4:1]).loop(self.p2[3:5:1]).each(self.p1,
+                                                               self.p2)
+        inner = loop.actions[0]
+        with patch.object(inner, '_compile_actions',
+                          wraps=inner._compile_actions) as compile_actions:
+            data = loop.run_temp()
+            # the inner loop compiles its actions on the first point of
+            # the outer loop only
+            self.assertEqual(self._compiled(compile_actions, inner), 1)
+
+        self.assertEqual(data.p1.tolist(), [[1, 1], [2, 2], [3, 3]])
+        self.assertEqual(data.p2.tolist(), [[3, 4]] * 3)
+        self.assertEqual(data.p1.modified_range, (0, 5))
+
+        with patch.object(inner, '_compile_actions',
+                          wraps=inner._compile_actions) as compile_actions:
+            data = loop.run_temp()
+            # and again for the new data set of the next run
+            self.assertEqual(self._compiled(compile_actions, inner), 1)
+        self.assertEqual(data.p2.tolist(), [[3, 4]] * 3)
+
+    @staticmethod
+    def _compiled(compile_actions, loop):
+        return sum(call[0][0] is loop.actions
+                   for call in compile_actions.call_args_list)
+
     def test_repr(self):
         loop2 = Loop(self.p2[3:5:1], 0.001).each(self.p2)
         loop = Loop(self.p1[1:3:1], 0.001).each(self.p3,
@@ -0,0 +1,143 @@
+from unittest import TestCase
+
+from qcodes.instrument.base import Instrument
+from qcodes.loops import Loop
+from qcodes.instrument.parameter import Parameter
+from qcodes.instrument.parameter_group import ParameterGroup
+
+
+class SCPIInstrument(Instrument):
+    """
+    An instrument answering compound queries like 'FREQ?;AMPL?', recording
+    every query it gets except '*IDN?'
+    """
+
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.queries = []
+        self.state = {'FREQ?': '1.5E+03', 'AMPL?': '2.5', 'OUTP?': '1',
+                      'MODE?': 'SINE', 'LEV?': '0.5',
+                      '*IDN?': 'QCoDeS,SCPI,1,0.1'}
+
+        self.add_parameter('frequency', get_cmd='FREQ?', get_parser=float)
+        self.add_parameter('amplitude', get_cmd='AMPL?', get_parser=float,
+                           scale=10)
+        self.add_parameter('output', get_cmd='OUTP?',
+                           val_mapping={'on': 1, 'off': 0})
+        self.add_parameter('mode', get_cmd='MODE?')
+        self.add_parameter('level', get_cmd='LEV?', get_parser=float)
+        self.add_parameter('phase', get_cmd=lambda: 0.25)
+
+    def ask_raw(self, cmd):
+        if cmd != '*IDN?':
+            self.queries.append(cmd)
+        return ';'.join(self.state[query] for query in cmd.split(';'))
+
+
+class TestParameterGroup(TestCase):
+
+    def setUp(self):
+        self.instrument = SCPIInstrument('scpi')
+
+    def tearDown(self):
+        self.instrument.close()
+
+    def test_get(self):
+        group = self.instrument.add_parameter_group(
+            'settings', ['frequency', 'amplitude', 'output', 'mode'])
+        self.assertIs(self.instrument.parameter_groups['settings'], group)
+        self.assertIs(self.instrument.frequency.group, group)
+
+        self.assertEqual(group.get(), [1500.0, 0.25, 'on', 'SINE'])
+        self.assertEqual(self.instrument.queries,
+                         ['FREQ?;AMPL?;OUTP?;MODE?'])
+        # the latest values are updated as by get
+        self.assertEqual(self.instrument.amplitude.get_latest(), 0.25)
+        self.assertEqual(self.instrument.amplitude.raw_value, '2.5')
+        self.assertEqual(self.instrument.output.get_latest(), 'on')
+
+        self.instrument.queries.clear()
+        self.assertEqual(group.get([self.instrument.mode,
+                                    self.instrument.frequency]),
+                         ['SINE', 1500.0])
+        self.assertEqual(self.instrument.queries, ['MODE?;FREQ?'])
+
+    def test_max_queries(self):
+        group = self.instrument.add_parameter_group(
+            'settings', ['frequency', 'amplitude', 'output'], max_queries=2)
+        self.assertEqual(group.get(), [1500.0, 0.25, 'on'])
+        self.assertEqual(self.instrument.queries,
+                         ['FREQ?;AMPL?', 'OUTP?'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.instrument.add_parameter_group('bad', ['frequency', 'phase'])
+        group = self.instrument.add_parameter_group(
+            'settings', ['frequency', 'output'])
+        with self.assertRaises(KeyError):
+            self.instrument.add_parameter_group('settings', ['amplitude'])
+        with self.assertRaises(ValueError):
+            self.instrument.add_parameter_group('other', ['output'])
+        with self.assertRaises(ValueError):
+            ParameterGroup('foreign', self.instrument,
+                           [Parameter('free', get_cmd='FREE?')])
+
+        self.instrument.state['OUTP?'] = '1;1'
+        with self.assertRaises(ValueError):
+            group.get()
+        self.instrument.state['OUTP?'] = '7'
+        with self.assertRaises(KeyError):
+            group.get()
+
+    def test_snapshot(self):
+        self.instrument.add_parameter_group(
+            'settings', ['frequency', 'amplitude', 'output'])
+
+        snap = self.instrument.snapshot(update=True)
+
+        self.assertEqual(self.instrument.queries,
+                         ['FREQ?;AMPL?;OUTP?', 'MODE?', 'LEV?'])
+        parameters = snap['parameters']
+        self.assertEqual(parameters['frequency']['value'], 1500.0)
+        self.assertEqual(parameters['output']['value'], 'on')
+        self.assertEqual(parameters['mode']['value'], 'SINE')
+
+        self.instrument.queries.clear()
+        self.instrument.snapshot_base(
+            update=True, params_to_skip_update=['frequency', 'amplitude'])
+        self.assertEqual(self.instrument.queries, ['OUTP?', 'MODE?', 'LEV?'])
+
+    def test_snapshot_skips_snapshot_get_false(self):
+        self.instrument.add_parameter_group(
+            'settings', ['frequency', 'amplitude', 'level'])
+        self.instrument.level._snapshot_get = False
+
+        self.instrument.snapshot(update=True)
+
+        self.assertEqual(self.instrument.queries,
+                         ['FREQ?;AMPL?', 'OUTP?', 'MODE?'])
+
+    def test_snapshot_group_failing(self):
+        self.instrument.add_parameter_group(
+            'settings', ['frequency', 'amplitude'])
+        self.instrument.state['AMPL?'] = '2.5;3'
+
+        with self.assertLogs('qcodes.instrument.base', 'WARNING'):
+            self.instrument.snapshot(update=True)
+        # with a fallback to the single queries
+        self.assertEqual(self.instrument.queries[:2],
+                         ['FREQ?;AMPL?', 'FREQ?'])
+
+    def test_loop(self):
+        self.instrument.add_parameter_group(
+            'settings', ['frequency', 'amplitude', 'output'])
+        sweep = Parameter('sweep', set_cmd=None)
+        loop = Loop(sweep[1:3:1]).each(self.instrument.amplitude,
+                                       self.instrument.level,
+                                       self.instrument.frequency)
+        data = loop.run(location=False, quiet=True)
+
+        self.assertEqual(self.instrument.queries, ['AMPL?;FREQ?', 'LEV?'] * 2)
+        self.assertEqual(data.scpi_level.tolist(), [0.5, 0.5])
+        self.assertEqual(data.scpi_amplitude.tolist(), [0.25, 0.25])
+        self.assertEqual(data.scpi_frequency.tolist(), [1500.0, 1500.0])
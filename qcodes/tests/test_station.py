@@ -0,0 +1,132 @@
+import threading
+import time
+from unittest import TestCase
+
+from qcodes.instrument.base import Instrument
+from qcodes.instrument.channel import InstrumentChannel
+from qcodes.station import Station
+
+
+class SlowInstrument(Instrument):
+    """
+    An instrument of which every get takes `delay` seconds, recording the
+    threads the gets were done in
+    """
+
+    def __init__(self, name, delay, **kwargs):
+        super().__init__(name, **kwargs)
+        self.delay = delay
+        self.threads = set()
+
+        self.add_parameter('voltage', get_cmd=self._get, set_cmd=False)
+        channel = InstrumentChannel(self, 'channel')
+        channel.add_parameter('current', get_cmd=self._get, set_cmd=False)
+        self.add_submodule('channel', channel)
+
+    def _get(self):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return self.delay
+
+
+class TestConcurrentSnapshot(TestCase):
+
+    def setUp(self):
+        self.instruments = [SlowInstrument(f'slow{n}', 0.1)
+                            for n in range(4)]
+        self.station = Station(*self.instruments, default=False,
+                               update_snapshot=False)
+        # a parameter of one of the instruments, added to the station
+        # directly, must be updated in the thread of its instrument
+        self.station.add_component(self.instruments[0].channel.current,
+                                   update_snapshot=False)
+
+    def tearDown(self):
+        for instrument in self.instruments:
+            instrument.close()
+
+    def test_serial_and_concurrent_snapshots_are_equal(self):
+        serial = self.station.snapshot(update=True)
+
+        self.station.concurrent_snapshot = True
+        t0 = time.perf_counter()
+        concurrent = self.station.snapshot(update=True)
+        duration = time.perf_counter() - t0
+
+        def values(snapshot):
+            return {(name, param_name): param['value']
+                    for name, instrument in snapshot['instruments'].items()
+                    for param_name, param in instrument['parameters'].items()}
+
+        self.assertEqual(values(concurrent), values(serial))
+        self.assertEqual(list(concurrent['parameters']),
+                         ['current'])
+        # 4 instruments of 2 (plus one) gets of 0.1 s each
+        self.assertLess(duration, 0.6)
+
+        self.assertEqual(set(self.station.snapshot_timings),
+                         set(self.station.components))
+        self.assertGreater(self.station.snapshot_timings['slow1'], 0.15)
+
+    def test_one_thread_per_instrument(self):
+        self.station.concurrent_snapshot = True
+        self.station.snapshot(update=True)
+
+        threads = [instrument.threads for instrument in self.instruments]
+        for instrument_threads in threads:
+            self.assertEqual(len(instrument_threads), 1)
+        self.assertEqual(len(set.union(*threads)), len(self.instruments))
+
+    def test_timeout(self):
+        slow = SlowInstrument('slower', 1)
+        try:
+            self.station.add_component(slow, update_snapshot=False)
+            self.station.concurrent_snapshot = True
+            self.station.snapshot_timeout = 0.4
+
+            t0 = time.perf_counter()
+            with self.assertLogs('qcodes.station', 'WARNING'):
+                snapshot = self.station.snapshot(update=True)
+            self.assertLess(time.perf_counter() - t0, 0.9)
+
+            # the latest value in memory is used
+            voltage = snapshot['instruments']['slower']['parameters'][
+                'voltage']
+            self.assertIsNone(voltage['value'])
+            self.assertEqual(snapshot['instruments']['slow1']['parameters'][
+                'voltage']['value'], 0.1)
+        finally:
+            slow.close()
+
+    def test_no_update_while_timed_out_update_runs(self):
+        slow = SlowInstrument('slower', 0.5)
+        try:
+            self.station.add_component(slow, update_snapshot=False)
+            self.station.concurrent_snapshot = True
+            self.station.snapshot_timeout = 0.2
+            with self.assertLogs('qcodes.station', 'WARNING'):
+                self.station.snapshot(update=True)
+
+            # the update of slower is still running, so it is not updated
+            # again, neither concurrently nor one after the other
+            for concurrent in (True, False):
+                self.station.concurrent_snapshot = concurrent
+                with self.assertLogs('qcodes.station', 'WARNING') as logs:
+                    self.station.snapshot(update=True)
+                self.assertIn('still running', logs.output[0])
+                self.assertEqual(len(slow.threads), 1)
+
+            time.sleep(1)
+            self.station.snapshot_timeout = None
+            snapshot = self.station.snapshot(update=True)
+            self.assertEqual(len(slow.threads), 2)
+            self.assertEqual(snapshot['instruments']['slower']['parameters'][
+                'voltage']['value'], 0.5)
+        finally:
+            slow.close()
+
+    def test_update_false_is_not_concurrent(self):
+        self.station.concurrent_snapshot = True
+        self.station.snapshot(update=False)
+        for instrument in self.instruments:
+            self.assertEqual(instrument.threads, set())
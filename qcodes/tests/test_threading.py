@@ -1,13 +1,102 @@
 import gc
+import threading
+import time
 
 from unittest import TestCase
 
 from qcodes import Loop
 from qcodes.actions import UnsafeThreadingException
+from qcodes.instrument.parameter import Parameter
 from qcodes.tests.instrument_mocks import DummyInstrument
+from qcodes.utils.async_helpers import run_coroutine
+from qcodes.utils.threading import InstrumentThreadPool
 
 
-class TestUnsafeThreading(TestCase):
+class TestInstrumentThreadPool(TestCase):
+
+    def setUp(self):
+        self.pool = InstrumentThreadPool()
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_map(self):
+        threads = []
+
+        def record(value):
+            def f():
+                threads.append((value, threading.get_ident()))
+                return value
+            return f
+
+        for _ in range(3):
+            out = self.pool.map([record(n) for n in range(5)],
+                                keys=['a', 'b', 'a', 'c', 'b'])
+            self.assertEqual(out, list(range(5)))
+
+        # the workers persist, with one thread per key
+        self.assertEqual(self.pool.n_workers, 3)
+        by_key = {}
+        for value, ident in threads:
+            by_key.setdefault('abacb'[value], set()).add(ident)
+        for idents in by_key.values():
+            self.assertEqual(len(idents), 1)
+        self.assertEqual(len(set.union(*by_key.values())), 3)
+        self.assertNotIn(threading.get_ident(), set.union(*by_key.values()))
+
+    def test_concurrent_across_keys_serial_within(self):
+        def sleep():
+            time.sleep(0.1)
+
+        t0 = time.perf_counter()
+        self.pool.map([sleep] * 4, keys=[1, 2, 3, 4])
+        self.assertLess(time.perf_counter() - t0, 0.3)
+
+        t0 = time.perf_counter()
+        self.pool.map([sleep] * 3, keys=[1, 1, 1])
+        self.assertGreater(time.perf_counter() - t0, 0.29)
+
+    def test_exception(self):
+        calls = []
+
+        def fail(message):
+            def f():
+                calls.append(message)
+                raise ValueError(message)
+            return f
+
+        with self.assertRaisesRegex(ValueError, 'first'):
+            self.pool.map([lambda: 1, fail('first'), fail('second'),
+                           lambda: calls.append('after')],
+                          keys=['a', 'a', 'b', 'a'])
+        # a failure stops the rest of that worker only
+        self.assertEqual(sorted(calls), ['first', 'second'])
+
+        # and the pool can still be used
+        self.assertEqual(self.pool.map([lambda: 2], keys=['a']), [2])
+
+    def test_close(self):
+        self.pool.map([lambda: 1, lambda: 2], keys=['a', 'b'])
+        workers = [worker for worker, _ in self.pool._workers.values()]
+        self.pool.close()
+        self.assertEqual(self.pool.n_workers, 0)
+        for worker in workers:
+            self.assertFalse(worker.is_alive())
+
+    def test_get(self):
+        inst = DummyInstrument(name='pool_inst', gates=['v1', 'v2'])
+        try:
+            inst.v1(1)
+            inst.v2(2)
+            free = Parameter('free', set_cmd=None, initial_value=3)
+            self.assertEqual(self.pool.get([inst.v1, free, inst.v2]),
+                             [1, 3, 2])
+            self.assertEqual(self.pool.n_workers, 2)
+        finally:
+            inst.close()
+
+
+class TestLoopThreading(TestCase):
 
     def setUp(self):
         self.inst1 = DummyInstrument(name='inst1',
@@ -24,9 +113,60 @@ class TestUnsafeThreading(TestCase):
 
         gc.collect()
 
-    def test_unsafe_exception(self):
-        to_meas = (self.inst1.v1, self.inst1.v2)
-        loop = Loop(self.inst2.v1.sweep(0, 1, num=10)).each(*to_meas)
+    def test_same_instrument(self):
+        # reading several parameters of one instrument with threads used to
+        # be refused, now they are read one after the other by the thread
+        # of that instrument
+        threads = {}
+
+        def record(name, value):
+            def get():
+                threads.setdefault(name, set()).add(threading.get_ident())
+                return value
+            return get
+
+        self.inst1.v1.get = record('inst1', 1)
+        self.inst1.v2.get = record('inst1', 2)
+        self.inst2.v2.get = record('inst2', 3)
+
+        to_meas = (self.inst1.v1, self.inst1.v2, self.inst2.v2)
+        outer = Loop(self.inst2.v1.sweep(0, 1, num=3))
+        loop = outer.loop(self.inst2.v1.sweep(0, 1, num=4)).each(*to_meas)
+        data = loop.run(use_threads=True, location=False, quiet=True)
+
+        self.assertEqual(data.inst1_v1.tolist(), [[1] * 4] * 3)
+        self.assertEqual(data.inst1_v2.tolist(), [[2] * 4] * 3)
+        self.assertEqual(data.inst2_v2.tolist(), [[3] * 4] * 3)
+
+        # the same thread for the whole run, also across the inner loops
+        self.assertEqual(len(threads['inst1']), 1)
+        self.assertEqual(len(threads['inst2']), 1)
+        self.assertNotEqual(threads['inst1'], threads['inst2'])
+
+        # the threads are the ones of the instruments, which are stopped
+        # when the instruments are closed
+        alive = {t.ident for t in threading.enumerate()}
+        self.assertTrue(threads['inst1'] | threads['inst2'] <= alive)
+        self.inst1.close()
+        self.inst2.close()
+        time.sleep(0.1)
+        alive = {t.ident for t in threading.enumerate()}
+        self.assertFalse(alive & (threads['inst1'] | threads['inst2']))
+
+    def test_same_thread_as_coroutines(self):
+        threads = []
+
+        def record():
+            threads.append(threading.get_ident())
+
+        self.inst1.v1.get = record
+        loop = Loop(self.inst2.v1.sweep(0, 1, num=2)).each(self.inst1.v1,
+                                                            self.inst2.v2)
+        loop.run(use_threads=True, location=False, quiet=True)
+        run_coroutine(self.inst1.call_async(record))
+        self.assertEqual(len(set(threads)), 1)
+        self.assertEqual(threads[0], self.inst1.thread_worker._thread.ident)
 
-        with self.assertRaises(UnsafeThreadingException):
-            loop.run(use_threads=True)
+    def test_unsafe_exception_is_deprecated(self):
+        with self.assertWarns(DeprecationWarning):
+            UnsafeThreadingException()
@@ -0,0 +1,183 @@
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import qcodes as qc
+from qcodes.dataset.data_set import load_by_id
+from qcodes.dataset.database import initialise_database
+from qcodes.dataset.experiment_container import new_experiment
+from qcodes.dataset.measurements import Measurement
+from qcodes.instrument.base import Instrument
+from qcodes.utils.tracing import (IOTracer, LatencyHistogram, io_tracer,
+                                  trace_io)
+
+
+class EchoInstrument(Instrument):
+    """An instrument answering every query with the query itself"""
+
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.written = []
+        self.add_parameter('echo', get_cmd='ECHO?', set_cmd='ECHO {}')
+        self.add_parameter('length', get_cmd='LENGTH?', get_parser=len)
+
+    def write_raw(self, cmd):
+        if cmd == 'FAIL':
+            raise RuntimeError('failed')
+        self.written.append(cmd)
+
+    def ask_raw(self, cmd):
+        time.sleep(0.002)
+        if cmd == 'NUMBER?':
+            return 1.5
+        return cmd
+
+
+class TestLatencyHistogram(TestCase):
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+
+        values = [n * 1e-5 for n in range(1, 1001)]
+        for value in values:
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertEqual(histogram.min, values[0])
+        self.assertEqual(histogram.max, values[-1])
+        self.assertAlmostEqual(histogram.to_dict()['mean'], 5.005e-3)
+        for q in (10, 50, 90, 99):
+            self.assertAlmostEqual(histogram.percentile(q), q * 1e-4,
+                                   delta=q * 1e-4 * 0.04)
+        self.assertEqual(histogram.percentile(100), values[-1])
+
+        histogram.reset()
+        self.assertEqual(histogram.count, 0)
+        self.assertIsNone(histogram.percentile(50))
+
+    def test_buckets(self):
+        histogram = LatencyHistogram()
+        previous = -1
+        for microseconds in range(1 << 12):
+            index = histogram._bucket(microseconds)
+            low, high = histogram._bucket_bounds(index)
+            self.assertTrue(low <= microseconds <= high)
+            self.assertIn(index, (previous, previous + 1))
+            previous = index
+        # very long latencies end up in the last bucket
+        histogram.record(1e9)
+        self.assertEqual(histogram._counts[-1], 1)
+
+
+class TestIOTracer(TestCase):
+
+    def setUp(self):
+        self.instrument = EchoInstrument('echo_instrument')
+
+    def tearDown(self):
+        self.instrument.close()
+
+    def test_disabled(self):
+        io_tracer.reset()
+        self.assertFalse(io_tracer.enabled)
+        self.instrument.echo(1)
+        self.assertEqual(self.instrument.echo(), 'ECHO?')
+        self.assertEqual(io_tracer.stats(), {})
+        self.assertEqual(io_tracer.events(), [])
+
+    def test_trace_io(self):
+        with trace_io() as tracer:
+            self.assertIs(tracer, io_tracer)
+            self.assertTrue(tracer.enabled)
+            for value in range(3):
+                self.instrument.echo(value)
+                self.assertEqual(self.instrument.echo(), 'ECHO?')
+            with self.assertRaises(RuntimeError):
+                self.instrument.write('FAIL')
+        self.assertFalse(io_tracer.enabled)
+        self.assertEqual(self.instrument.written,
+                         ['ECHO 0', 'ECHO 1', 'ECHO 2'])
+
+        stats = io_tracer.stats()['echo_instrument']
+        self.assertEqual(stats['total']['count'], 7)
+        self.assertEqual(stats['total']['errors'], 1)
+        self.assertEqual(stats['total']['bytes_out'], 3 * 6 + 3 * 5 + 4)
+        self.assertEqual(stats['total']['bytes_in'], 3 * 5)
+
+        commands = stats['commands']
+        self.assertEqual(set(commands), {'ECHO', 'ECHO?', 'FAIL'})
+        self.assertEqual(commands['ECHO']['count'], 3)
+        self.assertEqual(commands['FAIL']['errors'], 1)
+        self.assertGreater(commands['ECHO?']['p50'], 0.0015)
+        json.dumps(io_tracer.stats())
+
+        events = io_tracer.events()
+        self.assertEqual([(e.kind, e.command) for e in events[:2]],
+                         [('write', 'ECHO 0'), ('ask', 'ECHO?')])
+        self.assertIsInstance(events[-1].error, RuntimeError)
+
+        # not reset on exit, but when tracing again
+        with trace_io():
+            self.assertEqual(io_tracer.stats(), {})
+
+    def test_response_without_length(self):
+        with trace_io():
+            self.assertEqual(self.instrument.ask('NUMBER?'), 1.5)
+        stats = io_tracer.stats()['echo_instrument']
+        self.assertEqual(stats['total']['count'], 1)
+        self.assertEqual(stats['total']['bytes_in'], 0)
+
+    def test_ring_buffer(self):
+        tracer = IOTracer(buffer_size=4)
+        for value in range(10):
+            tracer.call(self.instrument, 'write', self.instrument.write_raw,
+                        f'ECHO {value}')
+        self.assertEqual([e.command for e in tracer.events()],
+                         ['ECHO 6', 'ECHO 7', 'ECHO 8', 'ECHO 9'])
+        self.assertEqual(tracer.stats()['echo_instrument']['total']['count'],
+                         10)
+        self.assertFalse(io_tracer.enabled)
+
+
+class TestMeasurementTracing(TestCase):
+
+    def setUp(self):
+        self.instrument = EchoInstrument('echo_instrument')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        qc.config["core"]["db_location"] = os.path.join(self.tmpdir.name,
+                                                        'temp.db')
+        initialise_database()
+        self.experiment = new_experiment('test-experiment', 'test-sample')
+
+    def tearDown(self):
+        self.instrument.close()
+        self.experiment.conn.close()
+        self.tmpdir.cleanup()
+
+    def test_run_with_trace_io(self):
+        meas = Measurement()
+        meas.register_parameter(self.instrument.length)
+        with meas.run(trace_io=True) as datasaver:
+            self.assertTrue(io_tracer.enabled)
+            datasaver.add_result((self.instrument.length,
+                                  self.instrument.length()))
+        self.assertFalse(io_tracer.enabled)
+
+        trace = json.loads(load_by_id(datasaver.run_id).get_metadata(
+            'io_trace'))
+        self.assertEqual(trace['echo_instrument']['total']['count'], 1)
+
+    def test_failing_run_does_not_leave_tracing_on(self):
+        meas = Measurement()
+        meas.register_parameter(self.instrument.length)
+        runner = meas.run(trace_io=True, use_threads=True)
+        with patch('qcodes.dataset.measurements.DataSaver',
+                   side_effect=RuntimeError('no saver')):
+            with self.assertRaises(RuntimeError):
+                runner.__enter__()
+        self.assertFalse(io_tracer.enabled)
+        self.assertIsNone(runner.thread_pool)
@@ -0,0 +1,140 @@
+"""
+Getting and setting the parameters of several instruments concurrently with
+asyncio, using ``get_async`` and ``set_async`` of the parameters.
+
+The parameters of each instrument are got or set one after the other, while
+different instruments are talked to concurrently, such that reading a
+parameter of each of n instruments takes about as long as reading the
+slowest one, e.g. at each point of a measurement::
+
+    from qcodes.utils.async_helpers import gather_get, run_coroutine
+
+    for v in voltages:
+        gate.set(v)
+        values = run_coroutine(gather_get([dmm1.volt, dmm2.volt, lockin.X]))
+
+or, in a coroutine, ``values = await gather_get(...)``.
+"""
+import asyncio
+from collections import OrderedDict
+from functools import partial
+import threading
+from typing import (Any, Callable, Coroutine, Dict, List, Sequence, Tuple,
+                    Union, TYPE_CHECKING)
+
+from qcodes.utils.threading import RespondingThread
+
+if TYPE_CHECKING:
+    from qcodes.instrument.parameter import _BaseParameter
+
+
+def _root_instrument(parameter: '_BaseParameter') -> Any:
+    instrument = getattr(parameter, 'instrument', None)
+    return getattr(instrument, 'root_instrument', instrument)
+
+
+async def _gather_by_instrument(calls: Sequence[Tuple['_BaseParameter',
+                                                      Callable]]
+                                ) -> List[Any]:
+    """
+    Call the coroutine functions of the parameters, the ones of each
+    instrument one after the other in the given order, and concurrently for
+    different instruments and parameters without instrument.
+    """
+    by_instrument = OrderedDict()  # type: Dict[int, List[int]]
+    for index, (parameter, _) in enumerate(calls):
+        root = _root_instrument(parameter)
+        key = id(root) if root is not None else id(parameter)
+        by_instrument.setdefault(key, []).append(index)
+
+    results = [None] * len(calls)  # type: List[Any]
+
+    async def call_in_order(indices: List[int]) -> None:
+        for index in indices:
+            results[index] = await calls[index][1]()
+
+    await asyncio.gather(*(call_in_order(indices)
+                           for indices in by_instrument.values()))
+    return results
+
+
+async def gather_get(parameters: Sequence['_BaseParameter']) -> List[Any]:
+    """
+    Get parameters concurrently. The parameters of each instrument are read
+    one after the other, in the given order.
+
+    Args:
+        parameters: The parameters to get
+
+    Returns:
+        The values of the parameters, in the same order
+    """
+    return await _gather_by_instrument([(parameter, parameter.get_async)
+                                        for parameter in parameters])
+
+
+async def gather_set(values: Union[Dict['_BaseParameter', Any],
+                                   Sequence[Tuple['_BaseParameter', Any]]]
+                     ) -> None:
+    """
+    Set parameters concurrently. The parameters of each instrument are set
+    one after the other (including ramps), in the given order.
+
+    Args:
+        values: The parameters and the values to set them to, as a dict or
+            a sequence of (parameter, value) pairs
+    """
+    if isinstance(values, dict):
+        values = list(values.items())
+    await _gather_by_instrument([(parameter,
+                                  partial(parameter.set_async, value))
+                                 for parameter, value in values])
+
+
+_thread_loops = threading.local()
+
+
+def _run_in_new_loop(coroutine: Coroutine) -> Any:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _loop_is_running() -> bool:
+    """Whether an event loop is running in the calling thread."""
+    # Python 3.6 has no get_running_loop, and its get_event_loop makes a
+    # loop if there is none
+    get_loop = getattr(asyncio, 'get_running_loop', None)
+    try:
+        if get_loop is None:
+            return asyncio.get_event_loop().is_running()
+        get_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def run_coroutine(coroutine: Coroutine) -> Any:
+    """
+    Run a coroutine to completion, from code that is not a coroutine.
+
+    The coroutine runs in an event loop of the calling thread, kept for
+    later calls, or in a new thread if an event loop is running in the
+    calling thread already, as in a Jupyter notebook.
+
+    Args:
+        coroutine: The coroutine to run, e.g. ``gather_get(parameters)``
+
+    Returns:
+        The return value of the coroutine
+    """
+    if _loop_is_running():
+        thread = RespondingThread(target=_run_in_new_loop, args=(coroutine,))
+        thread.start()
+        return thread.output()
+    loop = getattr(_thread_loops, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _thread_loops.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coroutine)
@@ -3,7 +3,11 @@
 # several parameters in parallel), we can parallelize them with threads.
 # That way the things we call need not be rewritten explicitly async.
 
+import queue
 import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
 
 
 class RespondingThread(threading.Thread):
@@ -13,7 +17,8 @@ class RespondingThread(threading.Thread):
     exceptions back to the main thread when this value is collected.
 
     the `output` method joins the thread, then checks for errors and
-    returns the output value.
+    returns the output value. If a timeout is given to `output` and the
+    thread is still running after it, a TimeoutError is raised.
 
     so, if you have a function `f` where `f(1, 2, a=3) == 4`, then:
 
@@ -40,6 +45,10 @@ class RespondingThread(threading.Thread):
     def output(self, timeout=None):
         self.join(timeout=timeout)
 
+        if self.is_alive():
+            raise TimeoutError('Thread did not finish within '
+                               '{} s'.format(timeout))
+
         if self._exception:
             e = self._exception
             self._exception = None
@@ -72,3 +81,225 @@ def thread_map(callables, args=None, kwargs=None):
         t.start()
 
     return [t.output() for t in threads]
+
+
+class InstrumentWorker:
+    '''
+    a persistent thread calling the functions given to it one after the
+    other, in the order they are given. The thread is started on first use.
+
+    every instrument has one (see ``Instrument.thread_worker``), which is
+    used both by `InstrumentThreadPool` and by the coroutines of the
+    instrument (see ``Instrument.call_async``), such that an instrument is
+    always used from the same thread.
+
+    Args:
+        name: the name of the thread
+    '''
+    def __init__(self, name):
+        self.name = name
+        self._thread = None
+        self._tasks = None
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def put(self, task):
+        '''
+        call `task` without arguments in the thread. Exceptions are not
+        caught, `task` must report them itself.
+        '''
+        with self._lock:
+            if self._thread is None:
+                # a queue per thread, such that a thread that is closing
+                # never takes the tasks of the next one
+                self._tasks = queue.Queue()
+                self._thread = threading.Thread(target=self._work,
+                                                args=(self._tasks,),
+                                                name=self.name, daemon=True)
+                self._thread.start()
+            self._tasks.put(task)
+
+    def submit(self, func, *args):
+        '''
+        call ``func(*args)`` in the thread
+
+        Returns:
+            a `concurrent.futures.Future` of the return value
+        '''
+        future = Future()
+
+        def task():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = func(*args)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        self.put(task)
+        return future
+
+    @staticmethod
+    def _work(tasks):
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            task()
+
+    def close(self, wait=True):
+        '''
+        stop the thread after it has called the functions given to it so
+        far. It is started again if the worker is used afterwards.
+
+        Args:
+            wait: whether to wait for the thread to stop
+        '''
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._tasks.put(None)
+        if wait and thread is not threading.current_thread():
+            thread.join()
+
+
+class InstrumentThreadPool:
+    '''
+    a pool of persistent worker threads, one per instrument, to call
+    things concurrently across instruments. Unlike `thread_map`, which
+    starts a new thread for every callable on every call, the workers are
+    started once and reused, which keeps the overhead of each call low
+    enough to be paid on every point of a measurement.
+
+    every callable is given a key, normally the (root) instrument it talks
+    to. All callables with the same key are executed one after the other
+    by the same worker, in the order they are given, so an instrument is
+    never used by two threads at the same time, and always by the same
+    thread. Callables with different keys run concurrently.
+
+    the worker of an instrument is its own `InstrumentWorker`, the one its
+    coroutines run in too, which is stopped when the instrument is closed.
+    For other keys the pool starts a worker itself.
+
+    the pool should be closed when it is no longer needed, which stops the
+    workers it started. It can also be used as a context manager:
+
+    with InstrumentThreadPool() as pool:
+        out = pool.map([f, g, h], keys=[inst1, inst1, inst2])
+        # f and g are called in the thread of inst1, h in the one of inst2
+    '''
+    def __init__(self):
+        # key -> (worker, whether the pool started it)
+        self._workers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def n_workers(self):
+        return len(self._workers)
+
+    def _worker(self, key):
+        with self._lock:
+            if key not in self._workers:
+                worker = getattr(key, 'thread_worker', None)
+                if isinstance(worker, InstrumentWorker):
+                    self._workers[key] = (worker, False)
+                else:
+                    worker = InstrumentWorker('{}-{}'.format(
+                        type(self).__name__, getattr(key, 'name', id(key))))
+                    self._workers[key] = (worker, True)
+            return self._workers[key][0]
+
+    @staticmethod
+    def _call_batch(indices, callables, done):
+        outputs = []
+        exception = None
+        try:
+            for c in callables:
+                outputs.append(c())
+        except Exception as e:
+            exception = e
+        done.put((indices, outputs, exception))
+
+    def map(self, callables, keys):
+        '''
+        call each of the callables (without arguments) in the worker of
+        its key, returning a list of their return values. Exceptions are
+        propagated once all the workers have finished, the one of the
+        first failing callable is raised.
+
+        Args:
+            callables: a sequence of callables
+            keys: a sequence of the same length with the key of each
+                callable, which must be hashable
+        '''
+        batches = OrderedDict()
+        for index, (c, key) in enumerate(zip(callables, keys)):
+            indices, batch = batches.setdefault(key, ([], []))
+            indices.append(index)
+            batch.append(c)
+
+        out = [None] * len(callables)
+        errors = {}
+        # the results of this call, the workers of instruments are shared
+        done = queue.Queue()
+        for key, (indices, batch) in batches.items():
+            self._worker(key).put(partial(self._call_batch, indices, batch,
+                                          done))
+
+        for _ in range(len(batches)):
+            indices, outputs, exception = done.get()
+            for index, output in zip(indices, outputs):
+                out[index] = output
+            if exception is not None:
+                errors[indices[len(outputs)]] = exception
+
+        if errors:
+            raise errors[min(errors)]
+        return out
+
+    def get(self, parameters):
+        '''
+        get the values of parameters concurrently across instruments, the
+        parameters of each root instrument are read one after the other
+
+        Args:
+            parameters: a sequence of parameters
+
+        Returns:
+            a list with the value of each parameter
+        '''
+        return self.map([p.get for p in parameters],
+                        [instrument_key(p) for p in parameters])
+
+    def close(self):
+        '''
+        stop the workers started by the pool, after they have finished
+        what they are doing
+        '''
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker, started in workers:
+            if started:
+                worker.close()
+
+
+def instrument_key(parameter):
+    '''
+    the key by which `InstrumentThreadPool` schedules the get or set of a
+    parameter: its root instrument, or the parameter itself if it is not
+    bound to an instrument
+    '''
+    return getattr(parameter, 'root_instrument', None) or parameter
@@ -0,0 +1,298 @@
+"""
+Tracing of the communication with instruments.
+
+When enabled, every ``Instrument.write`` and ``Instrument.ask`` is timed and
+recorded per instrument and per command: the number of calls and errors, the
+characters sent and received, and a histogram of the latencies. The most
+recent calls are kept in a ring buffer of fixed size. When disabled (the
+default), ``write`` and ``ask`` only check a flag.
+
+    from qcodes.utils.tracing import trace_io
+
+    with trace_io() as tracer:
+        ...  # talk to instruments
+    print(tracer.stats()['my_instrument']['commands']['VOLT?']['p99'])
+
+``Measurement.run(trace_io=True)`` traces the communication during a run
+and stores the statistics as the 'io_trace' metadata of its dataset.
+"""
+from collections import deque, namedtuple
+from contextlib import contextmanager
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+IOEvent = namedtuple('IOEvent', ['time', 'instrument', 'kind', 'command',
+                                 'duration', 'bytes_out', 'bytes_in',
+                                 'error'])
+IOEvent.__doc__ = """
+One traced call of ``write`` or ``ask``. ``kind`` is 'write' or 'ask',
+``time`` the ``time.time()`` at which the call started, ``duration`` its
+latency in seconds and ``error`` the exception it raised, if any.
+"""
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies with buckets of constant relative width, like
+    an HDR histogram: values are recorded as integer microseconds, exact
+    below ``2**significant_bits`` and with a relative precision of
+    ``2**(1 - significant_bits)`` above that, up to about 12 days. Recording
+    is a few integer operations and memory use is fixed.
+
+    Args:
+        significant_bits: The number of significant bits of a bucket,
+            default 5, i.e. a relative precision of about 6%.
+    """
+    # the largest recordable value is 2**_max_bits - 1 microseconds
+    _max_bits = 40
+
+    def __init__(self, significant_bits: int=5) -> None:
+        self.significant_bits = significant_bits
+        self._sub_count = 1 << significant_bits
+        self._half_count = self._sub_count >> 1
+        n_buckets = (self._sub_count +
+                     (self._max_bits - significant_bits) * self._half_count)
+        self._counts = [0] * n_buckets
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all recorded values."""
+        self._counts[:] = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _bucket(self, microseconds: int) -> int:
+        if microseconds < self._sub_count:
+            return microseconds
+        shift = microseconds.bit_length() - self.significant_bits
+        return (self._sub_count + (shift - 1) * self._half_count +
+                (microseconds >> shift) - self._half_count)
+
+    def _bucket_bounds(self, index: int):
+        """The lowest and highest microseconds recorded in a bucket."""
+        if index < self._sub_count:
+            return index, index
+        shift, offset = divmod(index - self._sub_count, self._half_count)
+        shift += 1
+        low = (offset + self._half_count) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        """Record a latency, in seconds."""
+        microseconds = int(seconds * 1e6)
+        if microseconds < self._sub_count:
+            index = microseconds if microseconds > 0 else 0
+        elif microseconds >> self._max_bits:
+            index = len(self._counts) - 1
+        else:
+            index = self._bucket(microseconds)
+        self._counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def add(self, other: 'LatencyHistogram') -> None:
+        """Add the values recorded in another histogram to this one."""
+        if other.significant_bits != self.significant_bits:
+            raise ValueError('Can only add histograms with the same '
+                             'number of significant bits')
+        self._counts[:] = [n + m for n, m in zip(self._counts,
+                                                 other._counts)]
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min,
+                                                              value)
+                self.max = value if self.max is None else max(self.max,
+                                                              value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        The latency in seconds below which q percent of the recorded values
+        are, within the precision of the buckets, or None if nothing has
+        been recorded.
+        """
+        if not self.count:
+            return None
+        if q >= 100:
+            return self.max
+        rank = max(1, -(-q * self.count // 100))
+        cumulative = 0
+        for index, n in enumerate(self._counts):
+            cumulative += n
+            if cumulative >= rank:
+                low, high = self._bucket_bounds(index)
+                value = (low + high) / 2e6
+                # the extremes are known exactly
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The statistics of the histogram in seconds, JSON-compatible."""
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'min': self.min,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99)}
+
+
+class _IOStats:
+    """The statistics of the calls of one command, or one instrument."""
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def record(self, duration: float, bytes_out: int, bytes_in: int,
+               error: bool) -> None:
+        self.latency.record(duration)
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        if error:
+            self.errors += 1
+
+    def add(self, other: '_IOStats') -> None:
+        self.latency.add(other.latency)
+        self.errors += other.errors
+        self.bytes_out += other.bytes_out
+        self.bytes_in += other.bytes_in
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = self.latency.to_dict()
+        stats.update(errors=self.errors, bytes_out=self.bytes_out,
+                     bytes_in=self.bytes_in)
+        return stats
+
+
+class IOTracer:
+    """
+    Records the calls of ``Instrument.write`` and ``Instrument.ask`` while
+    ``enabled``. ``Instrument`` uses the module-level ``io_tracer``, which
+    is enabled with ``trace_io``.
+
+    Commands are aggregated by their header, the part before the first
+    whitespace, such that e.g. 'VOLT 1' and 'VOLT 2' count as 'VOLT'. The
+    bytes in and out are counted as the characters of the commands and
+    responses.
+
+    Args:
+        buffer_size: The number of most recent calls kept as ``IOEvent``,
+            default 10000.
+    """
+
+    def __init__(self, buffer_size: int=10000) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events: deque = deque(maxlen=buffer_size)
+        # the totals per instrument are only summed up in stats, such that
+        # recording a call updates a single histogram
+        self._commands: Dict[str, Dict[str, _IOStats]] = {}
+
+    def call(self, instrument: Any, kind: str, func: Callable[[str], Any],
+             cmd: str) -> Any:
+        """
+        Call ``func(cmd)``, the ``write_raw`` or ``ask_raw`` of the
+        instrument, and record it.
+        """
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            response = func(cmd)
+        except Exception as e:
+            self.record(instrument.name, kind, cmd, started,
+                        time.perf_counter() - t0, 0, e)
+            raise
+        self.record(instrument.name, kind, cmd, started,
+                    time.perf_counter() - t0,
+                    len(response) if isinstance(response, (str, bytes))
+                    else 0)
+        return response
+
+    def record(self, instrument: str, kind: str, cmd: str, started: float,
+               duration: float, bytes_in: int,
+               error: Optional[Exception]=None) -> None:
+        """Record one call of ``write`` or ``ask`` of an instrument."""
+        header = cmd.split(None, 1)[0] if cmd.strip() else cmd
+        bytes_out = len(cmd)
+        with self._lock:
+            self._events.append(IOEvent(started, instrument, kind, cmd,
+                                        duration, bytes_out, bytes_in,
+                                        error))
+            commands = self._commands.get(instrument)
+            if commands is None:
+                commands = self._commands[instrument] = {}
+            stats = commands.get(header)
+            if stats is None:
+                stats = commands[header] = _IOStats()
+            stats.record(duration, bytes_out, bytes_in, error is not None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The statistics recorded since the last reset, JSON-compatible:
+        per instrument name a dict with the statistics of all its calls
+        under 'total' and per command header under 'commands'. The
+        statistics are count, errors, bytes_out, bytes_in and the mean,
+        min, max and 50th, 90th and 99th percentile latency in seconds.
+        """
+        stats = {}
+        with self._lock:
+            for name, commands in self._commands.items():
+                total = _IOStats()
+                for command_stats in commands.values():
+                    total.add(command_stats)
+                stats[name] = {'total': total.to_dict(),
+                               'commands': {
+                                   header: command_stats.to_dict()
+                                   for header, command_stats
+                                   in commands.items()}}
+        return stats
+
+    def events(self) -> List[IOEvent]:
+        """The most recent calls, oldest first."""
+        with self._lock:
+            return list(self._events)
+
+    def reset(self) -> None:
+        """Forget all recorded calls and statistics."""
+        with self._lock:
+            self._events.clear()
+            self._commands.clear()
+
+
+io_tracer = IOTracer()
+
+
+@contextmanager
+def trace_io(reset: bool=True) -> Iterator[IOTracer]:
+    """
+    Context manager enabling the tracing of the communication with all
+    instruments inside it, restoring the previous state on exit.
+
+    Args:
+        reset: Whether to reset the tracer on entry, such that its
+            statistics cover the context only. Default True.
+
+    Yields:
+        ``io_tracer``, the tracer used by ``Instrument``
+    """
+    tracer = io_tracer
+    was_enabled = tracer.enabled
+    if reset:
+        tracer.reset()
+    tracer.enabled = True
+    try:
+        yield tracer
+    finally:
+        tracer.enabled = was_enabled